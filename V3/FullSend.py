@@ -1,23 +1,53 @@
 from dotenv import load_dotenv
 import os
 from web3 import Web3
-import pandas as pd
-import threading
+import shutil
+import tempfile
 import time
-from decimal import Decimal, getcontext
 from datetime import datetime
-
-# Increase decimal precision for small values
-getcontext().prec = 50
+from multisend import events
+from multisend.accesslist import access_lists_from_env
+from multisend.amounts import NATIVE_DECIMALS, describe_skipped, parse_units, total_amount
+from multisend.balances import BalanceScanner, diff_distribution, expected_amounts, write_diff_report
+from multisend.engine import TransferEngine, native_to_base_units
+from multisend.events import fan_out
+from multisend.export import finish_export, open_writer
+from multisend.finality import finality_from_env
+from multisend.jobs import load_job, load_lanes
+from multisend.multichain import MultiChainDispatcher
+from multisend.planner import plan_batch, run_plan
+from multisend.preflight import run_preflight
+from multisend.presign import presigner_from_env
+from multisend.results import FAILED
+from multisend.scheduler import scheduler_from_env, scheduler_from_options
+from multisend.ratelimit import RateLimitedHTTPProvider, limiter_from_env
+from multisend.sheets import read_transfers
+from multisend.tokencache import token_cache_from_env
+from multisend.wallets import account_from_env
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Retrieve values from environment variables
-PRIVATE_KEY = os.getenv('PRIVATE_KEY')
+# Raw key, or an HD child account when MNEMONIC / WALLET_INDEX are set
+PRIVATE_KEY = account_from_env(os.environ)
 RPC_URL = os.getenv('RPC_URL')
 CHAIN_ID = int(os.getenv('CHAIN_ID'))
 EXPLORER_URL = os.getenv('EXPLORER_URL')
+# Summary file format written while a batch runs: xlsx, csv or ndjson
+EXPORT_FORMAT = os.getenv('EXPORT_FORMAT') or 'xlsx'
+# Snapshot recipient balances before and after a batch and write a diff report
+VERIFY_DISTRIBUTION = os.getenv('VERIFY_DISTRIBUTION') == '1'
+# Simulate transfers before broadcasting: "sample" (PREFLIGHT_SAMPLE rows), "all" or "off"
+PREFLIGHT = (os.getenv('PREFLIGHT') or 'sample').lower()
+PREFLIGHT_SAMPLE = int(os.getenv('PREFLIGHT_SAMPLE') or 256)
+# Fees (native units) one wave of a batch may reserve; larger batches are sent in waves
+FEE_BUDGET = os.getenv('FEE_BUDGET')
+
+# Shared rate limiter every RPC call passes through (READ_RPS / SEND_RPS in .env)
+RATE_LIMITER = limiter_from_env(os.environ)
+# Token metadata cached on disk across runs (TOKEN_CACHE=off to disable)
+TOKEN_CACHE = token_cache_from_env(os.environ)
 
 # Initialize Web3 connection with retry logic
 def initialize_web3():
@@ -28,7 +58,7 @@ def initialize_web3():
             # Use RPC_URL from .env if available, otherwise ask user
             current_rpc = RPC_URL if RPC_URL else input("Enter the RPC URL (e.g., https://rpc.minato.soneium.org/): ").strip()
             
-            web3_instance = Web3(Web3.HTTPProvider(current_rpc))
+            web3_instance = Web3(RateLimitedHTTPProvider(current_rpc, RATE_LIMITER))
             if web3_instance.is_connected():
                 print("Connected to the blockchain successfully!")
                 # Update RPC_URL if connection successful with user input
@@ -49,226 +79,113 @@ def initialize_web3():
     return None
 
 # Function to initialize the ERC-20 contract
-def initialize_contract(web3):
+def initialize_contract(engine):
     while True:
         try:
             contract_address = input("Enter the ERC-20 token contract address: ").strip()
-            if not web3.is_checksum_address(contract_address):
-                contract_address = web3.to_checksum_address(contract_address)
-            # Initialize the contract
-            token_contract = web3.eth.contract(address=contract_address, abi=contract_abi)
-            # Test the contract by calling a simple function
-            token_decimals = token_contract.functions.decimals().call()
-            print(f"Contract initialized successfully! Token Decimals: {token_decimals}")
-            return token_contract
+            token = engine.load_token(contract_address)
+            print(f"Contract initialized successfully! Token: {token.symbol}, Decimals: {token.decimals}")
+            if token.fee_on_transfer:
+                print("Warning: this token takes a fee on transfer; recipients receive less than the sheet amounts.")
+            return token
         except Exception as e:
             print(f"Invalid contract address. Error: {e}. Please try again.")
 
-# Function to send native currency (e.g., ETH) with nonce management
-def send_native_currency(web3, recipient_address, amount, chain_id, nonce, silent=False):
-    try:
-        recipient_address = web3.to_checksum_address(recipient_address)
-        value_in_wei = web3.to_wei(amount, 'ether')
-        eth_balance = web3.eth.get_balance(MY_ADDRESS)
-
-        # Gas details
-        gas_price = web3.to_wei('1', 'gwei')
-        gas_limit = 21000
-        transaction_cost = gas_price * gas_limit
-        
-        if eth_balance < (transaction_cost + value_in_wei):
-            print(f"Insufficient ETH balance for the transaction! Address: {recipient_address}")
-            return False, "Insufficient ETH balance"
-
-        # Build and sign the transaction
-        txn = {
-            'to': recipient_address,
-            'value': value_in_wei,
-            'gas': gas_limit,
-            'gasPrice': gas_price,
-            'nonce': nonce,
-            'chainId': chain_id
-        }
-        
-        signed_txn = web3.eth.account.sign_transaction(txn, PRIVATE_KEY)
-        txn_hash = web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-        if not silent:
-            print(f"Transaction sent with hash: {web3.to_hex(txn_hash)}")
-            print("Waiting for transaction confirmation...")
-        
-        receipt = web3.eth.wait_for_transaction_receipt(txn_hash, timeout=300)
-        
-        if not silent:
-            if receipt['status'] == 1:
-                print("Transaction successful! 🟢")
-                print(f"Transaction explorer URL: {EXPLORER_URL}/tx/{web3.to_hex(txn_hash)}")
-            else:
-                print("Transaction failed! 🔴")
-                print(f"Check transaction: {EXPLORER_URL}/tx/{web3.to_hex(txn_hash)}")
-        
-        return txn_hash, None
-
-    except Exception as e:
-        print(f"An error occurred while sending native currency: {str(e)}")
-        return None, str(e)
-
-# Function to send tokens with nonce management
-def send_tokens(web3, token_contract, recipient_address, amount, chain_id, nonce, silent=False):
-    try:
-        recipient_address = web3.to_checksum_address(recipient_address)
-        token_decimals = token_contract.functions.decimals().call()
-        
-        value_in_wei = int(Decimal(amount) * Decimal(10 ** token_decimals))
-        token_balance = token_contract.functions.balanceOf(MY_ADDRESS).call()
-        
-        if token_balance < value_in_wei:
-            print(f"Insufficient token balance for the transaction! Address: {recipient_address}")
-            return False, "Insufficient token balance"
-        
-        # Gas details
-        gas_price = web3.to_wei('1', 'gwei')
-        gas_limit = 60000
-        
-        eth_balance = web3.eth.get_balance(MY_ADDRESS)
-        
-        if eth_balance < (gas_price * gas_limit):
-            print(f"Insufficient ETH balance for gas fees! Address: {recipient_address}")
-            return None, "Insufficient ETH for gas fees"
-        
-        txn = token_contract.functions.transfer(recipient_address, value_in_wei).build_transaction({
-            'chainId': chain_id,
-            'gas': gas_limit,
-            'gasPrice': gas_price,
-            'nonce': nonce,
-        })
-        
-        signed_txn = web3.eth.account.sign_transaction(txn, PRIVATE_KEY)
-        txn_hash = web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-        if not silent:
-            print(f"Transaction sent with hash: {web3.to_hex(txn_hash)}")
-            print("Waiting for transaction confirmation...")
-        
-        receipt = web3.eth.wait_for_transaction_receipt(txn_hash, timeout=300)
-        
-        if not silent:
-            if receipt['status'] == 1:
-                print("Transaction successful! 🟢")
-                print(f"Transaction explorer URL: {EXPLORER_URL}/tx/{web3.to_hex(txn_hash)}")
-            else:
-                print("Transaction failed! 🔴")
-                print(f"Check transaction: {EXPLORER_URL}/tx/{web3.to_hex(txn_hash)}")
-        
-        return txn_hash, None
-
-    except Exception as e:
-        print(f"An error occurred while sending tokens: {str(e)}")
-        return None, str(e)
-
-# Shared nonce lock for multi-threading
-nonce_lock = threading.Lock()
-
-def process_multi_transfer(web3, transfer_function, file_path, chain_id, token_contract=None):
-    successful_transactions_count = 0
-    failed_transactions_count = 0
-    not_attempted_transactions_count = 0
-    initiated_transactions_count = 0
-    failed_transactions_history = []
-    current_nonce = web3.eth.get_transaction_count(MY_ADDRESS)
-    nonce_lock = threading.Lock()
-    initiated_lock = threading.Lock()
-    status_lock = threading.Lock()
-    
-    def update_progress(current_initiated, total_transactions):
-        current_display = min(current_initiated, total_transactions)
-        print(f"\rProcessing transaction {current_display}/{total_transactions} | "
-              f"Successful: {successful_transactions_count}/{total_transactions} | "
-              f"Failed: {failed_transactions_count}/{total_transactions}", end="", flush=True)
-
-    def send_transaction(index, recipient, amount):
-        nonlocal current_nonce, successful_transactions_count, failed_transactions_count, initiated_transactions_count
-        total_transactions = len(data)
-        
-        try:
-            # First increment initiated count and update display
-            with initiated_lock:
-                initiated_transactions_count += 1
-                current_initiated = initiated_transactions_count
-                update_progress(current_initiated, total_transactions)
-
-            with nonce_lock:
-                nonce = current_nonce
-                current_nonce += 1
-
-            if token_contract:
-                txn_hash, error = transfer_function(web3, token_contract, recipient, amount, chain_id, nonce, silent=True)
-            else:
-                txn_hash, error = transfer_function(web3, recipient, amount, chain_id, nonce, silent=True)
-
-            if txn_hash:
-                # Wait for transaction receipt
-                receipt = web3.eth.wait_for_transaction_receipt(txn_hash, timeout=300)
-                success = receipt['status'] == 1
-                
-                # Update success/failed count immediately after transaction completes
-                with status_lock:
-                    if success:
-                        successful_transactions_count += 1
-                    else:
-                        failed_transactions_count += 1
-                    update_progress(initiated_transactions_count, total_transactions)
-
-                transactions.append({
-                    'index': index + 1,
-                    'recipient': recipient,
-                    'amount': amount,
-                    'status': 'Success' if success else 'Failed',
-                    'hash': web3.to_hex(txn_hash),
-                    'explorer_url': f"{EXPLORER_URL}/tx/{web3.to_hex(txn_hash)}"
-                })
-            else:
-                # Update failed count immediately if transaction wasn't sent
-                with status_lock:
-                    failed_transactions_count += 1
-                    update_progress(initiated_transactions_count, total_transactions)
-                transactions.append({
-                    'index': index + 1,
-                    'recipient': recipient,
-                    'amount': amount,
-                    'status': 'Failed',
-                    'hash': 'N/A',
-                    'explorer_url': 'N/A',
-                    'error': error
-                })
-
-        except Exception as e:
-            # Update failed count immediately on exception
-            with status_lock:
-                failed_transactions_count += 1
-                update_progress(initiated_transactions_count, total_transactions)
-            transactions.append({
-                'index': index + 1,
-                'recipient': recipient,
-                'amount': amount,
-                'status': 'Failed',
-                'hash': 'N/A',
-                'explorer_url': 'N/A',
-                'error': str(e)
-            })
+# Print engine events for a single (non-silent) transfer
+def print_transfer_event(event):
+    if event.kind == events.SENT:
+        print(f"Transaction sent with hash: {event.record.hash}")
+        print("Waiting for transaction confirmation...")
+    elif event.kind == events.CONFIRMED:
+        print("Transaction successful! 🟢")
+        print(f"Transaction explorer URL: {event.record.explorer_url(EXPLORER_URL)}")
+    elif event.kind == events.FAILED:
+        record = event.record
+        if record.hash:
+            print("Transaction failed! 🔴")
+            print(f"Check transaction: {record.explorer_url(EXPLORER_URL)}")
+        else:
+            print(f"Transaction failed: {record.error}")
+
+# Simulate the batch and report problems; returns False when it must not be sent
+def preflight_passed(engine, transfers, token=None):
+    if PREFLIGHT == 'off':
+        return True
+    sample_size = None if PREFLIGHT == 'all' else PREFLIGHT_SAMPLE
+    print("\nRunning pre-flight simulation...")
+    report = run_preflight(engine, transfers, token, sample_size)
+    if report.ok:
+        print(f"Pre-flight passed: {report.checked} transfers simulated without problems 🟢")
+        return True
+    print(f"Pre-flight found {len(report.issues)} problem(s) in {report.checked} simulated transfers 🔴")
+    for issue in report.issues[:20]:
+        where = f"Row {issue.index} ({issue.recipient})" if issue.index else "Batch"
+        print(f"  {where}: {issue.problem}")
+    if len(report.issues) > 20:
+        print(f"  ... and {len(report.issues) - 20} more")
+    print("Aborting before any transaction was sent.")
+    return False
+
+# Forecast fees and duration before anything is sent; returns None when the
+# plan shows the batch cannot go through
+def forecast(engine, lanes, scheduler=None, fee_budget=None, label=""):
+    budget = fee_budget or FEE_BUDGET
+    print(f"\n{label}Forecasting fees and duration...")
+    plan = plan_batch(engine, lanes, parse_units(budget, NATIVE_DECIMALS) if budget else None,
+                      scheduler=scheduler)
+    for line in plan.describe():
+        print(f"  {label}{line}")
+    if plan.ok:
+        return plan
+    for issue in plan.issues:
+        print(f"  {label}Problem: {issue} 🔴")
+    print("Aborting before any transaction was sent.")
+    return None
 
+# Ask before every wave after the first, e.g. to top up the fee balance
+def confirm_wave(number, wave):
+    print(f"\n\nWave {number}: rows {wave.start + 1}-{wave.stop}, up to "
+          f"{Web3.from_wei(wave.max_fee, 'ether')} ETH in fees.")
+    return input("Send it? (1 = Yes, 2 = No): ").strip() == "1"
+
+# Keep a single progress line updated while a batch runs
+def print_batch_progress(event):
+    # Multi-chain jobs also emit per-chain progress; only the combined one is shown
+    if event.kind == events.PROGRESS and event.source is None:
+        progress = event.progress
+        print(f"\rProcessing transaction {min(progress.initiated, progress.total)}/{progress.total} | "
+              f"Successful: {progress.successful}/{progress.total} | "
+              f"Failed: {progress.failed}/{progress.total}", end="", flush=True)
+    elif event.kind == events.LOG:
+        print(f"\n{event.message}")
+
+# Rows left out of a total because their Amount cell is invalid; they fail
+# individually when the batch is sent
+def print_skipped(skipped, indent=""):
+    if skipped:
+        print(f"{indent}{len(skipped)} row(s) with an invalid amount are not included and will fail:")
+        for line in describe_skipped(skipped):
+            print(f"{indent}  {line}")
+
+def process_multi_transfer(engine, file_path, token=None):
+    results = None
+    # Summaries are streamed to a scratch directory during the run and moved
+    # into place if the user asks for them afterwards
+    export_dir = tempfile.mkdtemp(prefix="multisend_")
     try:
-        data = pd.read_excel(file_path)
-        if "Amount" not in data.columns or "Receiver" not in data.columns:
-            print("Excel file must have 'Amount' and 'Receiver' columns.")
+        transfers = read_transfers(file_path)
+        scheduler = scheduler_from_env(os.environ)
+        plan = forecast(engine, [(token, transfers)], scheduler)
+        if plan is None:
             return
-
-        total_amount_to_transfer = sum(data['Amount'])
+        total_amount_to_transfer, skipped = total_amount(transfers, token.decimals if token else NATIVE_DECIMALS)
         
         # Show transfer details and ask for confirmation
-        if token_contract:
-            token_symbol = token_contract.functions.symbol().call()
-            print(f"\nTotal amount to be transferred: {total_amount_to_transfer} {token_symbol}")
+        if token:
+            print(f"\nTotal amount to be transferred: {total_amount_to_transfer} {token.symbol}")
         else:
             print(f"\nTotal amount to be transferred: {total_amount_to_transfer} ETH")
+        print_skipped(skipped)
             
         print("\nDo you want to proceed?")
         print("1. Yes")
@@ -279,55 +196,67 @@ def process_multi_transfer(web3, transfer_function, file_path, chain_id, token_c
             print("Transaction cancelled by user.")
             return
 
-        transactions = []
+        if not preflight_passed(engine, transfers, token):
+            return
 
-        threads = []
-        
-        for index, row in data.iterrows():
-            recipient = row['Receiver']
-            amount = row['Amount']
-            
-            thread = threading.Thread(target=send_transaction,
-                                      args=(index,
-                                            recipient,
-                                            amount))
-            
-            threads.append(thread)
-            
-            thread.start()
-            
-            time.sleep(0.2)  
-        
-        for thread in threads:
-            thread.join()  
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        recipients = [recipient for recipient, _ in transfers]
+        token_address = token.address if token else None
+        if VERIFY_DISTRIBUTION:
+            scanner = BalanceScanner(engine.web3)
+            balances_before, block = scanner.snapshot(recipients, token_address)
+            print(f"Recorded balances of {len(balances_before)} recipients at block {block}")
+
+        all_writer = open_writer(os.path.join(export_dir, f"transaction_summary_{timestamp}.{EXPORT_FORMAT}"),
+                                 EXPLORER_URL, include_error=True)
+        failed_writer = open_writer(os.path.join(export_dir, f"failed_transactions_{timestamp}.{EXPORT_FORMAT}"),
+                                    EXPLORER_URL, statuses={FAILED})
+        try:
+            on_event = fan_out(print_batch_progress, all_writer.on_event, failed_writer.on_event)
+            if len(plan.waves) > 1:
+                results = run_plan(engine, [(token, transfers)], plan, on_event, scheduler, confirm_wave)
+            else:
+                results = engine.run_batch(transfers, token, on_event=on_event, scheduler=scheduler)
+        finally:
+            all_writer.close()
+            failed_writer.close()
         
-        # After all threads complete
+        # After all transfers complete
         print("\n")  # Move to new line after progress display
         print("\nSummary of Transactions:")
-        sorted_transactions = sorted(transactions, key=lambda x: x['index'])
-        for tx in sorted_transactions:
-            status_emoji = "🟢" if tx['status'] == 'Success' else "🔴"
+        for tx in results:
+            status_emoji = "🟢" if tx.status == 'Success' else "🔴"
             
             # Create a clickable hash that will open in explorer but only show the hash
-            if tx['hash'] != 'N/A':
+            if tx.hash:
                 # Using ANSI escape codes for making the hash clickable
-                hash_display = f"\033]8;;{EXPLORER_URL}/tx/{tx['hash']}\033\\{tx['hash']}\033]8;;\033\\"
+                hash_display = f"\033]8;;{tx.explorer_url(EXPLORER_URL)}\033\\{tx.hash}\033]8;;\033\\"
             else:
                 hash_display = 'N/A'
                 
-            print(f"Transaction {tx['index']} - "
-                  f"Recipient: {tx['recipient']}, "
-                  f"Amount: {tx['amount']}, "
-                  f"Status: {tx['status']} {status_emoji}, "
+            print(f"Transaction {tx.index} - "
+                  f"Recipient: {tx.recipient}, "
+                  f"Amount: {tx.amount}, "
+                  f"Status: {tx.status} {status_emoji}, "
                   f"Hash: {hash_display}")
 
-        print(f"\nTotal Transactions: {len(data)}")
-        print(f"Successful: {successful_transactions_count}")
-        print(f"Failed: {failed_transactions_count}")
-        print(f"Not Attempted: {not_attempted_transactions_count}")
+        print(f"\nTotal Transactions: {len(transfers)}")
+        print(f"Successful: {results.successful}")
+        print(f"Failed: {results.failed}")
+        print(f"Not Attempted: {len(transfers) - results.successful - results.failed}")
+
+        if VERIFY_DISTRIBUTION:
+            balances_after, block = scanner.snapshot(recipients, token_address)
+            to_base_units = token.to_base_units if token else native_to_base_units
+            report = diff_distribution(expected_amounts(engine.web3, transfers, to_base_units),
+                                       balances_before, balances_after)
+            report_file = f"distribution_report_{timestamp}.csv"
+            mismatches = write_diff_report(report, report_file)
+            print(f"\nBalance verification at block {block}: {len(report) - mismatches}/{len(report)} "
+                  f"recipients received the exact amount. Report: {report_file}")
 
         # Ask user about exporting summary
-        print("\nWould you like to export the transaction summary to an Excel file?")
+        print("\nWould you like to export the transaction summary?")
         print("1. No")
         print("2. Export all transactions")
         print("3. Export only failed transactions")
@@ -335,113 +264,137 @@ def process_multi_transfer(web3, transfer_function, file_path, chain_id, token_c
         export_choice = input("Enter your choice (1-3): ").strip()
         
         if export_choice in ['2', '3']:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # Prepare data for export
-            export_data = []
-            for tx in sorted_transactions:
-                if export_choice == '2' or (export_choice == '3' and tx['status'] == 'Failed'):
-                    if tx['hash'] != 'N/A':
-                        explorer_link = f'=HYPERLINK("{EXPLORER_URL}/tx/{tx["hash"]}", "{tx["hash"]}")'
-                    else:
-                        explorer_link = 'N/A'
-                        
-                    export_data.append({
-                        'Amount': tx['amount'],
-                        'Receiver': tx['recipient'],
-                        'Status': tx['status'],
-                        'Hash': tx['hash'],
-                        'View on Explorer': explorer_link
-                    })
-            
-            if export_data:
-                # Create DataFrame
-                df = pd.DataFrame(export_data)
-                
-                # Generate filename based on choice
-                filename = f"transaction_summary_{timestamp}.xlsx" if export_choice == '2' else f"failed_transactions_{timestamp}.xlsx"
-                
-                # Create a Pandas Excel writer using XlsxWriter as the engine
-                writer = pd.ExcelWriter(filename, engine='xlsxwriter')
-                
-                # Write the dataframe to the Excel file
-                df.to_excel(writer, index=False, sheet_name='Transactions')
-                
-                # Get the workbook and worksheet objects
-                workbook = writer.book
-                worksheet = writer.sheets['Transactions']
-                
-                # Set column widths based on content
-                for idx, col in enumerate(df.columns):
-                    # Get the maximum length of the column content
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),  # max length of values
-                        len(str(col))  # length of column name
-                    )
-                    # Add some padding
-                    worksheet.set_column(idx, idx, max_length + 5)
-                
-                # Save the Excel file
-                writer.close()
+            writer = all_writer if export_choice == '2' else failed_writer
+            if writer.rows:
+                filename = os.path.basename(writer.filename)
+                shutil.move(writer.filename, filename)
                 print(f"\nSummary exported to: {filename}")
-            else:
-                if export_choice == '3':
-                    print("\nNo failed transactions to export.")
+            elif export_choice == '3':
+                print("\nNo failed transactions to export.")
 
     except Exception as e:
         print(f"An error occurred: {str(e)}")
     finally:
-        if failed_transactions_count > 0:
+        shutil.rmtree(export_dir, ignore_errors=True)
+        if results is not None and results.failed > 0:
             print("\nFailed Transactions Details:")
-            for tx in sorted_transactions:
-                if tx['status'] == 'Failed':
-                    print(f"Recipient: {tx['recipient']}")
-                    print(f"Amount: {tx['amount']}")
-                    print(f"Error: {tx.get('error', 'Unknown error')}")
-                    print("---")
-
-# ERC-20 Token ABI 
-contract_abi = [
-    {
-      "constant": False,
-      "inputs": [
-          {"name": "to", "type": "address"},
-          {"name": "value", "type": "uint256"}
-      ],
-      "name": "transfer",
-      "outputs": [],
-      "payable": False,
-      "stateMutability": "nonpayable",
-      "type": "function"
-    },
-    {
-      "constant": True,
-      "inputs": [{"name": "_owner", "type": "address"}],
-      "name": "balanceOf",
-      "outputs": [{"name": "balance", "type": "uint256"}],
-      "payable": False,
-      "stateMutability": "view",
-      "type": "function"
-    },
-    {
-      "constant": True,
-      "inputs": [],
-      "name": "decimals",
-      "outputs": [{"name": "", "type": "uint8"}],
-      "payable": False,
-      "stateMutability": "view",
-      "type": "function"
-    },
-    {
-        "constant": True,
-        "inputs": [],
-        "name": "symbol",
-        "outputs": [{"name": "", "type": "string"}],
-        "payable": False,
-        "stateMutability": "view",
-        "type": "function"
-    }
-]
+            for tx in results.failures():
+                print(f"Recipient: {tx.recipient}")
+                print(f"Amount: {tx.amount}")
+                print(f"Error: {tx.error or 'Unknown error'}")
+                print("---")
+
+# Run every chain of a multi-chain job at once, each with its own engine
+def process_multichain_job(job):
+    dispatcher = MultiChainDispatcher(job, PRIVATE_KEY, {'token_cache': TOKEN_CACHE,
+                                                         'access_lists': access_lists_from_env(os.environ),
+                                                         'presigner': presigner_from_env(os.environ)})
+    runs = dispatcher.prepare()
+
+    print("\nJob contents:")
+    for run in runs:
+        for (token, transfers), item in zip(run.lanes, run.spec.items):
+            symbol = token.symbol if token else "native"
+            total, skipped = total_amount(transfers, token.decimals if token else NATIVE_DECIMALS)
+            print(f"  [{run.name}] {os.path.basename(item.sheet)}: {len(transfers)} transfers, {total} {symbol}")
+            print_skipped(skipped, "    ")
+    for run in runs:
+        options = run.spec.options
+        schedule = options.get('schedule', job.options.get('schedule'))
+        run.plan = forecast(run.engine, run.lanes, scheduler_from_options(schedule),
+                            options.get('fee_budget', job.options.get('fee_budget')), f"[{run.name}] ")
+        if run.plan is None:
+            return
+
+    print("\nDo you want to proceed?")
+    print("1. Yes")
+    print("2. No")
+    if input("Enter your choice (1 or 2): ").strip() != "1":
+        print("Job cancelled by user.")
+        return
+
+    for run in runs:
+        for token, transfers in run.lanes:
+            print(f"[{run.name}]", end=" ")
+            if not preflight_passed(run.engine, transfers, token):
+                return
+
+    writer = None
+    on_event = print_batch_progress
+    if job.export:
+        writer = open_writer(job.export, dispatcher.explorer_urls(), include_error=True,
+                             include_token=True, include_chain=True)
+        on_event = fan_out(print_batch_progress, writer.on_event)
+    try:
+        dispatcher.run(on_event=on_event)
+    finally:
+        if writer:
+            finish_export(writer)
+
+    print("\n")
+    for run in runs:
+        if run.error:
+            print(f"[{run.name}] Stopped: {run.error}")
+        if run.results is not None:
+            print(f"[{run.name}] Total: {len(run.results)} | Successful: {run.results.successful} | "
+                  f"Failed: {run.results.failed}")
+    if writer and writer.rows:
+        print(f"Summary exported to: {job.export}")
+
+# Run a YAML/JSON job: several token/sheet pairs interleaved on one nonce stream
+def process_job(engine, job_path):
+    try:
+        job = load_job(job_path)
+        if job.multichain:
+            process_multichain_job(job)
+            return
+        lanes = load_lanes(engine, job)
+
+        print("\nJob contents:")
+        for (token, transfers), item in zip(lanes, job.items):
+            symbol = token.symbol if token else "ETH"
+            total, skipped = total_amount(transfers, token.decimals if token else NATIVE_DECIMALS)
+            print(f"  {os.path.basename(item.sheet)}: {len(transfers)} transfers, {total} {symbol}")
+            print_skipped(skipped, "    ")
+        scheduler = scheduler_from_options(job.options.get('schedule')) or scheduler_from_env(os.environ)
+        plan = forecast(engine, lanes, scheduler, job.options.get('fee_budget'))
+        if plan is None:
+            return
+
+        print("\nDo you want to proceed?")
+        print("1. Yes")
+        print("2. No")
+        if input("Enter your choice (1 or 2): ").strip() != "1":
+            print("Job cancelled by user.")
+            return
+
+        for token, transfers in lanes:
+            if not preflight_passed(engine, transfers, token):
+                return
+
+        writer = None
+        on_event = print_batch_progress
+        if job.export:
+            writer = open_writer(job.export, EXPLORER_URL, include_error=True, include_token=True)
+            on_event = fan_out(print_batch_progress, writer.on_event)
+        try:
+            if len(plan.waves) > 1:
+                results = run_plan(engine, lanes, plan, on_event, scheduler, confirm_wave)
+            else:
+                results = engine.run_lanes(lanes, on_event=on_event, scheduler=scheduler)
+        finally:
+            if writer:
+                finish_export(writer)
+
+        print("\n")
+        print(f"Total Transactions: {len(results)}")
+        print(f"Successful: {results.successful}")
+        print(f"Failed: {results.failed}")
+        if writer and writer.rows:
+            print(f"Summary exported to: {job.export}")
+
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
 
 # Main Execution 
 if __name__ == "__main__":
@@ -452,21 +405,27 @@ if __name__ == "__main__":
     if not web3_instance:
         exit(1)  
     
-    MY_ADDRESS = web3_instance.eth.account.from_key(PRIVATE_KEY).address
+    # FINALITY in .env holds transfers as Included until they are final
+    engine = TransferEngine(web3_instance, PRIVATE_KEY, CHAIN_ID, EXPLORER_URL, token_cache=TOKEN_CACHE,
+                            finality=finality_from_env(web3_instance, os.environ),
+                            access_lists=access_lists_from_env(os.environ),
+                            presigner=presigner_from_env(os.environ))
+    MY_ADDRESS = engine.address
     print(f"Your address: {MY_ADDRESS}")
     
     while True:
         print("\nMain Menu:")
         print("1. Send Native Currency (like ETH)")
         print("2. Send ERC-20 Tokens")
-        print("3. Exit")
+        print("3. Run Job File (YAML/JSON)")
+        print("4. Exit")
         
         choice = input("Enter your choice: ").strip()
         
         if choice == "1":
             while True:  # Loop for native currency submenu
                 # Show ETH balance immediately after selecting native currency
-                eth_balance = web3_instance.eth.get_balance(MY_ADDRESS)
+                eth_balance = engine.native_balance()
                 eth_balance_in_eth = web3_instance.from_wei(eth_balance, 'ether')
                 print(f"\nYour current ETH balance: {eth_balance_in_eth} ETH")
                 
@@ -482,7 +441,8 @@ if __name__ == "__main__":
                 
                 elif sub_choice == "1":
                     try:
-                        amount = float(input("Enter the amount to send: "))
+                        amount = input("Enter the amount to send: ").strip()
+                        native_to_base_units(amount)  # validates the amount exactly
                         recipient_address = input("Enter the recipient's address: ")
                         
                         # Show transfer details and ask for confirmation
@@ -493,8 +453,7 @@ if __name__ == "__main__":
                         
                         confirm = input("Enter your choice (1 or 2): ").strip()
                         if confirm == "1":
-                            current_nonce = web3_instance.eth.get_transaction_count(MY_ADDRESS)
-                            send_native_currency(web3_instance, recipient_address, amount, CHAIN_ID, current_nonce)
+                            engine.send_native(recipient_address, amount, on_event=print_transfer_event)
                         else:
                             print("Transaction cancelled by user.")
                             
@@ -504,25 +463,21 @@ if __name__ == "__main__":
                         print(f"An error occurred: {str(e)}")
 
                 elif sub_choice == "2":
-                    file_path = input("Enter the path to the Excel file: ").strip()
+                    file_path = input("Enter the path to the Excel or CSV file: ").strip()
                     # Remove quotes if present at start and end
                     file_path = file_path.strip('"')
-                    process_multi_transfer(web3_instance, send_native_currency, file_path, CHAIN_ID)
+                    process_multi_transfer(engine, file_path)
 
                 else:
                     print("Invalid choice. Please try again.")
 
         elif choice == "2":
+            token = initialize_contract(engine)
             while True:  # Loop for token submenu
-                token_contract = initialize_contract(web3_instance)
-                
                 # Show token balance immediately after contract initialization
                 try:
-                    token_balance = token_contract.functions.balanceOf(MY_ADDRESS).call()
-                    token_decimals = token_contract.functions.decimals().call()
-                    token_symbol = token_contract.functions.symbol().call()
-                    token_balance_formatted = token_balance / 10**token_decimals
-                    print(f"\nYour current {token_symbol} balance: {token_balance_formatted} {token_symbol}")
+                    token_balance_formatted = token.from_base_units(engine.token_balance(token))
+                    print(f"\nYour current {token.symbol} balance: {token_balance_formatted} {token.symbol}")
                 except Exception as e:
                     print(f"Error fetching token balance: {str(e)}")
                 
@@ -538,20 +493,19 @@ if __name__ == "__main__":
                 
                 elif sub_choice == "1":
                     try:
-                        amount = float(input("Enter the amount to send: "))
+                        amount = input("Enter the amount to send: ").strip()
+                        token.to_base_units(amount)  # validates the amount exactly
                         recipient_address = input("Enter the recipient's address: ")
                         
                         # Show transfer details and ask for confirmation
-                        token_symbol = token_contract.functions.symbol().call()
-                        print(f"\nAmount to be transferred: {amount} {token_symbol}")
+                        print(f"\nAmount to be transferred: {amount} {token.symbol}")
                         print("\nDo you want to proceed?")
                         print("1. Yes")
                         print("2. No")
                         
                         confirm = input("Enter your choice (1 or 2): ").strip()
                         if confirm == "1":
-                            current_nonce = web3_instance.eth.get_transaction_count(MY_ADDRESS)
-                            send_tokens(web3_instance, token_contract, recipient_address, amount, CHAIN_ID, current_nonce)
+                            engine.send_token(token, recipient_address, amount, on_event=print_transfer_event)
                         else:
                             print("Transaction cancelled by user.")
                             
@@ -561,15 +515,19 @@ if __name__ == "__main__":
                         print(f"An error occurred: {str(e)}")
 
                 elif sub_choice == "2":
-                    file_path = input("Enter the path to the Excel file: ").strip()
+                    file_path = input("Enter the path to the Excel or CSV file: ").strip()
                     # Remove quotes if present at start and end
                     file_path = file_path.strip('"')
-                    process_multi_transfer(web3_instance, send_tokens, file_path, CHAIN_ID, token_contract)
+                    process_multi_transfer(engine, file_path, token)
 
                 else:
                     print("Invalid choice. Please try again.")
 
         elif choice == "3":
+            job_path = input("Enter the path to the job file: ").strip().strip('"')
+            process_job(engine, job_path)
+
+        elif choice == "4":
             print("Exiting the script. Goodbye!")
             break
 
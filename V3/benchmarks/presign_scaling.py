@@ -0,0 +1,56 @@
+# Preparation throughput of a large batch (calldata encoding + signing)
+# in-process versus sharded over 1..N worker processes with Presigner.
+# Offline, no RPC needed. Run from the V3 directory:
+#
+#   python benchmarks/presign_scaling.py [rows]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eth_account import Account
+from web3 import Web3
+
+from multisend.abi import ERC20_ABI
+from multisend.engine import Token, TransferEngine, lane_rows
+from multisend.presign import Presigner
+
+CHAIN_ID = 59144
+GAS_PRICE = Web3.to_wei('0.1', 'gwei')
+
+
+def main(count=100000):
+    web3 = Web3()
+    engine = TransferEngine(web3, Account.create().key, CHAIN_ID, gas_price=GAS_PRICE)
+    # No node: nonces start at 0
+    engine.nonces.next_nonce = 0
+    token = Token(web3.eth.contract(address=Account.create().address, abi=ERC20_ABI), 18, 'TKN',
+                  transfer_gas=51000)
+    transfers = [('0x' + os.urandom(20).hex(), '1.5') for _ in range(count // 2)]
+    rows = list(lane_rows([(None, transfers), (token, transfers)]))
+
+    start = time.perf_counter()
+    for nonce, row in enumerate(rows):
+        if row.token is None:
+            engine.sign_native(row.address, row.value, nonce)
+        else:
+            engine.sign_token(token, row.address, row.value, nonce)
+    baseline = time.perf_counter() - start
+    print(f"{len(rows)} rows, {os.cpu_count()} cores")
+    print(f"  in-process:   {len(rows) / baseline:10.0f} rows/s")
+
+    processes = 1
+    while processes <= (os.cpu_count() or 1):
+        start = time.perf_counter()
+        signed = sum(presigned is not None
+                     for _, presigned in Presigner(processes, min_rows=0).sign(engine, rows, [token]))
+        elapsed = time.perf_counter() - start
+        assert signed == len(rows), "rows left unsigned"
+        print(f"  {processes:2d} processes: {len(rows) / elapsed:10.0f} rows/s  ({baseline / elapsed:.1f}x, "
+              f"including worker start-up)")
+        processes *= 2
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -3,64 +3,177 @@ from tkinter import ttk, messagebox, filedialog
 import customtkinter as ctk
 from PIL import Image, ImageTk
 import threading
-from decimal import Decimal, getcontext
-import pandas as pd
 import os
 from dotenv import load_dotenv
 from web3 import Web3
-import time
 from datetime import datetime
 import queue
-
-# Increase decimal precision for small values
-getcontext().prec = 50
+import shutil
+import tempfile
+import time
+from array import array
+from multisend import events
+from multisend.accesslist import access_lists_from_env
+from multisend.amounts import NATIVE_DECIMALS, describe_skipped, parse_units, total_amount
+from multisend.engine import TransferEngine, native_to_base_units
+from multisend.events import fan_out
+from multisend.export import open_writer
+from multisend.finality import finality_from_env
+from multisend.planner import plan_batch, run_plan
+from multisend.preflight import run_preflight
+from multisend.presign import presigner_from_env
+from multisend.ratelimit import RateLimitedHTTPProvider, limiter_from_env
+from multisend.results import FAILED, INCLUDED, PENDING, SUCCESS, ResultStore
+from multisend.scheduler import scheduler_from_env
+from multisend.sheets import read_transfers
+from multisend.tokencache import token_cache_from_env
+from multisend.wallets import account_from_env
 
 # Set appearance mode and default color theme
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
-# ERC-20 Token ABI (from your original code)
-contract_abi = [
-    {
-      "constant": False,
-      "inputs": [
-          {"name": "to", "type": "address"},
-          {"name": "value", "type": "uint256"}
-      ],
-      "name": "transfer",
-      "outputs": [],
-      "payable": False,
-      "stateMutability": "nonpayable",
-      "type": "function"
-    },
-    {
-      "constant": True,
-      "inputs": [{"name": "_owner", "type": "address"}],
-      "name": "balanceOf",
-      "outputs": [{"name": "balance", "type": "uint256"}],
-      "payable": False,
-      "stateMutability": "view",
-      "type": "function"
-    },
-    {
-      "constant": True,
-      "inputs": [],
-      "name": "decimals",
-      "outputs": [{"name": "", "type": "uint8"}],
-      "payable": False,
-      "stateMutability": "view",
-      "type": "function"
-    },
-    {
-        "constant": True,
-        "inputs": [],
-        "name": "symbol",
-        "outputs": [{"name": "", "type": "string"}],
-        "payable": False,
-        "stateMutability": "view",
-        "type": "function"
-    }
-]
+# UI refresh rate for progress and console updates coming from worker threads
+FRAME_INTERVAL_MS = 33
+# Upper bound of console lines inserted per frame, so a burst never stalls Tk
+MAX_LOG_LINES_PER_FRAME = 500
+# Console keeps only the most recent lines; full history lives in the results table
+MAX_CONSOLE_LINES = 2000
+# Minimum time between rebuilding the results table's filtered/sorted view
+RESULTS_REFRESH_MS = 500
+
+STATUS_FILTERS = {"All": None, "Success": SUCCESS, "Failed": FAILED, "Included": INCLUDED, "Pending": PENDING}
+SORT_OPTIONS = {"Row": "index", "Nonce": "nonce", "Latency": "latency"}
+
+
+# Virtualized view over a ResultStore. The Treeview only ever holds
+# `visible_rows` items; scrolling re-fills those items from the store, so
+# memory stays constant whatever the batch size. Filtered or sorted views
+# of a large store take a moment to build, so they are built on a helper
+# thread and swapped in on a later frame; the old view stays on screen
+# meanwhile.
+class ResultsTable(ctk.CTkFrame):
+    COLUMNS = ("Row", "Receiver", "Amount", "Status", "Nonce", "Latency (s)", "Hash")
+
+    def __init__(self, master, visible_rows=20, **kwargs):
+        super().__init__(master, **kwargs)
+        self.visible_rows = visible_rows
+        self.store = None
+        self.view = array('L')
+        self.view_version = None
+        self.view_built_at = 0.0
+        # (store, settings, positions) finished by the helper thread
+        self.view_done = None
+        self.view_building = False
+        self.offset = 0
+
+        controls = ctk.CTkFrame(self)
+        controls.pack(fill="x", padx=5, pady=5)
+        self.filter_var = tk.StringVar(value="All")
+        self.sort_var = tk.StringVar(value="Row")
+        self.reverse_var = tk.BooleanVar(value=False)
+        ctk.CTkLabel(controls, text="Status:").pack(side="left", padx=5)
+        ctk.CTkOptionMenu(controls, values=list(STATUS_FILTERS), variable=self.filter_var,
+                          command=lambda _: self.refresh(force=True), width=110).pack(side="left")
+        ctk.CTkLabel(controls, text="Sort by:").pack(side="left", padx=5)
+        ctk.CTkOptionMenu(controls, values=list(SORT_OPTIONS), variable=self.sort_var,
+                          command=lambda _: self.refresh(force=True), width=110).pack(side="left")
+        ctk.CTkCheckBox(controls, text="Descending", variable=self.reverse_var,
+                        command=lambda: self.refresh(force=True)).pack(side="left", padx=10)
+        self.count_label = ctk.CTkLabel(controls, text="0 rows")
+        self.count_label.pack(side="right", padx=5)
+
+        body = ctk.CTkFrame(self)
+        body.pack(fill="both", expand=True)
+        self.tree = ttk.Treeview(body, columns=self.COLUMNS, show="headings", height=visible_rows)
+        for col, width in zip(self.COLUMNS, (60, 330, 110, 80, 70, 90, 520)):
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=width, stretch=(col == "Hash"))
+        self.scrollbar = ttk.Scrollbar(body, orient="vertical", command=self.on_scrollbar)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        # Fixed pool of row items, re-used for every window position
+        self.items = [self.tree.insert("", "end", values=()) for _ in range(visible_rows)]
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_by(3))
+
+    def set_store(self, store):
+        self.store = store
+        self.view = array('L')
+        self.offset = 0
+        self.refresh(force=True)
+
+    def _view_settings(self):
+        return (STATUS_FILTERS[self.filter_var.get()], SORT_OPTIONS[self.sort_var.get()],
+                self.reverse_var.get())
+
+    # Rebuild the position view when the store changed (throttled) and redraw
+    def refresh(self, force=False):
+        if self.store is None:
+            return
+        if force:
+            self.view_version = None
+            self.view_built_at = 0.0
+        settings = self._view_settings()
+        done, self.view_done = self.view_done, None
+        if done is not None and done[0] is self.store and done[1] == settings:
+            self.view = done[2]
+            self.count_label.configure(text=f"{len(self.view)} rows")
+        now = time.monotonic()
+        changed = self.store.version != self.view_version
+        if changed and not self.view_building and (now - self.view_built_at) * 1000 >= RESULTS_REFRESH_MS:
+            self.view_version = self.store.version
+            self.view_built_at = now
+            self.view_building = True
+            threading.Thread(target=self._build_view, args=(self.store, settings), daemon=True).start()
+        self.render()
+
+    # Runs on the helper thread; the result is picked up by `refresh`
+    def _build_view(self, store, settings):
+        try:
+            status, sort_by, reverse = settings
+            self.view_done = (store, settings, store.view(status=status, sort_by=sort_by, reverse=reverse))
+        finally:
+            self.view_building = False
+
+    def render(self):
+        total = len(self.view)
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        for slot, item in enumerate(self.items):
+            position = self.offset + slot
+            if position < total:
+                self.tree.item(item, values=self.row_values(self.store.get(self.view[position])))
+            else:
+                self.tree.item(item, values=())
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    @staticmethod
+    def row_values(record):
+        latency = f"{record.latency:.1f}" if record.latency is not None else ""
+        nonce = record.nonce if record.nonce is not None else ""
+        return (record.index, record.recipient, record.amount, record.status, nonce, latency,
+                record.hash or record.error or "")
+
+    def scroll_by(self, rows):
+        self.offset += rows
+        self.render()
+
+    def on_mousewheel(self, event):
+        self.scroll_by(-3 if event.delta > 0 else 3)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.offset = int(float(amount) * len(self.view))
+            self.render()
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_by(int(amount) * step)
+
 
 class TokenTransferApp(ctk.CTk):
     def __init__(self):
@@ -68,16 +181,20 @@ class TokenTransferApp(ctk.CTk):
         
         # Load environment variables
         load_dotenv()
-        self.PRIVATE_KEY = os.getenv('PRIVATE_KEY')
+        self.PRIVATE_KEY = account_from_env(os.environ)
         self.RPC_URL = os.getenv('RPC_URL')
         self.CHAIN_ID = int(os.getenv('CHAIN_ID'))
         self.EXPLORER_URL = os.getenv('EXPLORER_URL')
+        self.rate_limiter = limiter_from_env(os.environ)
+        self.token_cache = token_cache_from_env(os.environ)
         
-        # Initialize web3 and contract variables
+        # Initialize web3, engine and token variables
         self.web3 = None
-        self.token_contract = None
+        self.engine = None
+        self.token = None
         self.MY_ADDRESS = None
         self.processing_queue = queue.Queue()
+        self.event_bus = events.EventBus()
         
         # Setup main window
         self.title("Blockchain Token Transfer")
@@ -97,16 +214,30 @@ class TokenTransferApp(ctk.CTk):
         # Start web3 connection
         self.initialize_web3()
 
-        self.after(100, self.process_queue)
+        self.after(FRAME_INTERVAL_MS, self.process_queue)
     
+    # Runs once per frame on the Tk thread: apply the latest coalesced progress
+    # and flush up to MAX_LOG_LINES_PER_FRAME console messages in a single
+    # insert; the rest wait for the next frame
     def process_queue(self):
         try:
-            message = self.processing_queue.get_nowait()
-            self.log_message(message)
-        except queue.Empty:
-            pass
+            progress, drained = self.event_bus.drain(MAX_LOG_LINES_PER_FRAME)
+            if progress is not None:
+                self.show_progress(progress)
+
+            # Engine / scheduler notices (e.g. rows held back on a gas spike)
+            messages = [event.message for event in drained if event.kind == events.LOG]
+            while len(messages) < MAX_LOG_LINES_PER_FRAME:
+                try:
+                    messages.append(self.processing_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if messages:
+                self.log_message("\n".join(messages))
+
+            self.results_table.refresh()
         finally:
-            self.after(100, self.process_queue)
+            self.after(FRAME_INTERVAL_MS, self.process_queue)
 
     def setup_ui(self):
         # Configure main container grid
@@ -164,12 +295,17 @@ class TokenTransferApp(ctk.CTk):
         
         self.tabview.add("Native Currency")
         self.tabview.add("ERC-20 Tokens")
+        self.tabview.add("Results")
         
         # Native Currency tab UI
         self.create_native_currency_tab()
         
         # ERC-20 Tokens tab UI
         self.create_token_transfer_tab()
+
+        # Results tab UI
+        self.results_table = ResultsTable(self.tabview.tab("Results"))
+        self.results_table.pack(expand=True, fill="both", padx=10, pady=10)
         
         # Create console output
         self.create_console_output()
@@ -295,15 +431,23 @@ class TokenTransferApp(ctk.CTk):
     
     def log_message(self, message):
         self.console_text.insert("end", f"{message}\n")
+        # Trim the oldest lines so the console does not grow without limit
+        line_count = int(self.console_text.index("end-1c").split(".")[0])
+        if line_count > MAX_CONSOLE_LINES:
+            self.console_text.delete("1.0", f"{line_count - MAX_CONSOLE_LINES}.0")
         self.console_text.see("end")
-        self.update_idletasks()
 
     # Function implementations from your original code, adapted for GUI
     def initialize_web3(self):
         try:
-            self.web3 = Web3(Web3.HTTPProvider(self.RPC_URL))
+            self.web3 = Web3(RateLimitedHTTPProvider(self.RPC_URL, self.rate_limiter))
             if self.web3.is_connected():
-                self.MY_ADDRESS = self.web3.eth.account.from_key(self.PRIVATE_KEY).address
+                self.engine = TransferEngine(self.web3, self.PRIVATE_KEY, self.CHAIN_ID, self.EXPLORER_URL,
+                                             token_cache=self.token_cache,
+                                             finality=finality_from_env(self.web3, os.environ),
+                                             access_lists=access_lists_from_env(os.environ),
+                                             presigner=presigner_from_env(os.environ))
+                self.MY_ADDRESS = self.engine.address
                 self.connection_status.configure(text="Connected 🟢")
                 self.address_label.configure(text=f"Address: {self.MY_ADDRESS[:6]}...{self.MY_ADDRESS[-4:]}")
                 self.update_native_balance()
@@ -320,308 +464,190 @@ class TokenTransferApp(ctk.CTk):
     
     def initialize_contract(self):
         contract_address = self.contract_address_entry.get().strip()
-        if not self.web3:
+        if not self.engine:
             self.processing_queue.put("Connect to the blockchain first.")
             return
         try:
-            if not self.web3.is_checksum_address(contract_address):
-               contract_address = self.web3.to_checksum_address(contract_address)
-            self.token_contract = self.web3.eth.contract(address=contract_address, abi=contract_abi)
-            token_decimals = self.token_contract.functions.decimals().call()
-            token_symbol = self.token_contract.functions.symbol().call()
-            self.processing_queue.put(f"Contract initialized successfully! Token Decimals: {token_decimals}")
-            self.token_symbol_label.configure(text=f"Token Symbol: {token_symbol}")
+            self.token = self.engine.load_token(contract_address)
+            self.processing_queue.put(f"Contract initialized successfully! Token Decimals: {self.token.decimals}")
+            if self.token.fee_on_transfer:
+                self.processing_queue.put("Warning: this token takes a fee on transfer; "
+                                          "recipients receive less than the sheet amounts.")
+            self.token_symbol_label.configure(text=f"Token Symbol: {self.token.symbol}")
             self.update_token_balance()
         except Exception as e:
             self.processing_queue.put(f"Invalid contract address. Error: {e}. Please try again.")
             
     
     def update_token_balance(self):
-        if self.token_contract and self.MY_ADDRESS:
+        if self.token and self.engine:
             try:
-                token_balance = self.token_contract.functions.balanceOf(self.MY_ADDRESS).call()
-                token_decimals = self.token_contract.functions.decimals().call()
-                token_symbol = self.token_contract.functions.symbol().call()
-                token_balance_formatted = token_balance / 10**token_decimals
+                token_balance_formatted = self.token.from_base_units(self.engine.token_balance(self.token))
                 self.token_info_label.configure(
-                    text=f"Token Balance: {token_balance_formatted} {token_symbol}"
+                    text=f"Token Balance: {token_balance_formatted} {self.token.symbol}"
                 )
             except Exception as e:
                self.processing_queue.put(f"Failed to fetch token balance: {str(e)}")
 
+    # Log engine events of a single transfer to the console
+    def log_transfer_event(self, event):
+        record = event.record
+        if event.kind == events.SENT:
+            self.processing_queue.put(f"Transaction sent with hash: {record.hash}")
+            self.processing_queue.put("Waiting for transaction confirmation...")
+        elif event.kind == events.CONFIRMED:
+            self.processing_queue.put("Transaction successful! 🟢")
+            self.processing_queue.put(f"Transaction explorer URL: {record.explorer_url(self.EXPLORER_URL)}")
+        elif event.kind == events.FAILED:
+            if record.hash:
+                self.processing_queue.put("Transaction failed! 🔴")
+                self.processing_queue.put(f"Check transaction: {record.explorer_url(self.EXPLORER_URL)}")
+            else:
+                self.processing_queue.put(f"Transaction failed: {record.error}")
 
-    def send_native_currency(self, recipient_address, amount, nonce, silent=False):
-        try:
-            recipient_address = self.web3.to_checksum_address(recipient_address)
-            value_in_wei = self.web3.to_wei(amount, 'ether')
-            eth_balance = self.web3.eth.get_balance(self.MY_ADDRESS)
-
-            gas_price = self.web3.to_wei('1', 'gwei')
-            gas_limit = 21000
-            transaction_cost = gas_price * gas_limit
-            
-            if eth_balance < (transaction_cost + value_in_wei):
-                self.processing_queue.put(f"Insufficient ETH balance for the transaction! Address: {recipient_address}")
-                return False, "Insufficient ETH balance"
-
-            txn = {
-                'to': recipient_address,
-                'value': value_in_wei,
-                'gas': gas_limit,
-                'gasPrice': gas_price,
-                'nonce': nonce,
-                'chainId': self.CHAIN_ID
-            }
-            
-            signed_txn = self.web3.eth.account.sign_transaction(txn, self.PRIVATE_KEY)
-            txn_hash = self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-            if not silent:
-                self.processing_queue.put(f"Transaction sent with hash: {self.web3.to_hex(txn_hash)}")
-                self.processing_queue.put("Waiting for transaction confirmation...")
-            
-            receipt = self.web3.eth.wait_for_transaction_receipt(txn_hash, timeout=300)
-            
-            if not silent:
-                if receipt['status'] == 1:
-                    self.processing_queue.put("Transaction successful! 🟢")
-                    self.processing_queue.put(f"Transaction explorer URL: {self.EXPLORER_URL}/tx/{self.web3.to_hex(txn_hash)}")
-                else:
-                    self.processing_queue.put("Transaction failed! 🔴")
-                    self.processing_queue.put(f"Check transaction: {self.EXPLORER_URL}/tx/{self.web3.to_hex(txn_hash)}")
-            
-            return txn_hash, None
-
-        except Exception as e:
-            self.processing_queue.put(f"An error occurred while sending native currency: {str(e)}")
-            return None, str(e)
-
-    def send_tokens(self, recipient_address, amount, nonce, silent=False):
-        try:
-            recipient_address = self.web3.to_checksum_address(recipient_address)
-            token_decimals = self.token_contract.functions.decimals().call()
-            
-            value_in_wei = int(Decimal(amount) * Decimal(10 ** token_decimals))
-            token_balance = self.token_contract.functions.balanceOf(self.MY_ADDRESS).call()
-            
-            if token_balance < value_in_wei:
-                self.processing_queue.put(f"Insufficient token balance for the transaction! Address: {recipient_address}")
-                return False, "Insufficient token balance"
-            
-            gas_price = self.web3.to_wei('1', 'gwei')
-            gas_limit = 60000
-            
-            eth_balance = self.web3.eth.get_balance(self.MY_ADDRESS)
-            
-            if eth_balance < (gas_price * gas_limit):
-                self.processing_queue.put(f"Insufficient ETH balance for gas fees! Address: {recipient_address}")
-                return None, "Insufficient ETH for gas fees"
-            
-            txn = self.token_contract.functions.transfer(recipient_address, value_in_wei).build_transaction({
-                'chainId': self.CHAIN_ID,
-                'gas': gas_limit,
-                'gasPrice': gas_price,
-                'nonce': nonce,
-            })
-            
-            signed_txn = self.web3.eth.account.sign_transaction(txn, self.PRIVATE_KEY)
-            txn_hash = self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
-            if not silent:
-               self.processing_queue.put(f"Transaction sent with hash: {self.web3.to_hex(txn_hash)}")
-               self.processing_queue.put("Waiting for transaction confirmation...")
-            
-            receipt = self.web3.eth.wait_for_transaction_receipt(txn_hash, timeout=300)
-            
-            if not silent:
-                if receipt['status'] == 1:
-                    self.processing_queue.put("Transaction successful! 🟢")
-                    self.processing_queue.put(f"Transaction explorer URL: {self.EXPLORER_URL}/tx/{self.web3.to_hex(txn_hash)}")
-                else:
-                   self.processing_queue.put("Transaction failed! 🔴")
-                   self.processing_queue.put(f"Check transaction: {self.EXPLORER_URL}/tx/{self.web3.to_hex(txn_hash)}")
-            
-            return txn_hash, None
-
-        except Exception as e:
-            self.processing_queue.put(f"An error occurred while sending tokens: {str(e)}")
-            return None, str(e)
-
-    def process_multi_transfer(self, transfer_function, file_path):
+    def process_multi_transfer(self, file_path, token=None):
          self.progress_frame.pack(fill="x", pady=5)
          self.progress_bar.set(0)
          self.progress_label.configure(text="Preparing...")
-         threading.Thread(target=self._process_multi_transfer_thread, args=(transfer_function, file_path), daemon=True).start()
-
-    def _process_multi_transfer_thread(self, transfer_function, file_path):
-        successful_transactions_count = 0
-        failed_transactions_count = 0
-        current_nonce = self.web3.eth.get_transaction_count(self.MY_ADDRESS)
-        nonce_lock = threading.Lock()
-        transactions = []
-        
-        def send_transaction(index, recipient, amount, nonce):
-            nonlocal successful_transactions_count, failed_transactions_count
-
-            try:
-                if transfer_function == self.send_tokens:
-                    txn_hash, error = transfer_function(recipient, amount, nonce, silent=True)
-                else:
-                    txn_hash, error = transfer_function(recipient, amount, nonce, silent=True)
-                
-                if txn_hash:
-                    # Wait for transaction receipt
-                    receipt = self.web3.eth.wait_for_transaction_receipt(txn_hash, timeout=300)
-                    success = receipt['status'] == 1
-                    
-                    if success:
-                       successful_transactions_count += 1
-                    else:
-                        failed_transactions_count += 1
-                    
-                    transactions.append({
-                        'index': index + 1,
-                        'recipient': recipient,
-                        'amount': amount,
-                        'status': 'Success' if success else 'Failed',
-                        'hash': self.web3.to_hex(txn_hash),
-                        'explorer_url': f"{self.EXPLORER_URL}/tx/{self.web3.to_hex(txn_hash)}"
-                    })
-                else:
-                     failed_transactions_count += 1
-                     transactions.append({
-                        'index': index + 1,
-                        'recipient': recipient,
-                        'amount': amount,
-                        'status': 'Failed',
-                        'hash': 'N/A',
-                        'explorer_url': 'N/A',
-                        'error': error
-                    })
+         threading.Thread(target=self._process_multi_transfer_thread, args=(file_path, token), daemon=True).start()
 
-            except Exception as e:
-                failed_transactions_count += 1
-                transactions.append({
-                    'index': index + 1,
-                    'recipient': recipient,
-                    'amount': amount,
-                    'status': 'Failed',
-                    'hash': 'N/A',
-                    'explorer_url': 'N/A',
-                    'error': str(e)
-                })
+    def show_progress(self, progress):
+        if progress.total:
+            self.progress_bar.set(progress.initiated / progress.total)
+        self.progress_label.configure(
+            text=f"Processing transaction {min(progress.initiated, progress.total)}/{progress.total} | "
+                 f"Successful: {progress.successful} | Failed: {progress.failed}")
 
+    def _process_multi_transfer_thread(self, file_path, token):
         try:
             self.processing_queue.put("Preparing multi-transfer...")
-            data = pd.read_excel(file_path)
-            if "Amount" not in data.columns or "Receiver" not in data.columns:
-               self.processing_queue.put("Excel file must have 'Amount' and 'Receiver' columns.")
+            try:
+                transfers = read_transfers(file_path)
+            except ValueError as e:
+               self.processing_queue.put(str(e))
                self.after(0, self.progress_frame.pack_forget)
                return
 
-            total_amount = sum(data['Amount'])
+            total, skipped = total_amount(transfers, token.decimals if token else NATIVE_DECIMALS)
             
-            if transfer_function == self.send_tokens and self.token_contract:
-                token_symbol = self.token_contract.functions.symbol().call()
-                confirm_msg = f"Total amount to be transferred: {total_amount} {token_symbol}"
+            if token:
+                confirm_msg = f"Total amount to be transferred: {total} {token.symbol}"
             else:
-                confirm_msg = f"Total amount to be transferred: {total_amount} ETH"
+                confirm_msg = f"Total amount to be transferred: {total} ETH"
+            if skipped:
+                # Invalid Amount cells fail their own rows when sent
+                confirm_msg += (f"\n\n{len(skipped)} row(s) with an invalid amount are not included "
+                                f"and will fail:\n" + "\n".join(describe_skipped(skipped)))
+
+            # Fee and duration forecast, before anything is sent
+            self.processing_queue.put("Forecasting fees and duration...")
+            scheduler = scheduler_from_env(os.environ)
+            budget = os.getenv('FEE_BUDGET')
+            plan = plan_batch(self.engine, [(token, transfers)],
+                              parse_units(budget, NATIVE_DECIMALS) if budget else None, scheduler=scheduler)
+            for line in plan.describe():
+                self.processing_queue.put(line)
+            if not plan.ok:
+                for issue in plan.issues:
+                    self.processing_queue.put(f"Forecast: {issue}")
+                self.processing_queue.put("Aborting before any transaction was sent.")
+                self.after(0, self.progress_frame.pack_forget)
+                return
+            confirm_msg += "\n" + "\n".join(plan.describe()[2:4])
+            if len(plan.waves) > 1:
+                confirm_msg += f"\nSent in {len(plan.waves)} waves to stay within the fee budget."
             
             if not messagebox.askyesno("Confirm Transfer", f"{confirm_msg}\nDo you want to proceed?"):
                 self.processing_queue.put("Multi-transfer cancelled by user.")
                 self.after(0, self.progress_frame.pack_forget)
                 return
             
-           
-            total_transactions = len(data)
+            preflight = (os.getenv('PREFLIGHT') or 'sample').lower()
+            if preflight != 'off':
+                self.processing_queue.put("Running pre-flight simulation...")
+                sample_size = None if preflight == 'all' else int(os.getenv('PREFLIGHT_SAMPLE') or 256)
+                report = run_preflight(self.engine, transfers, token, sample_size)
+                if not report.ok:
+                    for issue in report.issues[:20]:
+                        where = f"Row {issue.index} ({issue.recipient})" if issue.index else "Batch"
+                        self.processing_queue.put(f"Pre-flight: {where}: {issue.problem}")
+                    self.processing_queue.put("Pre-flight failed. Aborting before any transaction was sent.")
+                    self.after(0, self.progress_frame.pack_forget)
+                    return
+                self.processing_queue.put(f"Pre-flight passed: {report.checked} transfers simulated 🟢")
+
             self.processing_queue.put("Starting Transfers")
-            
-            for index, row in data.iterrows():
-                recipient = row['Receiver']
-                amount = row['Amount']
-                progress = (index + 1) / total_transactions
-                self.after(0, lambda: self.progress_bar.set(progress))
-                self.after(0, lambda: self.progress_label.configure(
-                    text=f"Processing transaction {index + 1}/{total_transactions}"))
-
-                with nonce_lock:
-                    send_transaction(index,recipient,amount,current_nonce)
-                    current_nonce+=1
+            results = ResultStore()
+            self.after(0, self.results_table.set_store, results)
 
+            # Stream the summaries while the batch runs so exporting is just a move
+            export_dir = tempfile.mkdtemp(prefix="multisend_")
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            success_writer = open_writer(os.path.join(export_dir, f"transaction_summary_{timestamp}.xlsx"),
+                                         self.EXPLORER_URL, statuses={SUCCESS},
+                                         sheet_name='All Transactions', include_error=True)
+            failed_writer = open_writer(os.path.join(export_dir, f"failed_transactions_{timestamp}.xlsx"),
+                                        self.EXPLORER_URL, statuses={FAILED},
+                                        sheet_name='Failed Transactions', include_error=True)
+            try:
+                on_event = fan_out(self.event_bus.publish, success_writer.on_event, failed_writer.on_event)
+                if len(plan.waves) > 1:
+                    confirm_wave = lambda number, wave: messagebox.askyesno(
+                        "Next Wave", f"Send wave {number} of {len(plan.waves)} (rows {wave.start + 1}-{wave.stop}, "
+                        f"up to {Web3.from_wei(wave.max_fee, 'ether')} ETH in fees)?")
+                    results = run_plan(self.engine, [(token, transfers)], plan, on_event, scheduler,
+                                       confirm_wave, results)
+                else:
+                    results = self.engine.run_batch(transfers, token, results=results, on_event=on_event,
+                                                    scheduler=scheduler)
+            finally:
+                success_writer.close()
+                failed_writer.close()
             
             self.after(0, self.progress_frame.pack_forget)
             self.processing_queue.put("\nTransfer Summary:")
-            self.processing_queue.put(f"Total Transactions: {len(data)}")
-            self.processing_queue.put(f"Successful: {successful_transactions_count}")
-            self.processing_queue.put(f"Failed: {failed_transactions_count}")
+            self.processing_queue.put(f"Total Transactions: {len(transfers)}")
+            self.processing_queue.put(f"Successful: {results.successful}")
+            self.processing_queue.put(f"Failed: {results.failed}")
 
             if messagebox.askyesno("Export Results", "Would you like to export the transaction summary?"):
-                 self.after(0, lambda: self.export_results(transactions))
+                 self.after(0, self.export_results, export_dir, success_writer, failed_writer, timestamp)
+            else:
+                shutil.rmtree(export_dir, ignore_errors=True)
     
         except Exception as e:
             self.after(0, self.progress_frame.pack_forget)
             self.processing_queue.put(f"Multi-transfer error: {str(e)}")
 
-    def export_results(self, transactions):
+    def export_results(self, export_dir, success_writer, failed_writer, timestamp):
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = filedialog.asksaveasfilename(
                 defaultextension=".xlsx",
-                initialfile=f"transaction_summary_{timestamp}.xlsx",
-                filetypes=[("Excel files", "*.xlsx"), ("Excel files", "*.xls")]
+                initialfile=os.path.basename(success_writer.filename),
+                filetypes=[("Excel files", "*.xlsx")]
             )
             
             if filename:
-                export_data = []
-                failed_export_data = []
-                for tx in transactions:
-                    if tx['hash'] != 'N/A':
-                        explorer_link = f'=HYPERLINK("{tx["explorer_url"]}", "{tx["hash"]}")'
-                    else:
-                        explorer_link = 'N/A'
-                    
-                    if tx["status"] == "Success":
-                        export_data.append({
-                            'Amount': tx['amount'],
-                            'Receiver': tx['recipient'],
-                            'Status': tx['status'],
-                            'Hash': tx['hash'],
-                            'View on Explorer': explorer_link,
-                            'Error': tx.get('error', '')
-                        })
-                    elif tx["status"] == "Failed":
-                         failed_export_data.append({
-                            'Amount': tx['amount'],
-                            'Receiver': tx['recipient'],
-                            'Status': tx['status'],
-                            'Hash': tx['hash'],
-                            'View on Explorer': explorer_link,
-                            'Error': tx.get('error', '')
-                         })
-                # Create DataFrame and export for all
-                if export_data:
-                    df = pd.DataFrame(export_data)
-                    writer = pd.ExcelWriter(filename, engine='xlsxwriter')
-                    df.to_excel(writer, index=False, sheet_name='All Transactions')
-                    writer.close()
-
+                if success_writer.rows:
+                    shutil.move(success_writer.filename, filename)
                     self.processing_queue.put(f"Summary of successful transactions exported to: {filename}")
 
-                if failed_export_data:
+                if failed_writer.rows:
                    failed_filename = filename.replace(".xlsx", f"_failed_{timestamp}.xlsx")
-                   df_failed = pd.DataFrame(failed_export_data)
-                   writer_failed = pd.ExcelWriter(failed_filename, engine='xlsxwriter')
-                   df_failed.to_excel(writer_failed, index=False, sheet_name='Failed Transactions')
-                   writer_failed.close()
+                   shutil.move(failed_writer.filename, failed_filename)
                    self.processing_queue.put(f"Summary of failed transactions exported to: {failed_filename}")
-                if not export_data and not failed_export_data:
+                if not success_writer.rows and not failed_writer.rows:
                     self.processing_queue.put("No transactions to export")
         
         except Exception as e:
             self.processing_queue.put(f"Failed to export results: {str(e)}")
+        finally:
+            shutil.rmtree(export_dir, ignore_errors=True)
 
     def update_native_balance(self):
-        if self.web3 and self.MY_ADDRESS:
+        if self.engine:
             try:
-                balance = self.web3.eth.get_balance(self.MY_ADDRESS)
+                balance = self.engine.native_balance()
                 eth_balance = self.web3.from_wei(balance, 'ether')
                 self.native_balance_label.configure(
                     text=f"Current Balance: {eth_balance} ETH"
@@ -631,14 +657,14 @@ class TokenTransferApp(ctk.CTk):
 
     def native_single_transfer(self):
         try:
-            amount = float(self.native_amount_entry.get())
+            amount = self.native_amount_entry.get().strip()
+            native_to_base_units(amount)  # validates the amount exactly
             recipient = self.native_recipient_entry.get().strip()
             
             if messagebox.askyesno("Confirm Transfer", 
                                  f"Send {amount} ETH to {recipient}?"):
                 
-                current_nonce = self.web3.eth.get_transaction_count(self.MY_ADDRESS)
-                self.send_native_currency(recipient, amount, current_nonce)
+                self.engine.send_native(recipient, amount, on_event=self.log_transfer_event)
                 self.update_native_balance()
                 
         except ValueError:
@@ -648,20 +674,18 @@ class TokenTransferApp(ctk.CTk):
 
     def token_single_transfer(self):
         try:
-            if not self.token_contract:
+            if not self.token:
                 self.processing_queue.put("Please initialize contract first")
                 return
                 
-            amount = float(self.token_amount_entry.get())
+            amount = self.token_amount_entry.get().strip()
+            self.token.to_base_units(amount)  # validates the amount exactly
             recipient = self.token_recipient_entry.get().strip()
             
-            token_symbol = self.token_contract.functions.symbol().call()
-            
             if messagebox.askyesno("Confirm Transfer", 
-                                 f"Send {amount} {token_symbol} to {recipient}?"):
+                                 f"Send {amount} {self.token.symbol} to {recipient}?"):
                 
-                current_nonce = self.web3.eth.get_transaction_count(self.MY_ADDRESS)
-                self.send_tokens(recipient, amount, current_nonce)
+                self.engine.send_token(self.token, recipient, amount, on_event=self.log_transfer_event)
                 self.update_token_balance()
                 
         except ValueError:
@@ -671,26 +695,26 @@ class TokenTransferApp(ctk.CTk):
 
     def native_multi_transfer(self):
        file_path = filedialog.askopenfilename(
-           filetypes=[("Excel files", "*.xlsx"), ("Excel files", "*.xls")]
+           filetypes=[("Excel files", "*.xlsx"), ("Excel files", "*.xls"), ("CSV files", "*.csv")]
         )
        if file_path:
             try:
-               self.process_multi_transfer(self.send_native_currency, file_path)
+               self.process_multi_transfer(file_path)
                self.update_native_balance()
             except Exception as e:
                  self.processing_queue.put(f"Error during multi native transfer: {str(e)}")
 
     def token_multi_transfer(self):
-        if not self.token_contract:
+        if not self.token:
             self.processing_queue.put("Please initialize contract first")
             return
             
         file_path = filedialog.askopenfilename(
-             filetypes=[("Excel files", "*.xlsx"), ("Excel files", "*.xls")]
+             filetypes=[("Excel files", "*.xlsx"), ("Excel files", "*.xls"), ("CSV files", "*.csv")]
         )
         if file_path:
             try:
-                self.process_multi_transfer(self.send_tokens, file_path)
+                self.process_multi_transfer(file_path, self.token)
                 self.update_token_balance()
             except Exception as e:
                  self.processing_queue.put(f"Error during multi token transfer: {str(e)}")
@@ -0,0 +1,7 @@
+from .engine import NonceManager, Token, TransferEngine, connect
+from .events import Event, EventBus, Progress, fan_out
+from .export import ResultWriter, export_failed, export_results, finish_export, open_writer
+from .ratelimit import RateLimiter, RateLimitedHTTPProvider, TokenBucket, limiter_from_env
+from .results import ResultStore, TransferRecord
+from .sheets import read_transfers
+from .tokencache import TokenCache, token_cache_from_env
@@ -0,0 +1,134 @@
+import os
+
+from eth_utils import keccak
+
+from .abi import transfer_calldata
+from .addresses import checksum
+from .rawtx import encode_access_list
+
+# EIP-2929 / EIP-2930 gas: what listing an address or storage key costs up
+# front, and what its first access costs without / with the listing
+ACCESS_LIST_ADDRESS_GAS = 2400
+ACCESS_LIST_KEY_GAS = 1900
+COLD_ACCOUNT_GAS = 2600
+COLD_SLOAD_GAS = 2100
+WARM_ACCESS_GAS = 100
+# Storage slots tried when matching a recipient's key to a mapping
+MAPPING_SLOT_SEARCH = 256
+
+
+def _mapping_key(recipient, slot, slot_first):
+    word, slot_word = bytes(12) + recipient, slot.to_bytes(32, 'big')
+    # Solidity hashes key . slot, Vyper slot . key
+    return keccak(slot_word + word) if slot_first else keccak(word + slot_word)
+
+
+# (slot, slot_first) of the mapping whose entry for `recipient` is `key`
+def _find_mapping(recipient, key):
+    for slot in range(MAPPING_SLOT_SEARCH):
+        for slot_first in (False, True):
+            if _mapping_key(recipient, slot, slot_first) == key:
+                return slot, slot_first
+    return None
+
+
+def _bytes(value):
+    return bytes.fromhex(value[2:]) if isinstance(value, str) else bytes(value)
+
+
+def _as_entries(access_list):
+    entries = {}
+    for item in access_list:
+        entries.setdefault(_bytes(item['address']), set()).update(_bytes(key) for key in item['storageKeys'])
+    return entries
+
+
+# Gas an access list entry saves (negative: costs) on one transfer. The
+# token contract is warm anyway as the transaction's target, so only its
+# storage keys can pay for listing it.
+def _entry_gain(address, key_count, target):
+    gain = key_count * (COLD_SLOAD_GAS - WARM_ACCESS_GAS - ACCESS_LIST_KEY_GAS) - ACCESS_LIST_ADDRESS_GAS
+    if address != target:
+        gain += COLD_ACCOUNT_GAS - WARM_ACCESS_GAS
+    return gain
+
+
+# The access list of a token's transfers, generalized from two probe
+# recipients: storage keys both probes touched are shared by every row,
+# keys that differ are matched to the mapping they belong to (the
+# recipient's balance, a blocklist, ...) and derived per recipient.
+class AccessListPattern:
+    def __init__(self, entries, saving):
+        # [(address, shared keys, [(mapping slot, slot_first)])]
+        self.entries = entries
+        # Gas one transfer saves with the list, as measured
+        self.saving = saving
+
+    # [(address, keys)] for a transfer to `recipient` (20 bytes)
+    def for_recipient(self, recipient):
+        return [(address, keys + [_mapping_key(recipient, slot, slot_first) for slot, slot_first in mappings])
+                for address, keys, mappings in self.entries]
+
+    def encode(self, recipient):
+        return encode_access_list(self.for_recipient(recipient))
+
+    # JSON-RPC / eth_account form
+    def as_dicts(self, recipient):
+        return [{'address': checksum(address), 'storageKeys': ['0x' + key.hex() for key in keys]}
+                for address, keys in self.for_recipient(recipient)]
+
+
+def _create_access_list(engine, token, recipient):
+    result = engine.web3.eth.create_access_list({
+        'from': engine.address, 'to': token.address, 'gasPrice': engine.gas_price,
+        'data': transfer_calldata(recipient, 1)})
+    return _as_entries(result['accessList'])
+
+
+def _estimate(engine, token, recipient, access_list=None):
+    transaction = {'from': engine.address, 'to': token.address, 'data': transfer_calldata(recipient, 1)}
+    if access_list is not None:
+        transaction['accessList'] = access_list
+    return engine.web3.eth.estimate_gas(transaction)
+
+
+# Access list pattern for `token`'s transfers from the engine's account, or
+# None when the node cannot create access lists or the list does not save
+# gas. Entries that cost more than they save are dropped first, then the
+# remaining list is measured with eth_estimateGas against a third recipient
+# and kept only if that transfer is cheaper than without it.
+def access_list_pattern(engine, token):
+    first, second, third = (os.urandom(20) for _ in range(3))
+    try:
+        listed, other = _create_access_list(engine, token, first), _create_access_list(engine, token, second)
+    except Exception:
+        return None
+
+    target = token.address_bytes
+    entries = []
+    for address, keys in listed.items():
+        if address not in other:
+            # Only reached for this recipient (e.g. a contract it delegates to)
+            continue
+        shared = sorted(keys & other[address])
+        mappings = []
+        for key in sorted(keys - other[address]):
+            mapping = _find_mapping(first, key)
+            if mapping is not None and _mapping_key(second, *mapping) in other[address]:
+                mappings.append(mapping)
+        if _entry_gain(address, len(shared) + len(mappings), target) > 0:
+            entries.append((address, shared, mappings))
+    if not entries:
+        return None
+
+    pattern = AccessListPattern(entries, 0)
+    try:
+        pattern.saving = _estimate(engine, token, third) - _estimate(engine, token, third, pattern.as_dicts(third))
+    except Exception:
+        return None
+    return pattern if pattern.saving > 0 else None
+
+
+# ACCESS_LISTS=on tries an access list for every token loaded
+def access_lists_from_env(environ):
+    return (environ.get('ACCESS_LISTS') or 'off').strip().lower() in ('on', '1', 'true', 'yes')
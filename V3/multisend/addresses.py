@@ -0,0 +1,29 @@
+from functools import lru_cache
+
+from eth_utils import to_checksum_address
+
+# Distinct addresses whose checksum form is remembered for display / export
+CHECKSUM_CACHE_SIZE = 65536
+
+
+# 20-byte form of an address given as 0x-prefixed hex (any casing) or bytes;
+# None when it is not one. Rows are normalized once with this so nothing on
+# the sending path hashes an address again; the checksum casing is not
+# verified here (pre-flight reports mistyped ones).
+def address_bytes(address):
+    if isinstance(address, (bytes, bytearray)):
+        return bytes(address) if len(address) == 20 else None
+    text = str(address).strip()
+    if len(text) == 42 and text[:2].lower() == '0x':
+        try:
+            return bytes.fromhex(text[2:])
+        except ValueError:
+            pass
+    return None
+
+
+# EIP-55 text of a 20-byte address; memoized since exports and views format
+# the same recipients over and over
+@lru_cache(maxsize=CHECKSUM_CACHE_SIZE)
+def checksum(address):
+    return to_checksum_address(address)
@@ -0,0 +1,63 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+NATIVE_DECIMALS = 18
+
+_PLAIN_AMOUNT = re.compile(r'\+?(\d*)(?:\.(\d*))?')
+
+
+# Convert an amount as written in a sheet or prompt ("12.5", "0.000001",
+# "1e-6", 3) into integer base units. Plain decimal text is split and scaled
+# with integer arithmetic only, so 18-decimal amounts never pass through a
+# float; a value with more significant decimals than the token supports is
+# rejected rather than silently rounded.
+def parse_units(amount, decimals):
+    if isinstance(amount, int) and not isinstance(amount, bool):
+        if amount < 0:
+            raise ValueError(f"Negative amount {amount}")
+        return amount * 10 ** decimals
+    text = str(amount).strip()
+    match = _PLAIN_AMOUNT.fullmatch(text)
+    if match and (match.group(1) or match.group(2)):
+        whole, fraction = match.group(1) or '0', (match.group(2) or '').rstrip('0')
+        if len(fraction) > decimals:
+            raise ValueError(f"Amount {text} has more than {decimals} decimals")
+        return int(whole) * 10 ** decimals + int(fraction.ljust(decimals, '0') or 0)
+    # Scientific notation, as spreadsheets write very small or large floats
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount {text!r}")
+    if not value.is_finite() or value < 0:
+        raise ValueError(f"Invalid amount {text!r}")
+    scaled = value.scaleb(decimals)
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"Amount {text} has more than {decimals} decimals")
+    return int(scaled)
+
+
+def format_units(value, decimals):
+    whole, fraction = divmod(value, 10 ** decimals)
+    fraction = str(fraction).rjust(decimals, '0').rstrip('0') if decimals else ''
+    return f"{whole}.{fraction}" if fraction else str(whole)
+
+
+# Exact sum of (receiver, amount) rows as a display string, and the rows it
+# left out as (row number, amount, reason): a malformed Amount cell fails
+# only its own row when sending, so it must not stop the summary either
+def total_amount(transfers, decimals):
+    total, skipped = 0, []
+    for row, (_, amount) in enumerate(transfers, 1):
+        try:
+            total += parse_units(amount, decimals)
+        except (TypeError, ValueError) as e:
+            skipped.append((row, amount, str(e)))
+    return format_units(total, decimals), skipped
+
+
+# One line per skipped row of total_amount, at most `limit` of them
+def describe_skipped(skipped, limit=10):
+    lines = [f"row {row}: {reason}" for row, _, reason in skipped[:limit]]
+    if len(skipped) > limit:
+        lines.append(f"... and {len(skipped) - limit} more")
+    return lines
@@ -0,0 +1,137 @@
+import csv
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .abi import BALANCE_OF_SELECTOR, ERC20_ABI, GET_ETH_BALANCE_SELECTOR, MULTICALL3_ABI, MULTICALL3_ADDRESS
+from .addresses import address_bytes, checksum
+
+
+def _address_word(address):
+    return bytes(12) + address
+
+
+def _bytes(address):
+    raw = address_bytes(address)
+    if raw is None:
+        raise ValueError(f"Invalid address {address!r}")
+    return raw
+
+
+# Reads native or ERC-20 balances of many addresses through Multicall3
+# aggregate3, `chunk_size` addresses per eth_call with chunks in parallel.
+# All chunks are pinned to one block so a snapshot is consistent.
+class BalanceScanner:
+    def __init__(self, web3, multicall_address=MULTICALL3_ADDRESS, chunk_size=500, workers=8):
+        self.web3 = web3
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.multicall_address = web3.to_checksum_address(multicall_address)
+        self.multicall = web3.eth.contract(address=self.multicall_address, abi=MULTICALL3_ABI)
+        self.has_multicall = None
+
+    def _multicall_available(self):
+        if self.has_multicall is None:
+            self.has_multicall = len(self.web3.eth.get_code(self.multicall_address)) > 0
+        return self.has_multicall
+
+    def _chunk(self, target, selector, addresses, block):
+        calls = [(target, True, selector + _address_word(address)) for address in addresses]
+        results = self.multicall.functions.aggregate3(calls).call(block_identifier=block)
+        return [int.from_bytes(data[:32], 'big') if success and len(data) >= 32 else None
+                for success, data in results]
+
+    # Fallback for chains without Multicall3: one call per address
+    def _single(self, token, address, block):
+        address = checksum(address)
+        if token is None:
+            return self.web3.eth.get_balance(address, block)
+        return token.functions.balanceOf(address).call(block_identifier=block)
+
+    # Balances aligned with `addresses` (hex strings or 20 bytes); None where
+    # a token call failed. `token_address` None means the native currency.
+    def balances(self, addresses, token_address=None, block=None):
+        addresses = [_bytes(address) for address in addresses]
+        block = block if block is not None else self.web3.eth.block_number
+
+        if not self._multicall_available():
+            token = None
+            if token_address:
+                token = self.web3.eth.contract(address=self.web3.to_checksum_address(token_address), abi=ERC20_ABI)
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                return list(pool.map(lambda address: self._single(token, address, block), addresses))
+
+        if token_address:
+            target, selector = self.web3.to_checksum_address(token_address), BALANCE_OF_SELECTOR
+        else:
+            target, selector = self.multicall_address, GET_ETH_BALANCE_SELECTOR
+        chunks = [addresses[i:i + self.chunk_size] for i in range(0, len(addresses), self.chunk_size)]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = pool.map(lambda chunk: self._chunk(target, selector, chunk, block), chunks)
+            return [balance for chunk in results for balance in chunk]
+
+    # {address: balance} for the distinct addresses, plus the block it was read at
+    def snapshot(self, addresses, token_address=None, block=None):
+        block = block if block is not None else self.web3.eth.block_number
+        unique = list(OrderedDict.fromkeys(checksum(_bytes(address)) for address in addresses))
+        return dict(zip(unique, self.balances(unique, token_address, block))), block
+
+
+# (token, address) pairs of `rows` (LaneRows) whose recipient holds none of
+# that token, addresses as 20 bytes; native rows are only checked with
+# `include_native`. Rows with an invalid address are skipped, and so are
+# tokens whose scan fails.
+def empty_recipients(web3, rows, include_native=False, scanner=None):
+    by_token = {}
+    for row in rows:
+        if (row.token is not None or include_native) and row.address is not None:
+            by_token.setdefault(row.token, set()).add(row.address)
+    scanner = scanner or BalanceScanner(web3)
+    empty = set()
+    for token, addresses in by_token.items():
+        addresses = list(addresses)
+        try:
+            balances = scanner.balances(addresses, token.address if token else None)
+        except Exception:
+            continue
+        empty.update((token, address) for address, balance in zip(addresses, balances) if balance == 0)
+    return empty
+
+
+# Compare what each recipient should have received (base units, summed over
+# duplicate rows) with the change between two snapshots
+def diff_distribution(expected, before, after):
+    report = []
+    for address, amount in expected.items():
+        start, end = before.get(address), after.get(address)
+        if start is None or end is None:
+            report.append((address, amount, start, end, None, 'Unknown'))
+            continue
+        received = end - start
+        if received == amount:
+            result = 'OK'
+        elif received < amount:
+            result = 'Short'
+        else:
+            result = 'Over'
+        report.append((address, amount, start, end, received, result))
+    return report
+
+
+def expected_amounts(web3, transfers, to_base_units):
+    expected = OrderedDict()
+    for recipient, amount in transfers:
+        address = checksum(_bytes(recipient))
+        expected[address] = expected.get(address, 0) + to_base_units(amount)
+    return expected
+
+
+def write_diff_report(report, filename):
+    mismatches = 0
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Receiver', 'Expected', 'Before', 'After', 'Received', 'Result'])
+        for row in report:
+            writer.writerow(['' if value is None else value for value in row])
+            if row[-1] != 'OK':
+                mismatches += 1
+    return mismatches
@@ -0,0 +1,285 @@
+import argparse
+import os
+import secrets
+import sys
+
+from . import events
+from .accesslist import access_lists_from_env
+from .amounts import NATIVE_DECIMALS, parse_units
+from .engine import TransferEngine, connect
+from .events import fan_out
+from .export import finish_export, open_writer
+from .finality import finality_from_env
+from .jobs import load_job, load_lanes
+from .planner import plan_batch, run_plan
+from .preflight import run_preflight
+from .presign import presigner_from_env
+from .ratelimit import limiter_from_env
+from .scheduler import scheduler_from_env, scheduler_from_options
+from .tokencache import token_cache_from_env
+from .wallets import account_from_env
+
+# Exit codes: everything confirmed / some transfers failed / nothing was sent
+EXIT_OK = 0
+EXIT_FAILED_TRANSFERS = 1
+EXIT_ABORTED = 2
+
+
+def _log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def _load_env(path):
+    if path and os.path.exists(path):
+        from dotenv import load_dotenv
+        load_dotenv(path)
+
+
+# Progress goes to stderr: one rewritten line on a terminal, otherwise only
+# the failures so cron logs stay readable
+def _progress_printer(interactive):
+    def on_event(event):
+        if event.kind == events.PROGRESS and event.source is None and interactive:
+            progress = event.progress
+            print(f"\rSent {min(progress.initiated, progress.total)}/{progress.total} | "
+                  f"Successful: {progress.successful} | Failed: {progress.failed}",
+                  end="", file=sys.stderr, flush=True)
+        elif event.kind == events.LOG:
+            _log(f"\n{event.message}" if interactive else event.message)
+        elif event.kind == events.FAILED and not interactive:
+            record = event.record
+            prefix = f"[{event.source}] " if event.source else ""
+            _log(f"{prefix}Row {record.index} to {record.recipient} failed: {record.error}")
+    return on_event
+
+
+def _preflight_passed(engine, lanes, mode, sample_size, label=""):
+    if mode == 'off':
+        return True
+    for token, transfers in lanes:
+        report = run_preflight(engine, transfers, token, None if mode == 'all' else sample_size)
+        if report.ok:
+            continue
+        _log(f"{label}Pre-flight found {len(report.issues)} problem(s) in {report.checked} simulated transfers:")
+        for issue in report.issues:
+            where = f"Row {issue.index} ({issue.recipient})" if issue.index else "Batch"
+            _log(f"  {where}: {issue.problem}")
+        return False
+    return True
+
+
+def _summarize(name, results):
+    prefix = f"[{name}] " if name else ""
+    print(f"{prefix}Total: {len(results)} | Successful: {results.successful} | Failed: {results.failed}")
+
+
+# Rows of a planned job never sent because a wave was stopped (e.g. funds)
+def _unsent(plan, results):
+    if plan is None or results is None or len(results) >= plan.rows:
+        return 0
+    _log(f"{plan.rows - len(results)} row(s) were not sent")
+    return plan.rows - len(results)
+
+
+# Connect to the job's chain(s): (dispatcher, [(label, engine, lanes, options)]),
+# dispatcher None for a single-chain job configured from the environment
+def _prepare_job(job, private_key, token_cache):
+    if job.multichain:
+        from .multichain import MultiChainDispatcher
+
+        dispatcher = MultiChainDispatcher(job, private_key, {'token_cache': token_cache,
+                                                             'access_lists': access_lists_from_env(os.environ),
+                                                             'presigner': presigner_from_env(os.environ)})
+        runs = dispatcher.prepare()
+        return dispatcher, [(f"[{run.name}] ", run.engine, run.lanes, run.spec.options) for run in runs]
+    engine = _environment_engine(private_key, token_cache)
+    return None, [("", engine, load_lanes(engine, job), {})]
+
+
+# Engine for the chain configured by RPC_URL / CHAIN_ID / EXPLORER_URL
+def _environment_engine(private_key, token_cache):
+    rpc_url = os.environ.get('RPC_URL')
+    if not os.environ.get('CHAIN_ID'):
+        raise ValueError("Set RPC_URL and CHAIN_ID in the environment.")
+    web3 = connect(rpc_url, limiter_from_env(os.environ)) if rpc_url else None
+    if web3 is None:
+        raise ValueError(f"Cannot connect to RPC_URL {rpc_url!r}.")
+    return TransferEngine(web3, private_key, int(os.environ['CHAIN_ID']),
+                          os.environ.get('EXPLORER_URL') or '', token_cache=token_cache,
+                          finality=finality_from_env(web3, os.environ),
+                          access_lists=access_lists_from_env(os.environ),
+                          presigner=presigner_from_env(os.environ))
+
+
+# Fee budget in wei: command line, then the chain's and the job's
+# `fee_budget`, then FEE_BUDGET; all in native units
+def _fee_budget(args, job, options):
+    value = args.fee_budget or options.get('fee_budget') or job.options.get('fee_budget') \
+        or os.environ.get('FEE_BUDGET')
+    return parse_units(value, NATIVE_DECIMALS) if value else None
+
+
+def _job_scheduler(job, options):
+    schedule = options.get('schedule', job.options.get('schedule'))
+    return scheduler_from_options(schedule) or scheduler_from_env(os.environ)
+
+
+def _show_plan(plan, label):
+    for line in plan.describe():
+        _log(f"{label}{line}")
+    for issue in plan.issues:
+        _log(f"{label}Problem: {issue}")
+
+
+def plan_job(args):
+    _load_env(args.env)
+    job = load_job(args.job)
+    private_key = account_from_env(os.environ)
+    if not private_key:
+        _log("Set PRIVATE_KEY or MNEMONIC in the environment.")
+        return EXIT_ABORTED
+    _, targets = _prepare_job(job, private_key, token_cache_from_env(os.environ))
+    ok = True
+    for label, engine, lanes, options in targets:
+        plan = plan_batch(engine, lanes, _fee_budget(args, job, options), scheduler=_job_scheduler(job, options))
+        _show_plan(plan, label)
+        ok = ok and plan.ok
+    return EXIT_OK if ok else EXIT_ABORTED
+
+
+def run_job(args):
+    _load_env(args.env)
+    job = load_job(args.job)
+    export = args.export or job.export
+    private_key = account_from_env(os.environ)
+    if not private_key:
+        _log("Set PRIVATE_KEY or MNEMONIC in the environment.")
+        return EXIT_ABORTED
+    mode = args.preflight or (os.environ.get('PREFLIGHT') or 'sample').lower()
+    sample_size = args.sample or int(os.environ.get('PREFLIGHT_SAMPLE') or 256)
+    on_event = _progress_printer(sys.stderr.isatty() and not args.quiet)
+
+    dispatcher, targets = _prepare_job(job, private_key, token_cache_from_env(os.environ))
+    plans = []
+    for label, engine, lanes, options in targets:
+        if not _preflight_passed(engine, lanes, mode, sample_size, label):
+            return EXIT_ABORTED
+        # With a fee budget the job is planned up front and sent in waves
+        budget = _fee_budget(args, job, options)
+        plan = None
+        if budget is not None:
+            plan = plan_batch(engine, lanes, budget, scheduler=_job_scheduler(job, options))
+            _show_plan(plan, label)
+            if not plan.ok:
+                return EXIT_ABORTED
+        plans.append(plan)
+    if dispatcher:
+        for run, plan in zip(dispatcher.runs, plans):
+            run.plan = plan
+        explorer_url = dispatcher.explorer_urls()
+    else:
+        _, engine, lanes, options = targets[0]
+        explorer_url = engine.explorer_url
+
+    writer = None
+    if export:
+        writer = open_writer(export, explorer_url, include_error=True, include_token=True,
+                             include_chain=job.multichain)
+        on_event = fan_out(on_event, writer.on_event)
+    try:
+        if dispatcher:
+            dispatcher.run(on_event=on_event)
+        elif plans[0] is not None:
+            results = run_plan(engine, lanes, plans[0], on_event, _job_scheduler(job, options),
+                               lambda number, wave: _log(f"Starting wave {number} of {len(plans[0].waves)}"))
+        else:
+            results = engine.run_lanes(lanes, on_event=on_event, scheduler=_job_scheduler(job, options))
+    finally:
+        if writer:
+            finish_export(writer)
+        if sys.stderr.isatty() and not args.quiet:
+            print(file=sys.stderr)
+
+    failed = 0
+    if dispatcher:
+        for run in dispatcher.runs:
+            if run.error:
+                _log(f"[{run.name}] Stopped: {run.error}")
+                failed += 1
+            if run.results is not None:
+                _summarize(run.name, run.results)
+                failed += run.results.failed + _unsent(run.plan, run.results)
+    else:
+        _summarize(None, results)
+        failed = results.failed + _unsent(plans[0], results)
+    if writer and writer.rows:
+        print(f"Summary exported to: {export}")
+    return EXIT_FAILED_TRANSFERS if failed else EXIT_OK
+
+
+def serve(args):
+    from .daemon import daemon_from_env, make_server
+
+    _load_env(args.env)
+    private_key = account_from_env(os.environ)
+    if not private_key:
+        _log("Set PRIVATE_KEY or MNEMONIC in the environment.")
+        return EXIT_ABORTED
+    engine = _environment_engine(private_key, token_cache_from_env(os.environ))
+    daemon = daemon_from_env(engine, os.environ)
+    token = os.environ.get('DAEMON_TOKEN')
+    if not token and not args.socket:
+        # The TCP API is never served without a token: make one for this run
+        token = secrets.token_urlsafe(32)
+        _log(f"DAEMON_TOKEN not set; send 'Authorization: Bearer {token}' with every request")
+    server = make_server(daemon, (args.host, args.port), args.socket, token, os.getcwd(), args.verbose)
+    daemon.start()
+    where = args.socket or f"http://{args.host}:{args.port}"
+    _log(f"Serving jobs for {engine.address} on chain {engine.chain_id} at {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='multisend', description="Non-interactive batch transfers.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Send every transfer of a job file without prompting")
+    run.add_argument('--job', required=True, help="YAML or JSON job file")
+    run.add_argument('--env', default='.env', help="dotenv file with RPC_URL, CHAIN_ID, keys (default: .env)")
+    run.add_argument('--export', help="Summary file (.csv, .ndjson or .xlsx); overrides the job's export")
+    run.add_argument('--preflight', choices=('sample', 'all', 'off'),
+                     help="Pre-flight simulation (default: PREFLIGHT or sample)")
+    run.add_argument('--sample', type=int, help="Rows simulated per sheet in sample mode")
+    run.add_argument('--quiet', action='store_true', help="No progress line, only failures and the summary")
+    run.add_argument('--fee-budget', help="Fees per wave in native units; the job is sent in waves that fit it")
+    run.set_defaults(handler=run_job)
+
+    plan = commands.add_parser('plan', help="Forecast fees and duration of a job without sending anything")
+    plan.add_argument('--job', required=True, help="YAML or JSON job file")
+    plan.add_argument('--env', default='.env', help="dotenv file with RPC_URL, CHAIN_ID, keys (default: .env)")
+    plan.add_argument('--fee-budget', help="Fees per wave in native units (default: job fee_budget or FEE_BUDGET)")
+    plan.set_defaults(handler=plan_job)
+
+    daemon = commands.add_parser('serve', help="Keep a warm engine running and accept jobs over a local HTTP API")
+    daemon.add_argument('--env', default='.env', help="dotenv file with RPC_URL, CHAIN_ID, keys (default: .env)")
+    daemon.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: 127.0.0.1)")
+    daemon.add_argument('--port', type=int, default=8765, help="Port to listen on (default: 8765)")
+    daemon.add_argument('--socket', help="Listen on this Unix socket instead of TCP")
+    daemon.add_argument('--verbose', action='store_true', help="Log every API request")
+    daemon.set_defaults(handler=serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except (OSError, ValueError) as e:
+        _log(f"Error: {e}")
+        return EXIT_ABORTED
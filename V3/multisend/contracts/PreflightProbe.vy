@@ -0,0 +1,42 @@
+# pragma version ^0.4.0
+# Pre-flight probe. Never deployed: multisend.preflight injects its runtime
+# bytecode at the sender's own address through an eth_call state override, so
+# the transfers below run with the sender's real balances and msg.sender.
+
+interface IERC20:
+    def balanceOf(owner: address) -> uint256: view
+
+MAX_ROWS: constant(uint256) = 256
+
+# Amount each recipient actually received; max_value(uint256) marks a revert
+@external
+def probe_token(token: address, receivers: DynArray[address, MAX_ROWS],
+                amounts: DynArray[uint256, MAX_ROWS]) -> DynArray[uint256, MAX_ROWS]:
+    received: DynArray[uint256, MAX_ROWS] = []
+    for i: uint256 in range(len(receivers), bound=MAX_ROWS):
+        before: uint256 = staticcall IERC20(token).balanceOf(receivers[i])
+        ok: bool = False
+        response: Bytes[32] = b""
+        ok, response = raw_call(
+            token,
+            abi_encode(receivers[i], amounts[i], method_id=method_id("transfer(address,uint256)")),
+            max_outsize=32,
+            revert_on_failure=False,
+        )
+        if ok and len(response) > 0:
+            ok = convert(response, bool)
+        if not ok:
+            received.append(max_value(uint256))
+            continue
+        received.append(staticcall IERC20(token).balanceOf(receivers[i]) - before)
+    return received
+
+# Whether each recipient accepts the native transfer
+@external
+def probe_native(receivers: DynArray[address, MAX_ROWS],
+                 amounts: DynArray[uint256, MAX_ROWS]) -> DynArray[bool, MAX_ROWS]:
+    accepted: DynArray[bool, MAX_ROWS] = []
+    for i: uint256 in range(len(receivers), bound=MAX_ROWS):
+        ok: bool = raw_call(receivers[i], b"", value=amounts[i], revert_on_failure=False)
+        accepted.append(ok)
+    return accepted
@@ -0,0 +1,504 @@
+import hmac
+import itertools
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from . import events
+from .amounts import NATIVE_DECIMALS, parse_units
+from .events import Progress, fan_out
+from .export import finish_export, open_writer
+from .jobs import job_from_spec, load_job, load_lanes
+from .planner import plan_batch, run_plan
+from .preflight import run_preflight
+from .results import FAILED, INCLUDED, PENDING, SUCCESS, ResultStore
+from .scheduler import scheduler_from_env, scheduler_from_options
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED = 'finished'
+ERROR = 'error'
+CANCELLED = 'cancelled'
+DONE_STATES = (FINISHED, ERROR, CANCELLED)
+
+# Finished jobs kept (with their results) for GET /jobs/<id>/results
+JOB_HISTORY = 100
+# Log lines kept per job
+MAX_JOB_MESSAGES = 1000
+# Seconds between progress lines of GET /jobs/<id>/events while nothing changes
+STREAM_KEEPALIVE = 15
+
+
+# `path` (relative to `base_dir`) resolved, refusing anything outside
+# `base_dir` so API clients cannot read or overwrite arbitrary files
+def _inside(base_dir, path):
+    base = os.path.realpath(base_dir)
+    resolved = os.path.realpath(os.path.join(base, path))
+    if os.path.commonpath([base, resolved]) != base:
+        raise ValueError(f"Path {path!r} is outside the daemon's directory")
+    return resolved
+
+
+# One submitted job: its queue state, latest progress, log lines and results.
+# Engine events update it from worker threads; API readers wait on `changed`.
+class DaemonJob:
+    def __init__(self, job_id, job, name=None):
+        self.id = job_id
+        self.job = job
+        self.name = name or job_id
+        self.status = QUEUED
+        self.progress = Progress(0, 0, 0, 0)
+        self.messages = []
+        self.results = ResultStore()
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.version = 0
+        self.changed = threading.Condition()
+
+    def _touch(self):
+        self.version += 1
+        self.changed.notify_all()
+
+    def log(self, message):
+        with self.changed:
+            self.messages.append(message)
+            del self.messages[:-MAX_JOB_MESSAGES]
+            self._touch()
+
+    # Move a queued job to running; False when it was cancelled meanwhile
+    def claim(self):
+        with self.changed:
+            if self.status != QUEUED:
+                return False
+            self.status = RUNNING
+            self.started_at = time.time()
+            self._touch()
+            return True
+
+    def set_status(self, status, error=None):
+        with self.changed:
+            self.status = status
+            if error is not None:
+                self.error = error
+            if status in DONE_STATES:
+                self.finished_at = time.time()
+            self._touch()
+
+    def on_event(self, event):
+        if event.kind == events.LOG:
+            self.log(event.message)
+        elif event.progress is not None:
+            with self.changed:
+                self.progress = event.progress
+                self._touch()
+
+    # Block until the job changed after `version` (or `timeout` passed)
+    def wait(self, version, timeout):
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version or self.status in DONE_STATES, timeout)
+            return self.version
+
+    def summary(self, messages_from=0):
+        with self.changed:
+            return {
+                'id': self.id,
+                'name': self.name,
+                'status': self.status,
+                'total': self.progress.total,
+                'initiated': self.progress.initiated,
+                'successful': self.progress.successful,
+                'failed': self.progress.failed,
+                'error': self.error,
+                'messages': self.messages[messages_from:],
+                'submitted_at': self.submitted_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'version': self.version,
+            }
+
+
+# Long-running sender: one warm TransferEngine (RPC connection pool, nonce
+# counter, token metadata, in-flight window) serving a queue of jobs. Jobs
+# run one at a time, so they share the sender's nonce stream without gaps
+# or collisions and back-to-back distributions skip all startup work.
+class TransferDaemon:
+    def __init__(self, engine, preflight='sample', sample_size=256, scheduler=None, fee_budget=None):
+        self.engine = engine
+        self.preflight = preflight
+        self.sample_size = sample_size
+        self.scheduler = scheduler
+        # Default fee budget in wei for jobs without their own `fee_budget`
+        self.fee_budget = fee_budget
+        self.jobs = OrderedDict()
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.worker = None
+
+    def start(self):
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._work, name='multisend-daemon', daemon=True)
+            self.worker.start()
+
+    # Queue a job given as {"job": "path/to/job.yaml"} or an inline job spec
+    # ({"transfers": [...], ...}, paths relative to `base_dir`). The job
+    # file, its sheets and its export must all lie inside `base_dir`.
+    def submit(self, spec, base_dir='.'):
+        if not isinstance(spec, dict):
+            raise ValueError("Job must be a JSON object.")
+        name = spec.get('name')
+        if 'job' in spec:
+            if not isinstance(spec['job'], str):
+                raise ValueError("'job' must be a path to a job file.")
+            job = load_job(_inside(base_dir, spec['job']))
+        else:
+            job = job_from_spec({key: value for key, value in spec.items() if key != 'name'}, base_dir)
+        for path in [item.sheet for item in job.items] + ([job.export] if job.export else []):
+            _inside(base_dir, path)
+        if job.multichain:
+            raise ValueError("The daemon sends on its configured chain; run multi-chain jobs with 'run'.")
+        with self.lock:
+            daemon_job = DaemonJob(str(next(self.ids)), job, name)
+            self.jobs[daemon_job.id] = daemon_job
+            self._forget_old_jobs()
+        self.queue.put(daemon_job)
+        return daemon_job
+
+    def _forget_old_jobs(self):
+        done = [job_id for job_id, job in self.jobs.items() if job.status in DONE_STATES]
+        for job_id in done[:max(0, len(done) - JOB_HISTORY)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def queued(self):
+        return sum(1 for job in self.list() if job.status == QUEUED)
+
+    # Only jobs that have not started can be cancelled
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with job.changed:
+            if job.status != QUEUED:
+                return False
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            job._touch()
+        return True
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if not job.claim():
+                continue
+            try:
+                self._run(job)
+            except Exception as e:
+                job.set_status(ERROR, str(e))
+            else:
+                if job.status == RUNNING:
+                    job.set_status(FINISHED)
+            # A job that ended badly may have left the node's view of the
+            # nonce different from ours; the next job re-reads it
+            if job.status == ERROR or job.results.failed:
+                self.engine.nonces.resync()
+
+    def _passes_preflight(self, job, lanes):
+        mode = str(job.job.options.get('preflight', self.preflight)).lower()
+        if mode == 'off':
+            return True
+        sample_size = None if mode == 'all' else int(job.job.options.get('sample', self.sample_size))
+        for token, transfers in lanes:
+            report = run_preflight(self.engine, transfers, token, sample_size)
+            for issue in report.issues:
+                where = f"Row {issue.index} ({issue.recipient})" if issue.index else "Batch"
+                job.log(f"Pre-flight: {where}: {issue.problem}")
+            if not report.ok:
+                return False
+        return True
+
+    def _run(self, job):
+        lanes = load_lanes(self.engine, job.job)
+        if not self._passes_preflight(job, lanes):
+            job.set_status(ERROR, "Pre-flight failed; nothing was sent")
+            return
+        options = job.job.options
+        scheduler = scheduler_from_options(options.get('schedule')) or self.scheduler
+        budget = options.get('fee_budget')
+        budget = parse_units(budget, NATIVE_DECIMALS) if budget else self.fee_budget
+        plan = None
+        if budget is not None:
+            plan = plan_batch(self.engine, lanes, budget, scheduler=scheduler)
+            for line in plan.describe():
+                job.log(line)
+            if not plan.ok:
+                for issue in plan.issues:
+                    job.log(f"Forecast: {issue}")
+                job.set_status(ERROR, "Forecast found problems; nothing was sent")
+                return
+
+        on_event = job.on_event
+        writer = None
+        if job.job.export:
+            writer = open_writer(job.job.export, self.engine.explorer_url, include_error=True, include_token=True)
+            on_event = fan_out(on_event, writer.on_event)
+        try:
+            if plan is not None:
+                run_plan(self.engine, lanes, plan, on_event, scheduler, results=job.results)
+            else:
+                self.engine.run_lanes(lanes, on_event=on_event, results=job.results, scheduler=scheduler)
+        finally:
+            if writer:
+                finish_export(writer)
+
+
+def _record_row(record, explorer_url):
+    return {
+        'index': record.index,
+        'token': record.token.symbol if record.token else 'Native',
+        'amount': str(record.amount),
+        'recipient': record.recipient,
+        'status': record.status,
+        'hash': record.hash,
+        'nonce': record.nonce,
+        'explorer_url': record.explorer_url(explorer_url) if record.hash else None,
+        'error': record.error,
+    }
+
+
+# Local HTTP API of a TransferDaemon (JSON in, JSON / NDJSON out):
+#
+#   GET    /health                  chain, sender and queue length
+#   GET    /jobs                    every known job
+#   POST   /jobs                    queue {"job": "job.yaml"} or an inline job spec
+#   GET    /jobs/<id>               state and progress of one job
+#   GET    /jobs/<id>/events        NDJSON stream of state changes until the job ends
+#   GET    /jobs/<id>/results       NDJSON rows (?status=Failed for failures only)
+#   DELETE /jobs/<id>               cancel a job that has not started
+#
+# With a token configured, every request needs "Authorization: Bearer <token>"
+# (serve always sets one on TCP). POST bodies must be sent as
+# application/json, which a web page cannot do cross-origin without a
+# CORS preflight this server never answers, and on TCP the Host header
+# must name a loopback address or the listening host (DNS rebinding).
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'multisend'
+
+    @property
+    def daemon(self):
+        return self.server.daemon
+
+    # Unix sockets have no peer address
+    def address_string(self):
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message):
+        self._send_json(status, {'error': message})
+
+    def _host_allowed(self):
+        allowed = getattr(self.server, 'allowed_hosts', None)
+        if allowed is None:
+            return True
+        host = urlparse('//' + (self.headers.get('Host') or '')).hostname
+        if host in allowed:
+            return True
+        self._error(403, "Unexpected Host header")
+        return False
+
+    def _authorized(self):
+        if not self._host_allowed():
+            return False
+        token = self.server.token
+        if not token:
+            return True
+        header = self.headers.get('Authorization') or ''
+        if hmac.compare_digest(header.encode('utf-8'), f"Bearer {token}".encode('utf-8')):
+            return True
+        self._error(401, "Missing or wrong API token")
+        return False
+
+    def _route(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        return parts, parse_qs(url.query)
+
+    def _job(self, job_id):
+        job = self.daemon.get(job_id)
+        if job is None:
+            self._error(404, f"No job {job_id}")
+        return job
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        parts, query = self._route()
+        if parts == ['health']:
+            engine = self.daemon.engine
+            self._send_json(200, {'status': 'ok', 'chain_id': engine.chain_id, 'sender': engine.address,
+                                  'queued': self.daemon.queued()})
+        elif parts == ['jobs']:
+            self._send_json(200, [job.summary(len(job.messages)) for job in self.daemon.list()])
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self._job(parts[1])
+            if job:
+                self._send_json(200, job.summary())
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+            job = self._job(parts[1])
+            if job:
+                self._stream_events(job)
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'results':
+            job = self._job(parts[1])
+            status = (query.get('status') or [None])[0]
+            if job and status not in (None, SUCCESS, FAILED, INCLUDED, PENDING):
+                self._error(400, f"Unknown status {status!r}")
+            elif job:
+                self._stream_results(job, status)
+        else:
+            self._error(404, "Unknown endpoint")
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        parts, _ = self._route()
+        if parts != ['jobs']:
+            self._error(404, "Unknown endpoint")
+            return
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            self._error(415, "Send the job as Content-Type: application/json")
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            spec = json.loads(self.rfile.read(length) or b'null')
+            job = self.daemon.submit(spec, self.server.base_dir)
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            self._error(400, str(e))
+            return
+        self._send_json(202, job.summary())
+
+    def do_DELETE(self):
+        if not self._authorized():
+            return
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != 'jobs':
+            self._error(404, "Unknown endpoint")
+            return
+        cancelled = self.daemon.cancel(parts[1])
+        if cancelled is None:
+            self._error(404, f"No job {parts[1]}")
+        elif not cancelled:
+            self._error(409, "Job already started")
+        else:
+            self._send_json(200, self.daemon.get(parts[1]).summary())
+
+    def _start_stream(self):
+        # HTTP/1.0 without a length: the body ends when the connection closes
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+
+    def _write_line(self, body):
+        self.wfile.write(json.dumps(body).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+    # One summary line per change (carrying only new log lines) or keepalive
+    # interval, ending with the job's final state
+    def _stream_events(self, job):
+        self._start_stream()
+        messages_from = 0
+        try:
+            while True:
+                summary = job.summary(messages_from)
+                self._write_line(summary)
+                version = summary['version']
+                messages_from += len(summary['messages'])
+                if summary['status'] in DONE_STATES:
+                    return
+                job.wait(version, STREAM_KEEPALIVE)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def _stream_results(self, job, status):
+        self._start_stream()
+        explorer_url = self.daemon.engine.explorer_url
+        try:
+            for position in job.results.view(status):
+                self._write_line(_record_row(job.results.get(position), explorer_url))
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+
+class DaemonHTTPServer(ThreadingHTTPServer):
+    def __init__(self, address, daemon, token=None, base_dir='.', verbose=False):
+        if not token:
+            raise ValueError("A TCP daemon needs an API token; use the Unix socket to serve without one")
+        self.daemon = daemon
+        self.token = token
+        self.base_dir = base_dir
+        self.verbose = verbose
+        host = address[0].lower()
+        # Bound to every interface: the token is the only guard left
+        self.allowed_hosts = None if host in ('', '0.0.0.0', '::') else {'localhost', '127.0.0.1', '::1', host}
+        super().__init__(address, DaemonRequestHandler)
+
+
+class DaemonUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, daemon, token=None, base_dir='.', verbose=False):
+        self.daemon = daemon
+        self.token = token
+        self.base_dir = base_dir
+        self.verbose = verbose
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, DaemonRequestHandler)
+        os.chmod(path, 0o600)
+
+
+# Serve `daemon` on a TCP address ((host, port)) or, with `socket_path`, on
+# a Unix socket only the current user can open
+def make_server(daemon, address=('127.0.0.1', 8765), socket_path=None, token=None, base_dir='.',
+                verbose=False):
+    if socket_path:
+        return DaemonUnixServer(socket_path, daemon, token, base_dir, verbose)
+    return DaemonHTTPServer(address, daemon, token, base_dir, verbose)
+
+
+def fee_budget_from_env(environ):
+    value = environ.get('FEE_BUDGET')
+    return parse_units(value, NATIVE_DECIMALS) if value else None
+
+
+def daemon_from_env(engine, environ):
+    return TransferDaemon(engine, preflight=(environ.get('PREFLIGHT') or 'sample').lower(),
+                          sample_size=int(environ.get('PREFLIGHT_SAMPLE') or 256),
+                          scheduler=scheduler_from_env(environ), fee_budget=fee_budget_from_env(environ))
@@ -0,0 +1,629 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, getcontext
+from itertools import repeat
+
+from web3 import Web3
+from web3.exceptions import ProviderConnectionError, TimeExhausted, TransactionNotFound
+
+from .abi import ERC20_ABI, transfer_calldata
+from .accesslist import access_list_pattern
+from .addresses import address_bytes, checksum
+from .amounts import NATIVE_DECIMALS, parse_units
+from .events import CONFIRMED, FAILED as FAILED_EVENT, FINISHED, INCLUDED, LOG, PROGRESS, SENT, STARTED, Event, Progress
+from .inflight import InflightWindow, is_pool_full_error
+from .logverify import LogVerifier
+from .rawtx import LegacyTxEncoder
+from .ratelimit import RateLimitedHTTPProvider
+from .results import FAILED, PENDING, SUCCESS, ResultStore, TransferRecord
+
+# Increase decimal precision for small values
+getcontext().prec = 50
+
+DEFAULT_GAS_PRICE = Web3.to_wei('1', 'gwei')
+NATIVE_GAS_LIMIT = 21000
+TOKEN_GAS_LIMIT = 60000
+# Margin on top of a token's measured transfer gas
+TOKEN_GAS_HEADROOM = 1.25
+# Extra gas of a token transfer that creates a new holder (fresh storage
+# slot instead of updating an existing balance)
+NEW_HOLDER_GAS = 17100
+# Attempts per row when the node reports its pool full for this account
+POOL_FULL_RETRIES = 10
+
+
+# A send that failed without an answer from the node (timeout, connection
+# reset): the node may still have taken the transaction
+def is_unanswered_error(error):
+    return isinstance(error, (OSError, ProviderConnectionError))
+
+
+def native_to_base_units(amount):
+    return parse_units(amount, NATIVE_DECIMALS)
+
+
+# Open a rate-limited connection; returns None when the node is unreachable
+def connect(rpc_url, limiter=None):
+    web3 = Web3(RateLimitedHTTPProvider(rpc_url, limiter))
+    if not web3.is_connected():
+        return None
+    return web3
+
+
+# An initialized ERC-20 contract together with its metadata
+class Token:
+    def __init__(self, contract, decimals, symbol, name=None, transfer_gas=None, fee_on_transfer=None):
+        self.contract = contract
+        self.address = contract.address
+        self.address_bytes = bytes.fromhex(contract.address[2:])
+        self.decimals = decimals
+        self.symbol = symbol
+        self.name = name
+        # Gas of a transfer to a fresh address, measured with eth_estimateGas
+        self.transfer_gas = transfer_gas
+        # None until a pre-flight simulation has compared sent and received amounts
+        self.fee_on_transfer = fee_on_transfer
+        # AccessListPattern sent with every transfer when it saves gas
+        self.access_list = None
+
+    @property
+    def gas_limit(self):
+        if self.transfer_gas:
+            return int(self.transfer_gas * TOKEN_GAS_HEADROOM)
+        return TOKEN_GAS_LIMIT
+
+    def to_base_units(self, amount):
+        return parse_units(amount, self.decimals)
+
+    def from_base_units(self, value):
+        return Decimal(value) / Decimal(10 ** self.decimals)
+
+
+# Hands out consecutive nonces. Broadcasts happen while the nonce is held, so
+# transactions reach the node strictly in nonce order and a send that fails
+# never leaves a gap that would stall every later transaction.
+class NonceManager:
+    def __init__(self, web3, address):
+        self.web3 = web3
+        self.address = address
+        self.next_nonce = None
+        self.lock = threading.RLock()
+
+    @contextmanager
+    def hold(self):
+        with self.lock:
+            if self.next_nonce is None:
+                self.next_nonce = self.web3.eth.get_transaction_count(self.address, 'pending')
+            yield self.next_nonce
+            # Only reached when the body did not raise, i.e. the node took the nonce
+            self.next_nonce += 1
+
+    def resync(self):
+        with self.lock:
+            self.next_nonce = None
+
+    # The nonce the next broadcast will use, without taking it
+    def peek(self):
+        with self.lock:
+            if self.next_nonce is None:
+                self.next_nonce = self.web3.eth.get_transaction_count(self.address, 'pending')
+            return self.next_nonce
+
+
+# Native/token funds still available to a batch, so rows can be rejected
+# locally instead of re-reading balances over RPC for every transfer.
+# `tokens` maps token address to the sender's balance of that token.
+class _Budget:
+    def __init__(self, native, tokens=None):
+        self.native = native
+        self.tokens = dict(tokens or {})
+        self.lock = threading.Lock()
+
+    def take(self, native, token=None, amount=0):
+        with self.lock:
+            if token is not None and amount > self.tokens[token.address]:
+                return "Insufficient token balance"
+            if native > self.native:
+                return "Insufficient ETH for gas fees" if token is not None else "Insufficient ETH balance"
+            self.native -= native
+            if token is not None:
+                self.tokens[token.address] -= amount
+            return None
+
+    def refund(self, native, token=None, amount=0):
+        with self.lock:
+            self.native += native
+            if token is not None:
+                self.tokens[token.address] += amount
+
+
+# Per-run state shared by the worker threads of one batch
+class _Batch:
+    def __init__(self, results, budget, emit, total, run_total=None, started=0):
+        self.results = results
+        self.budget = budget
+        self.emit = emit
+        self.total = total
+        # When the batch is one wave of a larger run sharing `results`,
+        # progress counts the whole run, like the store's counters do
+        self.run_total = total if run_total is None else run_total
+        self.initiated = started
+        self.lock = threading.Lock()
+
+    def progress(self):
+        return Progress(self.run_total, self.initiated, self.results.successful, self.results.failed)
+
+
+# Round-robin over several row lists so every lane advances at the same pace
+def interleave(lanes):
+    iterators = [iter(lane) for lane in lanes]
+    while iterators:
+        remaining = []
+        for iterator in iterators:
+            for item in iterator:
+                yield item
+                remaining.append(iterator)
+                break
+        iterators = remaining
+
+
+# Integer base units of every row of a lane, converted once before sending.
+# Rows that do not parse get None and fail individually with the parse error.
+def base_units(token, transfers):
+    to_base_units = token.to_base_units if token else native_to_base_units
+    values = []
+    for _, amount in transfers:
+        try:
+            values.append(to_base_units(amount))
+        except ValueError:
+            values.append(None)
+    return values
+
+
+# Gas a transfer is expected to use (not the limit it is sent with). A
+# token's measured transfer gas is the new-holder case.
+def expected_transfer_gas(token, new_holder=True):
+    if token is None:
+        return NATIVE_GAS_LIMIT
+    if token.transfer_gas is None:
+        return TOKEN_GAS_LIMIT
+    gas = token.transfer_gas - (token.access_list.saving if token.access_list else 0)
+    if new_holder:
+        return gas
+    return max(NATIVE_GAS_LIMIT, gas - NEW_HOLDER_GAS)
+
+
+# One row of a run; `index` is its position in the interleaved stream,
+# `address` the recipient as 20 bytes (None if invalid) and `priority` /
+# `deadline` come from the sheet's optional scheduling columns
+LaneRow = namedtuple('LaneRow', ['index', 'token', 'recipient', 'amount', 'value', 'priority', 'deadline',
+                                 'address'])
+
+
+# Interleave (token, transfers) lanes into numbered LaneRows, converting
+# every amount to base units and every recipient to bytes once
+def lane_rows(lanes):
+    streams = []
+    for token, transfers in lanes:
+        streams.append(zip(repeat(token), transfers, base_units(token, transfers),
+                           getattr(transfers, 'priorities', None) or repeat(0),
+                           getattr(transfers, 'deadlines', None) or repeat(None)))
+    for index, (token, (recipient, amount), value, priority, deadline) in enumerate(interleave(streams)):
+        yield LaneRow(index + 1, token, recipient, amount, value, priority, deadline, address_bytes(recipient))
+
+
+def _ignore_event(event):
+    pass
+
+
+# Headless transfer engine shared by the CLI and the GUI. Transfers are sent
+# concurrently from a worker pool; only the broadcast itself is serialized
+# (in nonce order) while receipts are awaited in parallel.
+class TransferEngine:
+    def __init__(self, web3, private_key, chain_id, explorer_url=None, gas_price=None,
+                 max_workers=64, receipt_timeout=300, poll_latency=1.0, token_cache=None,
+                 inflight_window=None, drop_check_interval=60, finality=None, verify_logs=True,
+                 access_lists=False, presigner=None):
+        self.web3 = web3
+        # Accepts a raw key or an already derived account (e.g. from HDWalletSet)
+        if hasattr(private_key, 'sign_transaction'):
+            self.account = private_key
+        else:
+            self.account = web3.eth.account.from_key(private_key)
+        self.address = self.account.address
+        self.chain_id = chain_id
+        self.explorer_url = explorer_url
+        self.gas_price = gas_price or DEFAULT_GAS_PRICE
+        self.max_workers = max_workers
+        self.receipt_timeout = receipt_timeout
+        self.poll_latency = poll_latency
+        self.nonces = NonceManager(web3, self.address)
+        # Pending transactions of this sender are kept within the node's per-account limit
+        self.window = inflight_window or InflightWindow(maximum=max_workers)
+        self.drop_check_interval = drop_check_interval
+        self.tokens = {}
+        self.token_cache = token_cache
+        # LegacyTxEncoders by gas limit, for the gas price they were built with
+        self.encoders = {}
+        self.encoder_gas_price = None
+        # Token transfers confirmed from eth_getLogs instead of per-hash receipts
+        self.log_verifier = LogVerifier(self) if verify_logs else None
+        # FinalityTracker holding successful transfers until they are final;
+        # None reports Success as soon as the receipt says so
+        self.finality = finality
+        # Try an EIP-2930 access list for each token loaded (see multisend.accesslist)
+        self.access_lists = access_lists
+        # Presigner signing large batches ahead on worker processes (see multisend.presign)
+        self.presigner = presigner
+
+    # Token metadata is read once per contract and reused for every later
+    # batch; with a token cache it also survives across runs
+    def load_token(self, contract_address, refresh=False):
+        if not self.web3.is_checksum_address(contract_address):
+            contract_address = self.web3.to_checksum_address(contract_address)
+        token = None if refresh else self.tokens.get(contract_address)
+        if token is None:
+            contract = self.web3.eth.contract(address=contract_address, abi=ERC20_ABI)
+            cached = None
+            if self.token_cache and not refresh:
+                cached = self.token_cache.get(self.chain_id, contract_address)
+            if cached:
+                token = Token(contract, cached['decimals'], cached['symbol'], cached.get('name'),
+                              cached.get('transfer_gas'), cached.get('fee_on_transfer'))
+                if token.transfer_gas is None:
+                    token.transfer_gas = self.measure_transfer_gas(token)
+                    self.remember_token(token)
+            else:
+                token = self._read_token(contract)
+                self.remember_token(token, refresh=True)
+            if self.access_lists:
+                token.access_list = access_list_pattern(self, token)
+            self.tokens[contract_address] = token
+        return token
+
+    def _read_token(self, contract):
+        decimals = contract.functions.decimals().call()
+        symbol = contract.functions.symbol().call()
+        try:
+            name = contract.functions.name().call()
+        except Exception:
+            name = None
+        token = Token(contract, decimals, symbol, name)
+        token.transfer_gas = self.measure_transfer_gas(token)
+        return token
+
+    # Gas of sending one base unit to a never-used address (the costlier
+    # cold-storage case); None when it cannot be estimated, e.g. no balance
+    def measure_transfer_gas(self, token):
+        probe_recipient = self.web3.to_checksum_address('0x' + os.urandom(20).hex())
+        try:
+            return token.contract.functions.transfer(probe_recipient, 1).estimate_gas({'from': self.address})
+        except Exception:
+            return None
+
+    # Write the token's current metadata to the cache (no-op without one)
+    def remember_token(self, token, refresh=False):
+        if self.token_cache is None:
+            return
+        fields = {'symbol': token.symbol, 'name': token.name, 'transfer_gas': token.transfer_gas,
+                  'fee_on_transfer': token.fee_on_transfer}
+        if refresh:
+            fields['decimals'] = token.decimals
+        else:
+            fields = {key: value for key, value in fields.items() if value is not None}
+        self.token_cache.put(self.chain_id, token.address, **fields)
+
+    def native_balance(self):
+        return self.web3.eth.get_balance(self.address)
+
+    def token_balance(self, token):
+        return token.contract.functions.balanceOf(self.address).call()
+
+    def build_native(self, recipient, value, nonce):
+        return {
+            'to': recipient,
+            'value': value,
+            'gas': NATIVE_GAS_LIMIT,
+            'gasPrice': self.gas_price,
+            'nonce': nonce,
+            'chainId': self.chain_id,
+        }
+
+    def build_token(self, token, recipient, value, nonce):
+        return token.contract.functions.transfer(recipient, value).build_transaction({
+            'chainId': self.chain_id,
+            'gas': token.gas_limit,
+            'gasPrice': self.gas_price,
+            'nonce': nonce,
+        })
+
+    # Encoder for transactions with this gas limit, rebuilt whenever the gas
+    # price changes; None for an account without a raw key
+    def _encoder(self, gas):
+        if self.encoder_gas_price != self.gas_price:
+            self.encoders = {}
+            self.encoder_gas_price = self.gas_price
+        encoder = self.encoders.get(gas)
+        if encoder is None:
+            key = getattr(self.account, 'key', None)
+            if key is None:
+                return None
+            encoder = self.encoders[gas] = LegacyTxEncoder(key, self.chain_id, self.gas_price, gas)
+        return encoder
+
+    # Rows are signed from the recipient's 20 bytes: the transfer calldata is
+    # encoded by hand, so neither a checksum nor the contract layer is involved
+    def sign_native(self, address, value, nonce):
+        encoder = self._encoder(NATIVE_GAS_LIMIT)
+        if encoder is None:
+            return self.account.sign_transaction(self.build_native(checksum(address), value, nonce))
+        return encoder.sign(nonce, address, value)
+
+    def sign_token(self, token, address, value, nonce):
+        encoder = self._encoder(token.gas_limit)
+        if encoder is None:
+            transaction = self.build_token(token, checksum(address), value, nonce)
+            if token.access_list is not None:
+                transaction['accessList'] = token.access_list.as_dicts(address)
+            return self.account.sign_transaction(transaction)
+        if token.access_list is not None:
+            return encoder.sign_with_access_list(nonce, token.address_bytes, 0, transfer_calldata(address, value),
+                                                 token.access_list.encode(address))
+        return encoder.sign(nonce, token.address_bytes, 0, transfer_calldata(address, value))
+
+    # Sign and broadcast under the next nonce; the nonce is only consumed if
+    # the node accepted the transaction. A send that got no answer is looked
+    # up by hash before the row is given up, so a transaction the node did
+    # take never has its nonce handed to the next row.
+    def _submit(self, record, sign):
+        with self.nonces.hold() as nonce:
+            signed = sign(nonce)
+            try:
+                tx_hash = self.web3.eth.send_raw_transaction(signed.raw_transaction)
+            except Exception as e:
+                message = str(e).lower()
+                if 'already known' in message or (is_unanswered_error(e) and self._delivered(signed)):
+                    tx_hash = signed.hash
+                else:
+                    if 'nonce too low' in message or is_unanswered_error(e):
+                        self.nonces.resync()
+                    raise
+        record.nonce = nonce
+        record.hash = self.web3.to_hex(tx_hash)
+        record.sent_at = time.monotonic()
+        return signed.raw_transaction
+
+    # Whether the node holds a transaction whose send went unanswered. When it
+    # cannot be asked either, the transaction counts as sent: the receipt wait
+    # re-broadcasts it if it never arrived, while failing the row could lead
+    # to it being sent twice.
+    def _delivered(self, signed):
+        try:
+            self.web3.eth.get_transaction(signed.hash)
+        except TransactionNotFound:
+            return False
+        except Exception:
+            return True
+        return True
+
+    # Broadcast within the in-flight window. A full pool is not a failure:
+    # the window shrinks and the row is retried once an earlier one is mined.
+    def _broadcast(self, record, sign):
+        for attempt in range(POOL_FULL_RETRIES):
+            try:
+                return self._submit(record, sign)
+            except Exception as e:
+                if not is_pool_full_error(e) or attempt == POOL_FULL_RETRIES - 1:
+                    raise
+                self.window.rejected()
+                time.sleep(self.poll_latency)
+
+    # Wait for the receipt, checking now and then that the transaction is
+    # still known to the node; a dropped one is re-broadcast unchanged
+    def _await_receipt(self, record, raw_transaction):
+        deadline = time.monotonic() + self.receipt_timeout
+        while True:
+            timeout = min(self.drop_check_interval, deadline - time.monotonic())
+            try:
+                return self.web3.eth.wait_for_transaction_receipt(
+                    record.hash, timeout=max(timeout, 0), poll_latency=self.poll_latency)
+            except TimeExhausted:
+                if time.monotonic() >= deadline:
+                    raise
+            try:
+                self.web3.eth.get_transaction(record.hash)
+            except TransactionNotFound:
+                self.window.dropped()
+                try:
+                    self.web3.eth.send_raw_transaction(raw_transaction)
+                except Exception:
+                    # Already known / nonce used: the receipt poll settles it
+                    pass
+
+    def _transfer(self, record, batch):
+        raw_transaction = self._send(record, batch)
+        if raw_transaction is not None:
+            self._confirm(record, batch, raw_transaction)
+
+    # Take the row's funds and an in-flight slot and broadcast it; returns
+    # the raw transaction, or None once the row has failed. `presigned` is a
+    # (nonce, gas price, SignedRaw) prepared by a Presigner, used when the
+    # row gets exactly that nonce at the current gas price.
+    def _send(self, record, batch, presigned=None):
+        token = record.token
+        try:
+            with batch.lock:
+                batch.initiated += 1
+            batch.emit(Event(PROGRESS, progress=batch.progress()))
+
+            address = record.address
+            if address is None:
+                address = record.address = address_bytes(record.recipient)
+                if address is None:
+                    raise ValueError(f"Invalid recipient address {record.recipient!r}")
+            value = record.value
+            if token:
+                if value is None:
+                    value = token.to_base_units(record.amount)
+                cost = (self.gas_price * token.gas_limit, token, value)
+                sign = lambda nonce: self.sign_token(token, address, value, nonce)
+            else:
+                if value is None:
+                    value = native_to_base_units(record.amount)
+                cost = (self.gas_price * NATIVE_GAS_LIMIT + value,)
+                sign = lambda nonce: self.sign_native(address, value, nonce)
+            record.value = value
+            if presigned is not None:
+                sign = self._presigned_or(sign, *presigned)
+
+            error = batch.budget.take(*cost)
+            if error:
+                self._finish(record, batch, FAILED, error)
+                return None
+
+            self.window.acquire()
+            try:
+                raw_transaction = self._broadcast(record, sign)
+            except Exception:
+                batch.budget.refund(*cost)
+                self.window.release(False)
+                raise
+            batch.results.update(record)
+            batch.emit(Event(SENT, record=record))
+            return raw_transaction
+        except Exception as e:
+            if record.status == PENDING:
+                self._finish(record, batch, FAILED, str(e))
+            return None
+
+    def _presigned_or(self, sign, presigned_nonce, gas_price, signed):
+        return lambda nonce: signed if nonce == presigned_nonce and gas_price == self.gas_price else sign(nonce)
+
+    # Wait for a broadcast row to be mined and settle it
+    def _confirm(self, record, batch, raw_transaction):
+        token = record.token
+        try:
+            mined = False
+            try:
+                # Token rows of a batch are confirmed from the logs in bulk
+                if token and batch.total > 1 and self.log_verifier is not None:
+                    receipt = self.log_verifier.await_receipt(record, raw_transaction)
+                else:
+                    receipt = self._await_receipt(record, raw_transaction)
+                mined = True
+            finally:
+                self.window.release(mined)
+            record.gas_used = receipt['gasUsed']
+            record.latency = time.monotonic() - record.sent_at
+            if receipt['status'] == 1 and receipt.get('mismatch'):
+                # Mined, but the logs do not show the row's transfer arriving in
+                # full: the row stays successful, so it is never in a failed
+                # export to be sent (and paid) again, with the shortfall noted
+                record.error = receipt['mismatch']
+                batch.emit(Event(LOG, message=f"Row {record.index} to {record.recipient}: {record.error}"))
+            if receipt['status'] == 1 and self.finality is not None:
+                batch.results.include(record)
+                batch.emit(Event(INCLUDED, record=record))
+                self.finality.track(record, receipt, raw_transaction, batch, self._finish)
+            elif receipt['status'] == 1:
+                self._finish(record, batch, SUCCESS)
+            else:
+                self._finish(record, batch, FAILED, "Transaction reverted")
+        except Exception as e:
+            if record.status == PENDING:
+                self._finish(record, batch, FAILED, str(e))
+
+    def _await_finality(self, batch):
+        if self.finality is not None:
+            self.finality.wait(batch)
+
+    def _finish(self, record, batch, status, error=None):
+        batch.results.finalize(record, status, error)
+        batch.emit(Event(CONFIRMED if status == SUCCESS else FAILED_EVENT, record=record))
+        batch.emit(Event(PROGRESS, progress=batch.progress()))
+
+    def _new_batch(self, tokens, emit, total, results=None, run_total=None, started=0):
+        balances = {token.address: self.token_balance(token) for token in tokens if token}
+        budget = _Budget(self.native_balance(), balances)
+        return _Batch(results if results is not None else ResultStore(), budget, emit, total, run_total, started)
+
+    # Send one transfer and wait for its receipt
+    def transfer(self, recipient, amount, token=None, on_event=None):
+        batch = self._new_batch([token], on_event or _ignore_event, 1)
+        record = TransferRecord(1, recipient, amount, token)
+        batch.results.add(record)
+        self._transfer(record, batch)
+        self._await_finality(batch)
+        return record
+
+    def send_native(self, recipient, amount, on_event=None):
+        return self.transfer(recipient, amount, None, on_event)
+
+    def send_token(self, token, recipient, amount, on_event=None):
+        return self.transfer(recipient, amount, token, on_event)
+
+    # Send every (recipient, amount) pair concurrently; returns the ResultStore.
+    # Pass `results` to watch the store (e.g. from a UI) while the batch runs.
+    def run_batch(self, transfers, token=None, on_event=None, results=None, scheduler=None):
+        return self.run_lanes([(token, transfers)], on_event, results, scheduler)
+
+    # Send several (token, transfers) lanes as one interleaved stream on this
+    # sender's nonce sequence; `token` None means the native currency. A
+    # `scheduler` (see multisend.scheduler) decides the sending order.
+    def run_lanes(self, lanes, on_event=None, results=None, scheduler=None):
+        total = sum(len(transfers) for _, transfers in lanes)
+        return self.run_rows(lane_rows(lanes), {token for token, _ in lanes}, total,
+                             on_event, results, scheduler)
+
+    def _record(self, row):
+        record = TransferRecord(row.index, row.recipient, row.amount, row.token)
+        record.value = row.value
+        record.address = row.address
+        return record
+
+    # Rows signed ahead by the presigner's processes are broadcast from this
+    # thread, in nonce order; the pool only waits for their receipts
+    def _send_presigned(self, rows, tokens, batch, pool, slots, release):
+        for row, presigned in self.presigner.sign(self, rows, tokens):
+            record = self._record(row)
+            batch.results.add(record)
+            slots.acquire()
+            raw_transaction = self._send(record, batch, presigned)
+            if raw_transaction is None:
+                slots.release()
+                continue
+            pool.submit(self._confirm, record, batch, raw_transaction).add_done_callback(release)
+
+    # Send already numbered LaneRows (e.g. one wave of a BatchPlan); `tokens`
+    # are the tokens the rows use and `total` their count, for the budget
+    # and progress. For a wave, `run_total` is the whole run's row count and
+    # `started` the rows earlier waves already sent into `results`.
+    def run_rows(self, rows, tokens, total, on_event=None, results=None, scheduler=None, run_total=None, started=0):
+        emit = on_event or _ignore_event
+        if scheduler is not None:
+            rows = scheduler.schedule(rows, self, emit)
+        batch = self._new_batch(tokens, emit, total, results, run_total, started)
+        emit(Event(STARTED, progress=batch.progress()))
+
+        # Records are created only as rows are handed to the pool, and at most
+        # two per worker wait in its queue, so in-flight state stays bounded
+        # however long the sheet is
+        slots = threading.BoundedSemaphore(self.max_workers * 2)
+        release = lambda future: slots.release()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            if self.presigner is not None and self.presigner.applies(self, total):
+                self._send_presigned(rows, tokens, batch, pool, slots, release)
+            else:
+                for row in rows:
+                    record = self._record(row)
+                    batch.results.add(record)
+                    slots.acquire()
+                    pool.submit(self._transfer, record, batch).add_done_callback(release)
+        self._await_finality(batch)
+
+        emit(Event(FINISHED, progress=batch.progress()))
+        return batch.results
@@ -0,0 +1,98 @@
+import threading
+from collections import deque, namedtuple
+
+# Event kinds emitted by TransferEngine.run_batch
+STARTED = 'started'
+SENT = 'sent'
+# Mined, waiting for finality (only with a FinalityTracker)
+INCLUDED = 'included'
+CONFIRMED = 'confirmed'
+FAILED = 'failed'
+PROGRESS = 'progress'
+FINISHED = 'finished'
+LOG = 'log'
+
+Progress = namedtuple('Progress', ['total', 'initiated', 'successful', 'failed'])
+
+
+# A single engine notification. `record` is set for per-transfer events,
+# `progress` for progress/finished events and `message` for log lines.
+# `source` names the chain when several engines report to one callback.
+class Event:
+    __slots__ = ('kind', 'record', 'progress', 'message', 'source')
+
+    def __init__(self, kind, record=None, progress=None, message=None, source=None):
+        self.kind = kind
+        self.record = record
+        self.progress = progress
+        self.message = message
+        self.source = source
+
+    def __repr__(self):
+        return (f"Event({self.kind!r}, record={self.record!r}, progress={self.progress!r}, "
+                f"message={self.message!r}, source={self.source!r})")
+
+
+# Combine several `on_event` callbacks into one
+def fan_out(*callbacks):
+    callbacks = [callback for callback in callbacks if callback is not None]
+
+    def on_event(event):
+        for callback in callbacks:
+            callback(event)
+    return on_event
+
+
+# Wrap a callback so every event it receives is tagged with `source`
+def tagged(source, callback):
+    def on_event(event):
+        event.source = source
+        callback(event)
+    return on_event
+
+
+def combine_progress(progresses):
+    return Progress(*(sum(values) for values in zip(*progresses))) if progresses else Progress(0, 0, 0, 0)
+
+
+# Per-row event kinds; the ResultStore already holds every row's outcome
+ROW_EVENTS = frozenset({SENT, INCLUDED, CONFIRMED, FAILED})
+
+
+# Thread-safe hand-off between engine worker threads and a UI thread.
+# Progress events are coalesced (only the latest one is kept) and per-row
+# events are dropped as they are published, since the UI reads rows from
+# the ResultStore. What is left (log lines, start and finish) is queued
+# without a bound, so no log line is lost however fast a run goes. The
+# consumer polls at a fixed frame rate and applies a whole frame's worth of
+# updates at once instead of one callback per row.
+class EventBus:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.progress = None
+        self.pending = deque()
+
+    # Usable directly as an engine `on_event` callback
+    def publish(self, event):
+        if event.kind in ROW_EVENTS:
+            return
+        with self.lock:
+            if event.kind in (PROGRESS, STARTED, FINISHED) and event.progress is not None:
+                self.progress = event.progress
+                if event.kind == PROGRESS:
+                    return
+            self.pending.append(event)
+
+    def log(self, message):
+        self.publish(Event(LOG, message=message))
+
+    # Take the latest progress (None if unchanged) and up to `limit` buffered events
+    def drain(self, limit=None):
+        with self.lock:
+            progress, self.progress = self.progress, None
+            if limit is None or limit >= len(self.pending):
+                drained = list(self.pending)
+                self.pending.clear()
+            else:
+                drained = [self.pending.popleft() for _ in range(limit)]
+        return progress, drained
@@ -0,0 +1,163 @@
+import csv
+import json
+import os
+import threading
+
+from .events import CONFIRMED, FAILED as FAILED_EVENT
+from .results import FAILED
+
+COLUMNS = ['Amount', 'Receiver', 'Status', 'Hash', 'View on Explorer']
+
+# Fixed column widths: constant_memory xlsx must be laid out before any row is written
+COLUMN_WIDTHS = {'Chain': 16, 'Token': 12, 'Amount': 20, 'Receiver': 47, 'Status': 12, 'Hash': 71, 'View on Explorer': 71,
+                 'Error': 60}
+
+
+# Appends records to an export file as soon as they are finalized, so the file
+# is complete the moment a run ends and no history is kept in memory.
+# Subclasses implement _open/_write_row/_close for a concrete format.
+class ResultWriter:
+    def __init__(self, filename, explorer_url, statuses=None, include_error=False, sheet_name='Transactions',
+                 include_token=False, include_chain=False):
+        self.filename = filename
+        # A single explorer URL, or {chain name: explorer URL} for multi-chain runs
+        self.explorer_url = explorer_url
+        self.statuses = statuses
+        self.columns = ((['Chain'] if include_chain else []) + (['Token'] if include_token else [])
+                        + COLUMNS + (['Error'] if include_error else []))
+        self.sheet_name = sheet_name
+        self.rows = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        self._open()
+
+    # Engine `on_event` callback: export each transfer once it has a final status
+    def on_event(self, event):
+        if event.kind in (CONFIRMED, FAILED_EVENT):
+            self.write(event.record, event.source)
+
+    def write(self, record, source=None):
+        if self.statuses is not None and record.status not in self.statuses:
+            return
+        explorer_url = self.explorer_url.get(source) if isinstance(self.explorer_url, dict) else self.explorer_url
+        row = {
+            'Chain': source or '',
+            'Token': record.token.symbol if record.token else 'Native',
+            'Amount': record.amount,
+            'Receiver': record.recipient,
+            'Status': record.status,
+            'Hash': record.hash or 'N/A',
+            'View on Explorer': record.explorer_url(explorer_url),
+            'Error': record.error or '',
+        }
+        with self.lock:
+            self._write_row(row)
+            self.rows += 1
+
+    def close(self):
+        with self.lock:
+            if not self.closed:
+                self._close()
+                self.closed = True
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvResultWriter(ResultWriter):
+    def _open(self):
+        self.file = open(self.filename, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.columns)
+
+    def _write_row(self, row):
+        self.writer.writerow([row[col] for col in self.columns])
+        self.file.flush()
+
+    def _close(self):
+        self.file.close()
+
+
+class NdjsonResultWriter(ResultWriter):
+    def _open(self):
+        self.file = open(self.filename, 'w', encoding='utf-8')
+
+    def _write_row(self, row):
+        self.file.write(json.dumps({col: _jsonable(row[col]) for col in self.columns}) + '\n')
+        self.file.flush()
+
+    def _close(self):
+        self.file.close()
+
+
+# xlsxwriter in constant_memory mode: each row is flushed to disk as written
+class XlsxResultWriter(ResultWriter):
+    def _open(self):
+        import xlsxwriter
+
+        self.workbook = xlsxwriter.Workbook(self.filename, {'constant_memory': True})
+        self.worksheet = self.workbook.add_worksheet(self.sheet_name)
+        for idx, col in enumerate(self.columns):
+            self.worksheet.set_column(idx, idx, COLUMN_WIDTHS[col])
+            self.worksheet.write(0, idx, col)
+
+    def _write_row(self, row):
+        line = self.rows + 1
+        for idx, col in enumerate(self.columns):
+            value = row[col]
+            if col == 'View on Explorer' and row['Hash'] != 'N/A':
+                self.worksheet.write_url(line, idx, value, string=row['Hash'])
+            else:
+                self.worksheet.write(line, idx, _jsonable(value))
+
+    def _close(self):
+        self.workbook.close()
+
+
+WRITERS = {
+    '.csv': CsvResultWriter,
+    '.ndjson': NdjsonResultWriter,
+    '.jsonl': NdjsonResultWriter,
+    '.xlsx': XlsxResultWriter,
+}
+
+
+# Pick the writer from the file extension (.csv, .ndjson/.jsonl or .xlsx)
+def open_writer(filename, explorer_url, **kwargs):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Unsupported export format: {extension or filename}")
+    return WRITERS[extension](filename, explorer_url, **kwargs)
+
+
+def _jsonable(value):
+    if isinstance(value, (str, int, float)) or value is None:
+        return value
+    return str(value)
+
+
+# One-shot export of already finished records. Returns the number of rows
+# written; no file is left behind when nothing matched.
+def export_results(records, filename, explorer_url, statuses=None, sheet_name='Transactions',
+                   include_error=False):
+    writer = open_writer(filename, explorer_url, statuses=statuses, sheet_name=sheet_name,
+                         include_error=include_error)
+    for record in records:
+        writer.write(record)
+    return finish_export(writer)
+
+
+def export_failed(records, filename, explorer_url, **kwargs):
+    return export_results(records, filename, explorer_url, statuses={FAILED}, **kwargs)
+
+
+# Close a streaming writer and delete its file if no row was written
+def finish_export(writer):
+    rows = writer.close()
+    if rows == 0 and os.path.exists(writer.filename):
+        os.remove(writer.filename)
+    return rows
@@ -0,0 +1,198 @@
+import threading
+import time
+
+from web3.exceptions import BlockNotFound, TransactionNotFound
+
+from .events import LOG, Event
+from .results import FAILED, SUCCESS
+
+# Block tags a node reports as no longer subject to reorgs
+FINALITY_TAGS = ('safe', 'finalized')
+# Depth used instead when the node does not know the configured tag
+TAG_FALLBACK_CONFIRMATIONS = 12
+
+
+# A mined transfer waiting to become final
+class _Included:
+    __slots__ = ('record', 'raw_transaction', 'block_number', 'block_hash', 'batch', 'finish', 'dropped_at')
+
+    def __init__(self, record, raw_transaction, block_number, block_hash, batch, finish):
+        self.record = record
+        self.raw_transaction = raw_transaction
+        self.block_number = block_number
+        self.block_hash = block_hash
+        self.batch = batch
+        self.finish = finish
+        # Set while the transaction is out of the canonical chain
+        self.dropped_at = None
+
+
+# Holds successful receipts in the Included state until their block is
+# `confirmations` deep, or at or below the node's `tag` block (safe /
+# finalized). One background thread checks every tracked transfer at once
+# per new head: the canonical hash of each distinct block they were mined in
+# is fetched in a single batch request and compared with the receipt's, so
+# the cost grows with blocks, not transfers. A transfer whose block was
+# reorganized away is looked up again and, if no longer on chain, its signed
+# transaction is re-broadcast unchanged (same nonce) until it is re-included.
+class FinalityTracker:
+    def __init__(self, web3, confirmations=None, tag=None, poll_interval=2.0, reinclude_timeout=300):
+        if tag is not None and tag not in FINALITY_TAGS:
+            raise ValueError(f"Unknown finality tag {tag!r}; use one of {', '.join(FINALITY_TAGS)}")
+        self.web3 = web3
+        self.confirmations = max(1, int(confirmations or 1))
+        self.tag = tag
+        self.poll_interval = poll_interval
+        self.reinclude_timeout = reinclude_timeout
+        # Tracked entries in insertion order (dict keys, for O(1) removal)
+        self.pending = {}
+        self.batching = True
+        self.last_head = None
+        self.reorgs = 0
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def describe(self):
+        return f"'{self.tag}' block" if self.tag else f"{self.confirmations} confirmations"
+
+    # Start tracking a mined transfer; `finish(record, batch, status, error)`
+    # settles it once final (or failed)
+    def track(self, record, receipt, raw_transaction, batch, finish):
+        entry = _Included(record, raw_transaction, receipt['blockNumber'], bytes(receipt['blockHash']), batch, finish)
+        with self.condition:
+            self.pending[entry] = None
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='finality', daemon=True)
+                self.thread.start()
+
+    # Block until every transfer of `batch` is final or failed
+    def wait(self, batch):
+        with self.condition:
+            self.condition.wait_for(lambda: not any(entry.batch is batch for entry in self.pending))
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self.condition:
+                entries = list(self.pending)
+            try:
+                self.check(entries)
+            except Exception:
+                # RPC hiccup: the entries stay tracked and are checked next round
+                pass
+            with self.condition:
+                self.condition.notify_all()
+                if not self.pending:
+                    self.thread = None
+                    return
+
+    def _final_block(self, head):
+        if self.tag:
+            try:
+                return self.web3.eth.get_block(self.tag)['number']
+            except Exception:
+                self.tag = None
+                self.confirmations = max(self.confirmations, TAG_FALLBACK_CONFIRMATIONS)
+        return head - self.confirmations + 1
+
+    # Canonical hash of each block number (None past the head)
+    def _block_hashes(self, numbers):
+        if self.batching and len(numbers) > 1:
+            try:
+                with self.web3.batch_requests() as batch:
+                    for number in numbers:
+                        batch.add(self.web3.eth.get_block(number))
+                    blocks = batch.execute()
+                return {number: bytes(block['hash']) if block else None for number, block in zip(numbers, blocks)}
+            except Exception:
+                # Provider without batch support: one call per block from now on
+                self.batching = False
+        hashes = {}
+        for number in numbers:
+            try:
+                hashes[number] = bytes(self.web3.eth.get_block(number)['hash'])
+            except BlockNotFound:
+                hashes[number] = None
+        return hashes
+
+    # Check `entries` against the chain; returns those that were settled.
+    # Each one stops being tracked as it settles, and an RPC error on one
+    # entry leaves it for the next round without holding up the others.
+    def check(self, entries):
+        head = self.web3.eth.block_number
+        if head == self.last_head and all(entry.dropped_at is None for entry in entries):
+            return []
+        self.last_head = head
+        final_block = self._final_block(head)
+        hashes = self._block_hashes(sorted({entry.block_number for entry in entries
+                                            if entry.dropped_at is None}))
+        settled = []
+        for entry in entries:
+            try:
+                outcome = self._outcome(entry, hashes.get(entry.block_number), final_block)
+            except Exception:
+                continue
+            if outcome is not None:
+                self._settle(entry, *outcome)
+                settled.append(entry)
+        return settled
+
+    # (status, error) once `entry` is settled, None while it stays tracked
+    def _outcome(self, entry, block_hash, final_block):
+        if entry.dropped_at is None and block_hash != entry.block_hash:
+            self._reorged(entry)
+        if entry.dropped_at is not None:
+            return self._reinclude(entry)
+        if entry.block_number <= final_block:
+            return SUCCESS, None
+        return None
+
+    # Untrack `entry` before finishing it, so it can never be finished twice
+    def _settle(self, entry, status, error):
+        with self.condition:
+            self.pending.pop(entry, None)
+        entry.finish(entry.record, entry.batch, status, error)
+
+    def _reorged(self, entry):
+        self.reorgs += 1
+        entry.dropped_at = time.monotonic()
+        entry.batch.emit(Event(LOG, message=f"Row {entry.record.index}: block {entry.block_number} was "
+                                            f"reorganized away, re-checking {entry.record.hash}"))
+
+    # Find a reorganized transfer again, re-broadcasting it while it is off
+    # chain; (FAILED, error) once it has to be given up
+    def _reinclude(self, entry):
+        record = entry.record
+        try:
+            receipt = self.web3.eth.get_transaction_receipt(record.hash)
+        except TransactionNotFound:
+            receipt = None
+        if receipt is not None:
+            if receipt['status'] != 1:
+                return FAILED, "Reverted after a chain reorganization"
+            entry.block_number, entry.block_hash = receipt['blockNumber'], bytes(receipt['blockHash'])
+            entry.dropped_at = None
+            return None
+        try:
+            self.web3.eth.send_raw_transaction(entry.raw_transaction)
+        except Exception as e:
+            if 'nonce too low' in str(e).lower():
+                return FAILED, "Dropped by a chain reorganization; its nonce was used by another transaction"
+        if time.monotonic() - entry.dropped_at > self.reinclude_timeout:
+            return FAILED, "Not re-included after a chain reorganization"
+        return None
+
+
+# Tracker for a finality setting: a number of confirmations, 'safe' or
+# 'finalized'; None when receipts are final as soon as they succeed
+def finality_tracker(web3, setting):
+    text = str(setting).strip().lower() if setting is not None else ''
+    if text in ('', 'off', '0', '1'):
+        return None
+    if text in FINALITY_TAGS:
+        return FinalityTracker(web3, tag=text)
+    return FinalityTracker(web3, confirmations=int(text))
+
+
+def finality_from_env(web3, environ):
+    return finality_tracker(web3, environ.get('FINALITY'))
@@ -0,0 +1,67 @@
+import threading
+
+# Send errors meaning the node will not hold another pending transaction for
+# this account right now (geth, erigon, nethermind, besu wordings)
+POOL_FULL_ERRORS = ('txpool is full', 'transaction pool is full', 'account limit', 'too many pending',
+                    'pending transactions limit', 'exceeds the per-account')
+
+
+def is_pool_full_error(error):
+    message = str(error).lower()
+    return any(text in message for text in POOL_FULL_ERRORS)
+
+
+# How many of one sender's transactions may be broadcast but not yet mined.
+# Nodes cap pending transactions per account (geth: 16 executable slots by
+# default) and drop or reject the excess, so the window learns that cap: it
+# grows by one after every `limit` mined transactions (probing) and, when the
+# node rejects a send as full or silently drops one, shrinks to the number
+# the node was actually holding at that moment (AIMD, like RateLimiter).
+class InflightWindow:
+    def __init__(self, initial=16, minimum=1, maximum=64):
+        self.limit = max(minimum, min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.mined_streak = 0
+        self.rejections = 0
+        self.condition = threading.Condition()
+
+    def _wait_for_room(self):
+        while self.in_flight >= self.limit:
+            self.condition.wait()
+        self.in_flight += 1
+
+    def acquire(self):
+        with self.condition:
+            self._wait_for_room()
+
+    # Free a slot; `mined` slots count towards growing the window
+    def release(self, mined=False):
+        with self.condition:
+            self.in_flight -= 1
+            if mined:
+                self.mined_streak += 1
+                if self.mined_streak >= self.limit and self.limit < self.maximum:
+                    self.mined_streak = 0
+                    self.limit += 1
+            self.condition.notify_all()
+
+    def _shrink(self, held):
+        self.rejections += 1
+        self.mined_streak = 0
+        self.limit = max(self.minimum, min(self.limit, held))
+
+    # The node refused a send as full: give up the caller's slot, shrink to
+    # what the node was already holding and wait for one of those to be mined
+    def rejected(self):
+        with self.condition:
+            self.in_flight -= 1
+            self._shrink(self.in_flight)
+            self._wait_for_room()
+
+    # A broadcast transaction (still holding its slot) vanished from the
+    # node's pool, so the node kept one fewer than we had in flight
+    def dropped(self):
+        with self.condition:
+            self._shrink(self.in_flight - 1)
@@ -0,0 +1,129 @@
+import json
+import os
+from collections import namedtuple
+
+from .sheets import read_transfers
+
+# One token/sheet pair of a job; `token` None means the native currency and
+# `priority` applies to the rows of a sheet without a Priority column
+JobItem = namedtuple('JobItem', ['sheet', 'token', 'priority'], defaults=(None,))
+
+# One target chain of a multi-chain job, with its own connection settings
+ChainSpec = namedtuple('ChainSpec', ['name', 'rpc_url', 'chain_id', 'explorer_url', 'items', 'options'])
+
+
+# A distribution job read from YAML or JSON:
+#
+#   transfers:
+#     - sheet: community.xlsx
+#       token: "0x1234..."
+#     - sheet: partners.xlsx        # no token: native currency
+#   export: job_summary.csv          # optional streaming summary
+#   schedule:                        # optional, see multisend.scheduler
+#     policy: priority
+#     max_gas_price_gwei: 30         # hold rows below min_priority above this
+#     min_priority: 1
+#   fee_budget: 0.05                 # optional, native units of fees per wave,
+#                                    # see multisend.planner
+#
+# A transfer entry may also set `priority: 2`, used for every row of a sheet
+# that has no Priority column of its own.
+#
+# A multi-chain job lists `chains` instead, each with its own transfers:
+#
+#   chains:
+#     - name: linea
+#       rpc_url: https://rpc.linea.build
+#       chain_id: 59144
+#       explorer_url: https://lineascan.build
+#       read_rps: 25                  # optional per-chain RPC budgets
+#       send_rps: 10
+#       gas_price_gwei: 0.1           # optional
+#       fee_budget: 0.01              # optional, overrides the job's
+#       finality: 20                  # optional: confirmations, safe or finalized
+#       transfers:
+#         - sheet: linea.xlsx
+#           token: "0x1234..."
+#
+# Sheet and export paths are relative to the job file.
+class Job:
+    def __init__(self, items, export=None, options=None, chains=None):
+        self.items = items
+        self.export = export
+        self.options = options or {}
+        self.chains = chains or []
+
+    @property
+    def multichain(self):
+        return bool(self.chains)
+
+
+def _read_spec(path):
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def _read_items(entries, base_dir):
+    if not entries:
+        raise ValueError("Job file must contain a non-empty 'transfers' list.")
+    items = []
+    for entry in entries:
+        if not isinstance(entry, dict) or 'sheet' not in entry:
+            raise ValueError(f"Every job transfer needs a 'sheet': {entry!r}")
+        token = entry.get('token')
+        if token in ('', 'native'):
+            token = None
+        priority = entry.get('priority')
+        items.append(JobItem(os.path.join(base_dir, entry['sheet']), token,
+                             float(priority) if priority is not None else None))
+    return items
+
+
+def _read_chain(entry, base_dir):
+    for key in ('rpc_url', 'chain_id'):
+        if key not in entry:
+            raise ValueError(f"Every job chain needs '{key}': {entry.get('name', entry)!r}")
+    name = str(entry.get('name') or entry['chain_id'])
+    options = {key: value for key, value in entry.items()
+               if key not in ('name', 'rpc_url', 'chain_id', 'explorer_url', 'transfers')}
+    return ChainSpec(name, entry['rpc_url'], int(entry['chain_id']), entry.get('explorer_url') or '',
+                     _read_items(entry.get('transfers'), base_dir), options)
+
+
+# Job from an already parsed spec (job file contents, or a job submitted to
+# the daemon); relative sheet and export paths resolve against `base_dir`
+def job_from_spec(spec, base_dir):
+    if not isinstance(spec, dict) or not (spec.get('transfers') or spec.get('chains')):
+        raise ValueError("Job file must contain a non-empty 'transfers' or 'chains' list.")
+
+    chains = [_read_chain(entry, base_dir) for entry in spec.get('chains') or []]
+    names = [chain.name for chain in chains]
+    if len(set(names)) != len(names):
+        raise ValueError("Job chain names must be unique.")
+    items = [] if chains else _read_items(spec.get('transfers'), base_dir)
+
+    export = spec.get('export')
+    if export:
+        export = os.path.join(base_dir, export)
+    options = {key: value for key, value in spec.items() if key not in ('transfers', 'chains', 'export')}
+    return Job(items, export, options, chains)
+
+
+def load_job(path):
+    return job_from_spec(_read_spec(path), os.path.dirname(os.path.abspath(path)))
+
+
+# (token, transfers) lanes ready for TransferEngine.run_lanes. Token metadata
+# is loaded once per distinct contract through the engine's cache.
+def load_lanes(engine, job_or_items):
+    items = job_or_items.items if isinstance(job_or_items, Job) else job_or_items
+    lanes = []
+    for item in items:
+        transfers = read_transfers(item.sheet)
+        if item.priority is not None and transfers.priorities is None:
+            transfers.priorities = [item.priority] * len(transfers)
+        lanes.append((engine.load_token(item.token) if item.token else None, transfers))
+    return lanes
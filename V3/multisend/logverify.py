@@ -0,0 +1,244 @@
+import threading
+import time
+
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+from .amounts import format_units
+
+# keccak("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+# Blocks per eth_getLogs query; halved while the node rejects the range
+LOG_PAGE_BLOCKS = 2000
+# Logs of our transfers not yet claimed by a row are kept this many blocks,
+# for rows registered just after the block with their log was scanned
+UNCLAIMED_BLOCKS = 256
+# Node error wordings for a query covering too many blocks or logs
+RANGE_ERRORS = ('range', 'too many', 'limit', 'exceed', 'response size', 'query returned more than')
+UNAVAILABLE_ERRORS = ('not supported', 'method not found', 'not available', 'does not exist', 'disabled')
+
+
+def _is_range_error(error):
+    message = str(error).lower()
+    return any(text in message for text in RANGE_ERRORS)
+
+
+# eth_getLogs disabled, or even a one-block range refused
+def _is_unavailable(error):
+    message = str(error).lower()
+    return _is_range_error(error) or any(text in message for text in UNAVAILABLE_ERRORS)
+
+
+def _topic_address(address):
+    return '0x' + '0' * 24 + address[2:].lower()
+
+
+def _hex(value):
+    return value if isinstance(value, str) else '0x' + bytes(value).hex()
+
+
+# A broadcast token transfer waiting to be seen in the logs
+class _Awaited:
+    __slots__ = ('record', 'raw_transaction', 'done', 'receipt', 'error', 'fallback', 'registered_at',
+                 'checked_at')
+
+    def __init__(self, record, raw_transaction):
+        self.record = record
+        self.raw_transaction = raw_transaction
+        self.done = threading.Event()
+        self.receipt = None
+        self.error = None
+        self.fallback = False
+        self.registered_at = self.checked_at = time.monotonic()
+
+
+# Confirms the token transfers of a batch from the sender's Transfer logs
+# instead of one receipt poll per transaction. A single thread pages
+# eth_getLogs(Transfer, from=sender) over the blocks mined since the batch
+# started and matches each log to its row by transaction hash, checking the
+# recipient and the amount that actually arrived (fee-on-transfer tokens
+# deliver less). Rows whose nonce is already mined but that logged nothing
+# (reverts) are the only ones whose receipt is fetched. Worker threads just
+# wait on the result, so 50k transfers cost a few calls per block instead of
+# 50k receipt polls. Nodes that refuse eth_getLogs send every row back to
+# the engine's per-hash receipt polling.
+class LogVerifier:
+    def __init__(self, engine, poll_interval=None, page_blocks=LOG_PAGE_BLOCKS):
+        self.engine = engine
+        self.web3 = engine.web3
+        self.sender_topic = _topic_address(engine.address)
+        self.poll_interval = poll_interval if poll_interval is not None else engine.poll_latency
+        self.page_blocks = page_blocks
+        self.awaited = {}
+        # tx hash -> (block number, [Transfer logs]) seen before their row registered
+        self.unclaimed = {}
+        self.cursor = None
+        self.broken = False
+        self.queries = 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    # Receipt-like dict (status, gasUsed None, blockNumber, blockHash) for a
+    # broadcast token transfer, blocking until its log or receipt is found
+    def await_receipt(self, record, raw_transaction):
+        if self.broken:
+            return self.engine._await_receipt(record, raw_transaction)
+        awaited = _Awaited(record, raw_transaction)
+        with self.lock:
+            if self.cursor is None:
+                # Nothing of this transaction can be older than the current head
+                self.cursor = self.web3.eth.block_number - 1
+            claimed = self.unclaimed.pop(record.hash, None)
+            if claimed is None:
+                self.awaited[record.hash] = awaited
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name='log-verifier', daemon=True)
+                    self.thread.start()
+        if claimed is not None:
+            self._match(awaited, claimed[1])
+        awaited.done.wait()
+        if awaited.fallback:
+            return self.engine._await_receipt(record, raw_transaction)
+        if awaited.error is not None:
+            raise awaited.error
+        return awaited.receipt
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.check()
+            except Exception:
+                # Transient RPC trouble: the next round picks up where this one stopped
+                pass
+            with self.lock:
+                if not self.awaited:
+                    self.thread = None
+                    self.cursor = None
+                    return
+
+    def _get_logs(self, from_block, to_block):
+        while True:
+            stop = min(to_block, from_block + self.page_blocks - 1)
+            try:
+                self.queries += 1
+                return stop, self.web3.eth.get_logs({'fromBlock': from_block, 'toBlock': stop,
+                                                     'topics': [TRANSFER_TOPIC, self.sender_topic]})
+            except Exception as e:
+                if not _is_range_error(e) or self.page_blocks == 1:
+                    raise
+                self.page_blocks = max(1, self.page_blocks // 2)
+
+    # One round: scan new blocks, settle matched rows, look up rows whose
+    # nonce was mined without a log, and re-broadcast dropped ones
+    def check(self):
+        with self.lock:
+            awaited = list(self.awaited.values())
+            cursor = self.cursor
+        if not awaited:
+            return
+        head = self.web3.eth.block_number
+        mined_nonce = self.web3.eth.get_transaction_count(self.engine.address, head)
+        logs = {}
+        try:
+            while cursor < head:
+                cursor, page = self._get_logs(cursor + 1, head)
+                for log in page:
+                    logs.setdefault(_hex(log['transactionHash']), []).append(log)
+        except Exception as e:
+            if _is_unavailable(e):
+                self._give_up()
+            raise
+
+        matches = []
+        with self.lock:
+            self.cursor = cursor
+            for tx_hash, tx_logs in logs.items():
+                entry = self.awaited.get(tx_hash)
+                if entry is not None:
+                    matches.append((entry, tx_logs))
+                else:
+                    self.unclaimed[tx_hash] = (tx_logs[0]['blockNumber'], tx_logs)
+            for tx_hash in [tx_hash for tx_hash, (block, _) in self.unclaimed.items()
+                            if block < cursor - UNCLAIMED_BLOCKS]:
+                del self.unclaimed[tx_hash]
+        for entry, tx_logs in matches:
+            self._match(entry, tx_logs)
+
+        now = time.monotonic()
+        for entry in awaited:
+            record = entry.record
+            if entry.done.is_set():
+                continue
+            if record.nonce is not None and record.nonce < mined_nonce:
+                self._without_log(entry)
+            elif now - entry.registered_at > self.engine.receipt_timeout:
+                self._settle(entry, error=TimeExhausted(f"Transaction {record.hash} is not in the chain "
+                                                        f"after {self.engine.receipt_timeout} seconds"))
+            elif now - entry.checked_at > self.engine.drop_check_interval:
+                entry.checked_at = now
+                self._rebroadcast_if_dropped(entry)
+
+    def _settle(self, entry, receipt=None, error=None):
+        with self.lock:
+            self.awaited.pop(entry.record.hash, None)
+        entry.receipt = receipt
+        entry.error = error
+        entry.done.set()
+
+    # The node does not serve the logs we need: every waiting row goes back
+    # to per-hash receipt polling
+    def _give_up(self):
+        with self.lock:
+            self.broken = True
+            awaited = list(self.awaited.values())
+        for entry in awaited:
+            entry.fallback = True
+            self._settle(entry)
+
+    # Settle a mined row from its Transfer logs, matched on transaction hash,
+    # recipient and amount. A recipient credited with anything but the row's
+    # amount (fee-on-transfer, a transfer to someone else, or no event) gets
+    # a 'mismatch' in the receipt, and the engine fails the row with it.
+    def _match(self, entry, logs, receipt=None):
+        record = entry.record
+        token = record.token
+        received = sum(int.from_bytes(bytes(log['data']), 'big') for log in logs
+                       if log['address'].lower() == token.address.lower()
+                       and bytes(log['topics'][2])[-20:] == record.address)
+        if receipt is None:
+            log = logs[0]
+            receipt = {'status': 1, 'gasUsed': None, 'blockNumber': log['blockNumber'],
+                       'blockHash': log['blockHash'], 'transactionHash': record.hash}
+        else:
+            receipt = dict(receipt)
+        if received != record.value:
+            receipt['mismatch'] = (f"Mined, but the recipient received {format_units(received, token.decimals)} "
+                                   f"of {format_units(record.value, token.decimals)} {token.symbol}")
+        self._settle(entry, receipt)
+
+    # Mined but not seen in the scanned logs: reverted, mined just before the
+    # scan started, or its nonce went to another transaction. Only these rows
+    # cost a receipt lookup.
+    def _without_log(self, entry):
+        try:
+            receipt = self.web3.eth.get_transaction_receipt(entry.record.hash)
+        except TransactionNotFound:
+            self._settle(entry, error=RuntimeError("Nonce was used by another transaction"))
+            return
+        if receipt['status'] != 1:
+            self._settle(entry, receipt)
+            return
+        self._match(entry, [log for log in receipt['logs']
+                            if len(log['topics']) == 3 and _hex(log['topics'][0]) == TRANSFER_TOPIC
+                            and _hex(log['topics'][1]) == self.sender_topic], receipt)
+
+    def _rebroadcast_if_dropped(self, entry):
+        try:
+            self.web3.eth.get_transaction(entry.record.hash)
+        except TransactionNotFound:
+            self.engine.window.dropped()
+            try:
+                self.web3.eth.send_raw_transaction(entry.raw_transaction)
+            except Exception:
+                # Already known / nonce used: the next rounds settle it
+                pass
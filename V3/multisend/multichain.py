@@ -0,0 +1,107 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from web3 import Web3
+
+from .engine import TransferEngine, connect
+from .events import PROGRESS, Event, combine_progress, tagged
+from .finality import finality_tracker
+from .jobs import load_lanes
+from .planner import run_plan
+from .ratelimit import RateLimiter
+from .scheduler import scheduler_from_options
+
+
+# Engine, lanes and results of one chain in a multi-chain job
+class ChainRun:
+    def __init__(self, spec, engine, lanes):
+        self.spec = spec
+        self.name = spec.name
+        self.engine = engine
+        self.lanes = lanes
+        # BatchPlan whose waves to send instead of all lanes at once
+        self.plan = None
+        self.results = None
+        self.error = None
+
+
+# Runs a multi-chain job. Every chain gets an isolated TransferEngine (own
+# provider and rate limiter, nonce manager and gas price) and all chains run
+# concurrently, so the job takes as long as the slowest chain. Events reach
+# one callback tagged with the chain name, plus an aggregated PROGRESS event
+# (source None) covering every chain.
+class MultiChainDispatcher:
+    def __init__(self, job, private_key, engine_options=None):
+        self.job = job
+        self.private_key = private_key
+        self.engine_options = engine_options or {}
+        self.runs = []
+        self.progress = {}
+        self.lock = threading.Lock()
+
+    def _prepare_chain(self, spec):
+        options = spec.options
+        limiter = RateLimiter(read_rps=float(options.get('read_rps', 25)),
+                              send_rps=float(options.get('send_rps', 10)))
+        web3 = connect(spec.rpc_url, limiter)
+        if web3 is None:
+            raise ConnectionError(f"{spec.name}: failed to connect to {spec.rpc_url}")
+        if web3.eth.chain_id != spec.chain_id:
+            raise ValueError(f"{spec.name}: RPC reports chain id {web3.eth.chain_id}, job expects {spec.chain_id}")
+        gas_price = None
+        if 'gas_price_gwei' in options:
+            gas_price = Web3.to_wei(str(options['gas_price_gwei']), 'gwei')
+        engine = TransferEngine(web3, self.private_key, spec.chain_id, spec.explorer_url, gas_price=gas_price,
+                                finality=finality_tracker(web3, options.get('finality')), **self.engine_options)
+        return ChainRun(spec, engine, load_lanes(engine, spec.items))
+
+    # Connect to every chain and load its sheets and token metadata in parallel
+    def prepare(self):
+        with ThreadPoolExecutor(max_workers=len(self.job.chains)) as pool:
+            self.runs = list(pool.map(self._prepare_chain, self.job.chains))
+        return self.runs
+
+    def explorer_urls(self):
+        return {run.name: run.spec.explorer_url for run in self.runs}
+
+    def total_progress(self):
+        with self.lock:
+            return combine_progress(list(self.progress.values()))
+
+    def run(self, on_event=None):
+        if not self.runs:
+            self.prepare()
+        emit = on_event or (lambda event: None)
+
+        def chain_events(run):
+            forward = tagged(run.name, emit)
+
+            def on_chain_event(event):
+                if event.progress is not None:
+                    with self.lock:
+                        self.progress[run.name] = event.progress
+                forward(event)
+                if event.kind == PROGRESS:
+                    emit(Event(PROGRESS, progress=self.total_progress()))
+            return on_chain_event
+
+        def run_chain(run):
+            try:
+                # A chain's own `schedule` wins over the job-wide one
+                schedule = run.spec.options.get('schedule', self.job.options.get('schedule'))
+                scheduler = scheduler_from_options(schedule)
+                if run.plan is not None:
+                    run.results = run_plan(run.engine, run.lanes, run.plan, chain_events(run), scheduler)
+                else:
+                    run.results = run.engine.run_lanes(run.lanes, on_event=chain_events(run),
+                                                       scheduler=scheduler)
+            except Exception as e:
+                run.error = str(e)
+
+        threads = [threading.Thread(target=run_chain, args=(run,), name=f"chain-{run.name}")
+                   for run in self.runs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.runs
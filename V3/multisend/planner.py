@@ -0,0 +1,237 @@
+from collections import namedtuple
+from itertools import islice
+
+from web3 import Web3
+
+from .amounts import NATIVE_DECIMALS, format_units
+from .balances import empty_recipients
+from .engine import NATIVE_GAS_LIMIT, expected_transfer_gas, lane_rows
+from .events import LOG, Event
+from .ratelimit import RateLimitedHTTPProvider
+from .results import ResultStore
+
+# Gas model of a Disperse-style contract sending many transfers in one
+# transaction: fixed cost per transaction, plus per recipient the call itself
+# and its 64 bytes of calldata. Native value calls to an empty account pay
+# the new-account charge that plain transactions do not.
+DISPERSE_TX_GAS = 21000 + 25000
+DISPERSE_CALLDATA_GAS = 700
+DISPERSE_NATIVE_ROW_GAS = 9000 + 2600 + DISPERSE_CALLDATA_GAS
+DISPERSE_NEW_ACCOUNT_GAS = 25000
+# transferFrom instead of transfer: allowance update on top of the transfer
+DISPERSE_TOKEN_ROW_EXTRA_GAS = 3000 + DISPERSE_CALLDATA_GAS
+DISPERSE_ROWS_PER_TX = 200
+
+# Blocks sampled to estimate the block time
+BLOCK_TIME_SAMPLE = 100
+
+# Rows [start, stop) of the planned sending order that fit the fee budget
+Wave = namedtuple('Wave', ['start', 'stop', 'expected_fee', 'max_fee', 'native_value', 'duration'])
+
+
+class BatchPlan:
+    def __init__(self):
+        self.rows = 0
+        self.gas_price = 0
+        self.network_gas_price = None
+        self.base_fee = None
+        self.expected_gas = 0
+        self.expected_fee = 0
+        # What the engine reserves: every row at its full gas limit
+        self.max_fee = 0
+        self.batched_fee = 0
+        self.batched_transactions = 0
+        self.native_value = 0
+        self.token_totals = {}
+        self.throughput = 0.0
+        self.block_time = None
+        self.duration = 0.0
+        self.waves = []
+        self.issues = []
+        # Shown with the forecast but not blocking (e.g. funds for later waves)
+        self.warnings = []
+        self.order = None
+
+    @property
+    def ok(self):
+        return not self.issues
+
+    # LaneRows of the whole job in the planned order, built once; every wave
+    # takes its rows off the front of this iterator
+    def ordered_rows(self, lanes):
+        return iter(self.order if self.order is not None else lane_rows(lanes))
+
+    def describe(self, native_symbol='ETH'):
+        ether = lambda value: f"{format_units(value, NATIVE_DECIMALS)} {native_symbol}"
+        lines = [f"Rows: {self.rows}",
+                 f"Gas price: {Web3.from_wei(self.gas_price, 'gwei')} gwei"
+                 + (f" (network {Web3.from_wei(self.network_gas_price, 'gwei')} gwei)"
+                    if self.network_gas_price is not None else ""),
+                 f"Forecast fees: {ether(self.expected_fee)} expected, up to {ether(self.max_fee)} reserved "
+                 f"({self.expected_gas} gas)",
+                 f"Disperser-batched estimate: {ether(self.batched_fee)} in {self.batched_transactions} "
+                 f"transactions ({self._batched_saving()})"]
+        if self.native_value:
+            lines.append(f"Native amount sent: {ether(self.native_value)}")
+        for token, total in self.token_totals.items():
+            lines.append(f"{token.symbol} sent: {format_units(total, token.decimals)}")
+        block_time = f", {self.block_time:.1f} s blocks" if self.block_time else ""
+        lines.append(f"Projected duration: {_duration(self.duration)} at {self.throughput:.1f} tx/s{block_time}")
+        if len(self.waves) > 1:
+            lines.append(f"Fee budget splits the job into {len(self.waves)} waves:")
+            for number, wave in enumerate(self.waves, start=1):
+                lines.append(f"  Wave {number}: rows {wave.start + 1}-{wave.stop}, up to {ether(wave.max_fee)} "
+                             f"in fees, {_duration(wave.duration)}")
+        lines.extend(f"Warning: {warning}" for warning in self.warnings)
+        return lines
+
+    def _batched_saving(self):
+        if not self.expected_fee:
+            return "no change"
+        change = (self.expected_fee - self.batched_fee) * 100 / self.expected_fee
+        return f"{change:.0f}% cheaper" if change >= 0 else f"{-change:.0f}% more expensive"
+
+
+def _duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m {seconds:02d}s" if hours else f"{minutes}m {seconds:02d}s"
+
+
+def _block_time(web3):
+    latest = web3.eth.get_block('latest')
+    if latest['number'] < BLOCK_TIME_SAMPLE:
+        return None
+    earlier = web3.eth.get_block(latest['number'] - BLOCK_TIME_SAMPLE)
+    return max(0.1, (latest['timestamp'] - earlier['timestamp']) / BLOCK_TIME_SAMPLE)
+
+
+# Sends per second the engine can sustain: the RPC send quota, and at most
+# one in-flight window per block
+def _throughput(engine, block_time):
+    provider = engine.web3.provider
+    rate = None
+    if isinstance(provider, RateLimitedHTTPProvider):
+        rate = provider.limiter.send_bucket.max_rate
+    if block_time:
+        window_rate = engine.window.limit / block_time
+        rate = min(rate, window_rate) if rate else window_rate
+    return rate or float(engine.max_workers)
+
+
+# Forecast the cost and duration of sending `lanes` before anything is
+# broadcast. Uses the gas oracle (gas price, base fee, block time), each
+# token's measured transfer gas and a Multicall3 scan of recipient balances
+# to tell new holders / accounts apart. With `fee_budget` (wei) the rows are
+# cut into consecutive waves whose reserved fees fit the budget.
+def plan_batch(engine, lanes, fee_budget=None, throughput=None, scheduler=None, scan_recipients=True):
+    web3 = engine.web3
+    plan = BatchPlan()
+    plan.gas_price = engine.gas_price
+    plan.network_gas_price = web3.eth.gas_price
+    plan.base_fee = web3.eth.get_block('latest').get('baseFeePerGas')
+    if plan.base_fee is not None and plan.gas_price < plan.base_fee:
+        plan.issues.append(f"Gas price {plan.gas_price} wei is below the current base fee {plan.base_fee} wei")
+
+    rows = lane_rows(lanes)
+    if scheduler is not None:
+        plan.order = rows = list(scheduler.order(rows, engine))
+    else:
+        rows = list(rows)
+    empty = empty_recipients(web3, rows, include_native=True) if scan_recipients else set()
+
+    plan.block_time = _block_time(web3)
+    plan.throughput = throughput or _throughput(engine, plan.block_time)
+    settle = plan.block_time or 0.0
+
+    batched_gas = {}
+    wave_start = 0
+    wave_expected = wave_max = wave_value = 0
+    for position, row in enumerate(rows):
+        value = row.value or 0
+        new_holder = (row.token, row.address) in empty or not scan_recipients
+        gas = expected_transfer_gas(row.token, new_holder)
+        reserved = plan.gas_price * (row.token.gas_limit if row.token else NATIVE_GAS_LIMIT)
+        if row.token is None:
+            plan.native_value += value
+            row_batched = DISPERSE_NATIVE_ROW_GAS + (DISPERSE_NEW_ACCOUNT_GAS if new_holder else 0)
+        else:
+            plan.token_totals[row.token] = plan.token_totals.get(row.token, 0) + value
+            row_batched = gas - NATIVE_GAS_LIMIT + DISPERSE_TOKEN_ROW_EXTRA_GAS
+        batched_gas.setdefault(row.token, []).append(row_batched)
+        plan.expected_gas += gas
+
+        if fee_budget is not None and wave_max + reserved > fee_budget and position > wave_start:
+            plan.waves.append(Wave(wave_start, position, wave_expected * plan.gas_price, wave_max, wave_value,
+                                   (position - wave_start) / plan.throughput + settle))
+            wave_start, wave_expected, wave_max, wave_value = position, 0, 0, 0
+        if fee_budget is not None and reserved > fee_budget:
+            plan.issues.append(f"Row {row.index} alone needs up to {reserved} wei in fees, above the budget")
+        wave_expected += gas
+        wave_max += reserved
+        if row.token is None:
+            wave_value += value
+        plan.max_fee += reserved
+
+    plan.rows = len(rows)
+    plan.expected_fee = plan.expected_gas * plan.gas_price
+    plan.duration = plan.rows / plan.throughput + settle if plan.rows else 0.0
+    plan.waves.append(Wave(wave_start, plan.rows, wave_expected * plan.gas_price, wave_max, wave_value,
+                           (plan.rows - wave_start) / plan.throughput + settle))
+
+    # One disperser call per token per DISPERSE_ROWS_PER_TX recipients
+    for row_gas in batched_gas.values():
+        transactions = -(-len(row_gas) // DISPERSE_ROWS_PER_TX)
+        plan.batched_transactions += transactions
+        plan.batched_fee += (sum(row_gas) + transactions * DISPERSE_TX_GAS) * plan.gas_price
+
+    _check_funds(engine, plan)
+    return plan
+
+
+# The balance must cover the amounts and the fees reserved by the first wave;
+# later waves' fees can still be topped up between waves (see run_plan), so
+# falling short of the whole job's fees is only a warning
+def _check_funds(engine, plan):
+    native_needed = plan.waves[0].max_fee + plan.native_value
+    native_total = plan.max_fee + plan.native_value
+    native_balance = engine.native_balance()
+    if native_balance < native_needed:
+        plan.issues.append(f"Native balance {format_units(native_balance, NATIVE_DECIMALS)} does not cover "
+                           f"{format_units(native_needed, NATIVE_DECIMALS)} (amounts plus the first wave's "
+                           f"reserved fees)")
+    elif native_balance < native_total:
+        plan.warnings.append(f"Native balance {format_units(native_balance, NATIVE_DECIMALS)} does not cover "
+                             f"all {len(plan.waves)} waves ({format_units(native_total, NATIVE_DECIMALS)}); "
+                             f"top up before the later waves")
+    for token, total in plan.token_totals.items():
+        balance = engine.token_balance(token)
+        if balance < total:
+            plan.issues.append(f"{token.symbol} balance {format_units(balance, token.decimals)} is below the "
+                               f"total {format_units(total, token.decimals)}")
+
+
+# Send the plan's waves one after another into one ResultStore, with
+# progress counted over the whole job. `before_wave(number, wave)` runs
+# ahead of every wave after the first (a prompt, a pause for funds) and
+# stops the run by returning False. Every later wave starts only if the
+# balance covers its amounts and reserved fees.
+def run_plan(engine, lanes, plan, on_event=None, scheduler=None, before_wave=None, results=None):
+    results = results if results is not None else ResultStore()
+    tokens = {token for token, _ in lanes}
+    rows = plan.ordered_rows(lanes)
+    for number, wave in enumerate(plan.waves, start=1):
+        if number > 1 and before_wave is not None and before_wave(number, wave) is False:
+            break
+        if number > 1:
+            needed, balance = wave.max_fee + wave.native_value, engine.native_balance()
+            if balance < needed:
+                if on_event is not None:
+                    on_event(Event(LOG, message=f"Wave {number} stopped: native balance "
+                                                f"{format_units(balance, NATIVE_DECIMALS)} does not cover "
+                                                f"{format_units(needed, NATIVE_DECIMALS)} (amounts plus "
+                                                f"reserved fees)"))
+                break
+        engine.run_rows(islice(rows, wave.stop - wave.start), tokens, wave.stop - wave.start,
+                        on_event, results, scheduler, run_total=plan.rows, started=wave.start)
+    return results
@@ -0,0 +1,204 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .abi import PREFLIGHT_PROBE_ABI, PREFLIGHT_PROBE_RUNTIME
+from .engine import NATIVE_GAS_LIMIT, base_units
+
+# Rows simulated per eth_call (bound of the probe contract's arrays)
+PROBE_BATCH = 256
+# Probe result marking a transfer that reverted
+REVERTED = 2 ** 256 - 1
+
+PreflightIssue = namedtuple('PreflightIssue', ['index', 'recipient', 'problem'])
+
+
+class PreflightReport:
+    def __init__(self):
+        self.issues = []
+        self.checked = 0
+        self.simulated_with_probe = False
+
+    @property
+    def ok(self):
+        return not self.issues
+
+    def add(self, index, recipient, problem):
+        self.issues.append(PreflightIssue(index, recipient, problem))
+
+
+# Row positions to simulate: all of them, or `sample_size` spread evenly
+# across the sheet (always including the first and last row)
+def sample_rows(count, sample_size=None):
+    if sample_size is None or sample_size >= count:
+        return list(range(count))
+    if sample_size <= 1:
+        return [0]
+    step = (count - 1) / (sample_size - 1)
+    return sorted({round(i * step) for i in range(sample_size)})
+
+
+def _describe_revert(error):
+    message = str(error)
+    lowered = message.lower()
+    if 'pause' in lowered:
+        return "Token transfers are paused"
+    if any(word in lowered for word in ('blacklist', 'blocklist', 'denylist', 'frozen')):
+        return "Recipient is blacklisted by the token"
+    return f"Transfer reverts: {message}"
+
+
+# Simulates a batch before any nonce is used. Token transfers run through a
+# probe contract injected at the sender's address with an eth_call state
+# override, which measures what each recipient actually receives (catching
+# fee-on-transfer tokens) and which rows revert (paused tokens, blacklisted
+# recipients, contracts rejecting ETH). Nodes without state overrides fall
+# back to one plain eth_call per row. Every row is judged against the
+# sender's balance at the start: funds for the whole batch are checked
+# separately, so native probes are topped up by the chunk's amounts rather
+# than failing once earlier rows of the chunk spent the balance. Transfers
+# to the sender itself are never probed for what arrives (nothing does).
+class Preflight:
+    def __init__(self, engine, token=None, block='pending', workers=8):
+        self.engine = engine
+        self.web3 = engine.web3
+        self.token = token
+        self.block = block
+        self.workers = workers
+        self.probe = self.web3.eth.contract(address=engine.address, abi=PREFLIGHT_PROBE_ABI)
+        self.override = {engine.address: {'code': PREFLIGHT_PROBE_RUNTIME}}
+        # Sender's native balance when the run started
+        self.balance = None
+
+    def _probe(self, receivers, amounts):
+        override = self.override
+        if self.token:
+            function = self.probe.functions.probe_token(self.token.address, receivers, amounts)
+        else:
+            function = self.probe.functions.probe_native(receivers, amounts)
+            if self.balance is not None:
+                # Each row still finds at least the starting balance
+                override = {self.engine.address: dict(self.override[self.engine.address],
+                                                      balance=self.balance + sum(amounts))}
+        return function.call({'from': self.engine.address}, block_identifier=self.block,
+                             state_override=override)
+
+    def supports_probe(self):
+        try:
+            self._probe([], [])
+            return True
+        except Exception:
+            return False
+
+    # Plain eth_call of a single row; returns the problem or None
+    def _call_row(self, recipient, value):
+        try:
+            if self.token:
+                self.token.contract.functions.transfer(recipient, value).call(
+                    {'from': self.engine.address}, block_identifier=self.block)
+            else:
+                self.web3.eth.call({'from': self.engine.address, 'to': recipient, 'value': value},
+                                   block_identifier=self.block)
+            return None
+        except Exception as e:
+            if not self.token:
+                return f"Recipient rejects native transfers: {e}"
+            return _describe_revert(e)
+
+    def _probe_chunk(self, rows):
+        receivers = [recipient for _, recipient, _ in rows]
+        amounts = [value for _, _, value in rows]
+        outcome = self._probe(receivers, amounts)
+        problems = []
+        for (index, recipient, value), result in zip(rows, outcome):
+            if self.token:
+                if result == REVERTED:
+                    problems.append((index, recipient, self._call_row(recipient, value)
+                                     or "Transfer reverts"))
+                elif result != value and recipient != self.engine.address:
+                    problems.append((index, recipient,
+                                     f"Fee-on-transfer token: recipient receives {result} of {value} base units"))
+            elif not result:
+                problems.append((index, recipient, "Recipient rejects native transfers"))
+        return problems
+
+    def _check_row(self, row):
+        index, recipient, value = row
+        problem = self._call_row(recipient, value)
+        return [(index, recipient, problem)] if problem else []
+
+    def run(self, transfers, sample_size=None):
+        report = PreflightReport()
+        values = base_units(self.token, transfers)
+        for position, value in enumerate(values):
+            if value is None:
+                recipient, amount = transfers[position]
+                report.add(position + 1, recipient, f"Invalid amount {amount!r}")
+        self.balance = self.engine.native_balance()
+        self._check_fees_and_funds(values, report)
+
+        rows = []
+        checked = 0
+        for position in sample_rows(len(transfers), sample_size):
+            recipient, value = transfers[position][0], values[position]
+            if value is None:
+                continue
+            if not self.web3.is_address(recipient):
+                report.add(position + 1, recipient, "Invalid recipient address")
+                continue
+            recipient = self.web3.to_checksum_address(recipient)
+            checked += 1
+            if not self.token and value > self.balance:
+                report.add(position + 1, recipient, f"Amount {value} wei exceeds the sender's balance")
+            elif self.token or recipient != self.engine.address:
+                # A native transfer to the sender itself always goes through
+                rows.append((position + 1, recipient, value))
+        report.checked = checked
+
+        report.simulated_with_probe = self.supports_probe()
+        if report.simulated_with_probe:
+            work, jobs = self._probe_chunk, [rows[i:i + PROBE_BATCH] for i in range(0, len(rows), PROBE_BATCH)]
+        else:
+            work, jobs = self._check_row, rows
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for problems in pool.map(work, jobs):
+                for index, recipient, problem in problems:
+                    report.add(index, recipient, problem)
+        report.issues.sort(key=lambda issue: issue.index)
+        if self.token and report.simulated_with_probe and rows:
+            self._record_fee_on_transfer(report)
+        return report
+
+    # The probe measured received amounts, so remember whether the token
+    # takes a fee; later runs see it in the token cache without simulating
+    def _record_fee_on_transfer(self, report):
+        fee_on_transfer = any(issue.problem.startswith("Fee-on-transfer") for issue in report.issues)
+        if self.token.fee_on_transfer != fee_on_transfer:
+            self.token.fee_on_transfer = fee_on_transfer
+            self.engine.remember_token(self.token)
+
+    # Gas price below the base fee or funds short of the whole batch doom
+    # every row, so they are checked before simulating individual transfers
+    def _check_fees_and_funds(self, values, report):
+        engine = self.engine
+        base_fee = self.web3.eth.get_block('latest').get('baseFeePerGas')
+        if base_fee is not None and engine.gas_price < base_fee:
+            report.add(0, None, f"Gas price {engine.gas_price} wei is below the current base fee {base_fee} wei; "
+                                f"every transaction would be stuck or fail")
+
+        total = sum(value for value in values if value is not None)
+        gas_limit = self.token.gas_limit if self.token else NATIVE_GAS_LIMIT
+        gas_total = engine.gas_price * gas_limit * len(values)
+        native_needed = gas_total if self.token else gas_total + total
+        native_balance = self.balance
+        if native_balance < native_needed:
+            report.add(0, None, f"Native balance {native_balance} wei does not cover {native_needed} wei "
+                                f"needed for the batch")
+        if self.token:
+            token_balance = engine.token_balance(self.token)
+            if token_balance < total:
+                report.add(0, None, f"Token balance {token_balance} is below the batch total {total} "
+                                    f"(base units)")
+
+
+def run_preflight(engine, transfers, token=None, sample_size=None, block='pending'):
+    return Preflight(engine, token, block).run(transfers, sample_size)
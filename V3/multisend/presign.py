@@ -0,0 +1,199 @@
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+
+from .abi import transfer_calldata
+from .engine import NATIVE_GAS_LIMIT
+from .rawtx import LegacyTxEncoder, SignedRaw
+
+# Batches smaller than this are signed by the engine as they go; starting
+# the worker processes would cost more than it saves
+PRESIGN_MIN_ROWS = 20000
+# Rows per shard (one worker task, one file)
+SHARD_ROWS = 5000
+# Shard file entry: raw length (4 bytes), hash (32), raw transaction
+_HEADER = 36
+
+# Marks the end of a shard's payloads
+_END = object()
+
+# Per-process signer, set up once by the pool initializer
+_signer = None
+
+
+class _ShardSigner:
+    def __init__(self, private_key, chain_id, gas_price, tokens):
+        self.private_key = private_key
+        self.chain_id = chain_id
+        self.gas_price = gas_price
+        # Slot 0 is the native currency, then (address, gas limit, access list) per token
+        self.tokens = tokens
+        self.encoders = {}
+
+    def _encoder(self, gas):
+        encoder = self.encoders.get(gas)
+        if encoder is None:
+            encoder = self.encoders[gas] = LegacyTxEncoder(self.private_key, self.chain_id, self.gas_price, gas)
+        return encoder
+
+    def sign(self, slot, address, value, nonce):
+        token = self.tokens[slot]
+        if token is None:
+            return self._encoder(NATIVE_GAS_LIMIT).sign(nonce, address, value)
+        token_address, gas_limit, access_list = token
+        data = transfer_calldata(address, value)
+        if access_list is not None:
+            return self._encoder(gas_limit).sign_with_access_list(nonce, token_address, 0, data,
+                                                                  access_list.encode(address))
+        return self._encoder(gas_limit).sign(nonce, token_address, 0, data)
+
+
+def _init_worker(private_key, chain_id, gas_price, tokens):
+    global _signer
+    _signer = _ShardSigner(private_key, chain_id, gas_price, tokens)
+
+
+# Sign (slot, address, value, nonce) rows into a new file of `directory`;
+# a row that cannot be signed gets an empty entry
+def _sign_shard(directory, rows):
+    fd, path = tempfile.mkstemp(dir=directory, suffix='.shard')
+    with os.fdopen(fd, 'wb') as out:
+        for slot, address, value, nonce in rows:
+            try:
+                signed = _signer.sign(slot, address, value, nonce)
+            except (OverflowError, ValueError):
+                out.write(bytes(_HEADER))
+                continue
+            out.write(len(signed.raw_transaction).to_bytes(4, 'big') + signed.hash + signed.raw_transaction)
+    return path
+
+
+# SignedRaw (or None) per row of a shard file, read through mmap; the file
+# is removed once mapped
+def _read_shard(path):
+    with open(path, 'rb') as fh:
+        view = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(fh.fileno()).st_size else b''
+    os.remove(path)
+    offset = 0
+    while offset < len(view):
+        length = int.from_bytes(view[offset:offset + 4], 'big')
+        start = offset + _HEADER
+        yield SignedRaw(view[start:start + length], view[offset + 4:start]) if length else None
+        offset = start + length
+    if view:
+        view.close()
+
+
+# Signs the rows of a large batch ahead of the broadcaster on a pool of
+# worker processes. Rows are cut into blocks of `shard_rows` per process;
+# each block's sendable rows get consecutive nonces from the sender's next
+# one, and every shard of the block (a contiguous nonce range) is encoded
+# and signed by one worker, which writes the raw transactions to a file
+# the parent maps back in. One block is signed while the previous one is
+# being broadcast. Before each row is handed out its nonce is compared with
+# the engine's next one: once an earlier row failed before taking its nonce
+# (insufficient funds, a node rejection, a resync), everything not yet
+# handed out is re-sharded from the engine's next nonce. A row whose
+# payload still does not match when it is sent (e.g. the gas price changed)
+# is signed again by the engine, so a stale payload is never broadcast.
+class Presigner:
+    def __init__(self, processes=None, min_rows=PRESIGN_MIN_ROWS, shard_rows=SHARD_ROWS):
+        self.processes = processes or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self.shard_rows = shard_rows
+
+    # Worth it for `total` rows, and possible with the engine's account
+    def applies(self, engine, total):
+        return total >= self.min_rows and getattr(engine.account, 'key', None) is not None
+
+    # (row, presigned) per row in order; presigned is (nonce, gas price,
+    # SignedRaw), or None for rows left to the engine
+    def sign(self, engine, rows, tokens):
+        tokens = [token for token in tokens if token is not None]
+        slots = {token: slot for slot, token in enumerate(tokens, 1)}
+        specs = [None] + [(token.address_bytes, token.gas_limit, token.access_list) for token in tokens]
+        gas_price = engine.gas_price
+        nonce = engine.nonces.peek()
+        directory = tempfile.mkdtemp(prefix='multisend-presign-')
+        # Worker processes are spawned, not forked: the parent runs RPC and UI threads
+        context = multiprocessing.get_context('spawn')
+        try:
+            with ProcessPoolExecutor(self.processes, mp_context=context, initializer=_init_worker,
+                                     initargs=(bytes(engine.account.key), engine.chain_id, gas_price,
+                                               specs)) as pool:
+                pending = deque()
+                rows = iter(rows)
+                while True:
+                    block = list(islice(rows, self.shard_rows * self.processes))
+                    if block:
+                        nonce = self._submit(pool, directory, block, slots, nonce, pending)
+                    if pending and (len(pending) > 1 or not block):
+                        rest = yield from self._collect(engine, gas_price, *pending.popleft())
+                        if rest:
+                            nonce = self._reshard(pool, directory, rest, slots, engine.nonces.peek(), pending)
+                    if not block and not pending:
+                        return
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _submit(self, pool, directory, block, slots, nonce, pending):
+        nonces, jobs = [], []
+        for row in block:
+            slot = 0 if row.token is None else slots.get(row.token)
+            if row.address is None or row.value is None or slot is None:
+                nonces.append(None)
+                continue
+            nonces.append(nonce)
+            jobs.append((slot, row.address, row.value, nonce))
+            nonce += 1
+        shards = [pool.submit(_sign_shard, directory, jobs[i:i + self.shard_rows])
+                  for i in range(0, len(jobs), self.shard_rows)]
+        pending.append((block, nonces, shards))
+        return nonce
+
+    # Rows not handed out yet (`rest`, then every pending block) signed again
+    # with nonces from `nonce`; shards of the old numbering are dropped
+    def _reshard(self, pool, directory, rest, slots, nonce, pending):
+        for block, _, shards in pending:
+            rest.extend(block)
+            for shard in shards:
+                shard.cancel()
+        pending.clear()
+        return self._submit(pool, directory, rest, slots, nonce, pending)
+
+    # Yields the block's rows with their payloads; stops early and returns
+    # the remaining rows once the engine's next nonce has left the numbering
+    def _collect(self, engine, gas_price, block, nonces, shards):
+        payloads = iter(())
+        for position, (row, nonce) in enumerate(zip(block, nonces)):
+            if nonce is None:
+                yield row, None
+                continue
+            if nonce != engine.nonces.peek():
+                return block[position:]
+            payload = next(payloads, _END)
+            if payload is _END:
+                payloads = self._payloads(shards.pop(0))
+                payload = next(payloads)
+            yield row, (nonce, gas_price, payload) if payload is not None else None
+        return None
+
+    def _payloads(self, shard):
+        try:
+            return _read_shard(shard.result())
+        except Exception:
+            # Worker failed: the engine signs this shard's rows itself
+            return repeat(None, self.shard_rows)
+
+
+# PRESIGN: auto (all cores), off, or a number of worker processes
+def presigner_from_env(environ):
+    setting = (environ.get('PRESIGN') or 'auto').strip().lower()
+    if setting in ('off', '0', 'none'):
+        return None
+    return Presigner(None if setting == 'auto' else int(setting))
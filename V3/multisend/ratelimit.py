@@ -0,0 +1,200 @@
+import threading
+import time
+
+import requests
+from web3 import Web3
+from web3.providers.rpc.utils import ExceptionRetryConfiguration
+
+# RPC methods that spend the (usually much smaller) write quota
+SEND_METHODS = frozenset({'eth_sendRawTransaction', 'eth_sendTransaction'})
+
+# JSON-RPC error codes providers use for "too many requests"
+RATE_LIMIT_ERROR_CODES = frozenset({-32005, 429})
+
+
+# Classic token bucket: `rate` tokens per second, holding at most `burst` tokens
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Block until `amount` tokens are available and take them. Requests larger
+    # than the bucket go into debt so later callers pay for them.
+    def acquire(self, amount=1):
+        needed = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return
+                wait = (needed - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = max(0.1, min(float(rate), self.max_rate))
+
+
+# Shared limiter with separate budgets for reads and raw transaction sends.
+# Backs off multiplicatively when the provider answers 429 / -32005 and creeps
+# back up to the configured quota once requests succeed again (AIMD).
+class RateLimiter:
+    def __init__(self, read_rps=25, send_rps=10, burst=None, backoff_factor=0.5,
+                 recovery_step=None, recovery_after=20):
+        self.read_bucket = TokenBucket(read_rps, burst)
+        self.send_bucket = TokenBucket(send_rps, burst)
+        self.backoff_factor = backoff_factor
+        self.recovery_after = recovery_after
+        self.recovery_step = recovery_step
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        self.successes = {id(self.read_bucket): 0, id(self.send_bucket): 0}
+        self.throttled_count = 0
+
+    def bucket_for(self, method):
+        return self.send_bucket if method in SEND_METHODS else self.read_bucket
+
+    def acquire(self, method, amount=1):
+        # Honour a global pause (Retry-After) before touching the bucket
+        while True:
+            delay = self.paused_until - time.monotonic()
+            if delay <= 0:
+                break
+            time.sleep(delay)
+        self.bucket_for(method).acquire(amount)
+
+    def on_rate_limited(self, method, retry_after=None):
+        bucket = self.bucket_for(method)
+        with self.lock:
+            self.throttled_count += 1
+            self.successes[id(bucket)] = 0
+            bucket.set_rate(bucket.rate * self.backoff_factor)
+            pause = retry_after if retry_after is not None else 1.0 / bucket.rate
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+
+    def on_success(self, method):
+        bucket = self.bucket_for(method)
+        if bucket.rate >= bucket.max_rate:
+            return
+        with self.lock:
+            key = id(bucket)
+            self.successes[key] += 1
+            if self.successes[key] < self.recovery_after:
+                return
+            self.successes[key] = 0
+            step = self.recovery_step or max(1.0, bucket.max_rate / 10)
+            bucket.set_rate(bucket.rate + step)
+
+
+def _retry_after_seconds(response):
+    if response is None:
+        return None
+    value = response.headers.get('Retry-After')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_rate_limited_response(response):
+    error = response.get('error') if isinstance(response, dict) else None
+    if not isinstance(error, dict):
+        return False
+    if error.get('code') in RATE_LIMIT_ERROR_CODES:
+        return True
+    message = str(error.get('message', '')).lower()
+    return 'rate limit' in message or 'too many requests' in message
+
+
+# HTTP provider that routes every JSON-RPC call through a RateLimiter and
+# retries calls the provider rejected for exceeding its quota
+class RateLimitedHTTPProvider(Web3.HTTPProvider):
+    def __init__(self, endpoint_uri, limiter=None, max_retries=6, **kwargs):
+        # web3's own retry would sleep blindly on HTTP 429; leave that to the limiter
+        kwargs.setdefault('exception_retry_configuration', ExceptionRetryConfiguration(
+            errors=(ConnectionError, requests.exceptions.Timeout),
+        ))
+        super().__init__(endpoint_uri, **kwargs)
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+
+    def make_request(self, method, params):
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(method)
+            try:
+                response = super().make_request(method, params)
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status == 429 and attempt < self.max_retries:
+                    self.limiter.on_rate_limited(method, _retry_after_seconds(e.response))
+                    continue
+                raise
+            if is_rate_limited_response(response) and attempt < self.max_retries:
+                self.limiter.on_rate_limited(method)
+                continue
+            self.limiter.on_success(method)
+            return response
+        return response
+
+    def make_batch_request(self, batch_requests):
+        # A batch costs one token per call it carries
+        reads = sum(1 for method, _ in batch_requests if method not in SEND_METHODS)
+        sends = len(batch_requests) - reads
+        for attempt in range(self.max_retries + 1):
+            if reads:
+                self.limiter.acquire('eth_call', reads)
+            if sends:
+                self.limiter.acquire('eth_sendRawTransaction', sends)
+            try:
+                responses = super().make_batch_request(batch_requests)
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status == 429 and attempt < self.max_retries:
+                    self.limiter.on_rate_limited('eth_call', _retry_after_seconds(e.response))
+                    continue
+                raise
+            if isinstance(responses, list):
+                return self._retry_limited_calls(batch_requests, responses)
+            # The provider refused the whole batch with a single error
+            if is_rate_limited_response(responses) and attempt < self.max_retries:
+                self.limiter.on_rate_limited('eth_call')
+                continue
+            return responses
+        return responses
+
+    # Calls of a batch the provider rejected one by one for exceeding its
+    # quota go through make_request's back-off and retry; the others count
+    # as successes. Responses are in request order (web3 sorts them by id).
+    def _retry_limited_calls(self, batch_requests, responses):
+        if len(responses) != len(batch_requests):
+            return responses
+        limited = [position for position, response in enumerate(responses) if is_rate_limited_response(response)]
+        if not limited:
+            for method, _ in batch_requests:
+                self.limiter.on_success(method)
+            return responses
+        self.limiter.on_rate_limited(batch_requests[limited[0]][0])
+        for position in limited:
+            method, params = batch_requests[position]
+            response = self.make_request(method, params)
+            responses[position] = dict(response, id=responses[position].get('id'))
+        return responses
+
+
+# Build a limiter from READ_RPS / SEND_RPS in the environment
+def limiter_from_env(environ):
+    return RateLimiter(
+        read_rps=float(environ.get('READ_RPS') or 25),
+        send_rps=float(environ.get('SEND_RPS') or 10),
+    )
@@ -0,0 +1,99 @@
+from collections import namedtuple
+
+from eth_keys import keys
+from eth_utils import keccak
+
+# libsecp256k1 bindings; eth_keys uses them too when installed, but calling
+# them directly skips its signature object layers (~3x faster per signature)
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
+# Same attribute names as eth_account's SignedTransaction, as used by the engine
+SignedRaw = namedtuple('SignedRaw', ['raw_transaction', 'hash'])
+
+_EMPTY = b'\x80'
+_ADDRESS_PREFIX = b'\x94'
+_KEY_PREFIX = b'\xa0'
+# EIP-2718 type byte of an EIP-2930 (access list) transaction
+_ACCESS_LIST_TX_TYPE = b'\x01'
+
+
+def _length_prefix(length, offset):
+    if length < 56:
+        return bytes((offset + length,))
+    size = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes((offset + 55 + len(size),)) + size
+
+
+def _rlp_bytes(data):
+    if len(data) == 1 and data[0] < 0x80:
+        return data
+    return _length_prefix(len(data), 0x80) + data
+
+
+def _rlp_list(payload):
+    return _length_prefix(len(payload), 0xc0) + payload
+
+
+# RLP of an EIP-2930 access list given as [(20-byte address, [32-byte keys])]
+def encode_access_list(entries):
+    return _rlp_list(b''.join(_rlp_list(_ADDRESS_PREFIX + address + _rlp_list(b''.join(_KEY_PREFIX + key for key in keys)))
+                              for address, keys in entries))
+
+
+def _rlp_int(value):
+    if value == 0:
+        return _EMPTY
+    if value < 0x80:
+        return bytes((value,))
+    data = value.to_bytes((value.bit_length() + 7) // 8, 'big')
+    return _length_prefix(len(data), 0x80) + data
+
+
+# Signs legacy EIP-155 transactions without building a transaction dict.
+# gasPrice, gas and the chain id suffix are identical for every row of a
+# batch, so they are RLP-encoded once; each row only encodes nonce, `to`,
+# value and data around them, hashes and signs. Addresses are passed as 20
+# bytes, so no checksum is computed. `sign_with_access_list` produces the
+# type 1 (EIP-2930) form of the same transaction. The result is
+# byte-for-byte what Account.sign_transaction produces for the same fields.
+class LegacyTxEncoder:
+    def __init__(self, private_key, chain_id, gas_price, gas=21000):
+        self.key = keys.PrivateKey(bytes(private_key))
+        self.fast_key = coincurve.PrivateKey(bytes(private_key)) if coincurve else None
+        self.chain_id = chain_id
+        self.gas_price = gas_price
+        self.gas = gas
+        self.fee_fields = _rlp_int(gas_price) + _rlp_int(gas)
+        # chainId, 0, 0 in place of v, r, s while signing
+        self.signing_suffix = _rlp_int(chain_id) + _EMPTY + _EMPTY
+        self.v_offset = chain_id * 2 + 35
+        self.chain_field = _rlp_int(chain_id)
+
+    # (recovery id, r, s) of a 32-byte hash
+    def _sign_hash(self, digest):
+        if self.fast_key is not None:
+            signature = self.fast_key.sign_recoverable(digest, hasher=None)
+            return signature[64], int.from_bytes(signature[:32], 'big'), int.from_bytes(signature[32:64], 'big')
+        signature = self.key.sign_msg_hash(digest)
+        return signature.v, signature.r, signature.s
+
+    # `to` is a 20-byte address, `value` in wei
+    def sign(self, nonce, to, value, data=b''):
+        fields = (_rlp_int(nonce) + self.fee_fields + _ADDRESS_PREFIX + to + _rlp_int(value)
+                  + _rlp_bytes(data))
+        unsigned = fields + self.signing_suffix
+        v, r, s = self._sign_hash(keccak(_length_prefix(len(unsigned), 0xc0) + unsigned))
+        signed = fields + _rlp_int(self.v_offset + v) + _rlp_int(r) + _rlp_int(s)
+        raw_transaction = _length_prefix(len(signed), 0xc0) + signed
+        return SignedRaw(raw_transaction, keccak(raw_transaction))
+
+    # `access_list` is already RLP-encoded (see encode_access_list)
+    def sign_with_access_list(self, nonce, to, value, data, access_list):
+        fields = (self.chain_field + _rlp_int(nonce) + self.fee_fields + _ADDRESS_PREFIX + to + _rlp_int(value)
+                  + _rlp_bytes(data) + access_list)
+        y_parity, r, s = self._sign_hash(keccak(_ACCESS_LIST_TX_TYPE + _rlp_list(fields)))
+        raw_transaction = _ACCESS_LIST_TX_TYPE + _rlp_list(fields + _rlp_int(y_parity) + _rlp_int(r) + _rlp_int(s))
+        return SignedRaw(raw_transaction, keccak(raw_transaction))
@@ -0,0 +1,238 @@
+import heapq
+import threading
+from array import array
+
+from .addresses import address_bytes, checksum
+
+SUCCESS = 'Success'
+FAILED = 'Failed'
+PENDING = 'Pending'
+# Mined successfully, waiting for the finality tracker
+INCLUDED = 'Included'
+
+
+# Outcome of one row of a batch (or a single transfer)
+class TransferRecord:
+    __slots__ = ('index', 'recipient', 'amount', 'token', 'status', 'hash', 'error',
+                 'nonce', 'gas_used', 'sent_at', 'latency', 'position', 'value', 'address')
+
+    def __init__(self, index, recipient, amount, token=None):
+        self.position = None
+        # Amount in base units once converted; `amount` keeps the sheet's text
+        self.value = None
+        # Recipient as 20 bytes, set once at ingest; `recipient` keeps the text
+        self.address = None
+        self.index = index
+        self.recipient = recipient
+        self.amount = amount
+        self.token = token
+        self.status = PENDING
+        self.hash = None
+        self.error = None
+        self.nonce = None
+        self.gas_used = None
+        self.sent_at = None
+        self.latency = None
+
+    def explorer_url(self, explorer_url):
+        if not self.hash:
+            return 'N/A'
+        return f"{(explorer_url or '').rstrip('/')}/tx/{self.hash}"
+
+    def __repr__(self):
+        return f"TransferRecord(index={self.index}, recipient={self.recipient!r}, status={self.status!r}, hash={self.hash!r})"
+
+
+# Status codes of the packed store
+_STATUS_CODES = {PENDING: 0, SUCCESS: 1, FAILED: 2, INCLUDED: 3}
+_STATUSES = (PENDING, SUCCESS, FAILED, INCLUDED)
+# Marks an unset nonce / gas used in the unsigned columns
+_MISSING = 0xFFFFFFFF
+_NO_HASH = bytes(32)
+# Views are sorted in runs of this many rows and merged, so a reader thread
+# never holds the GIL for a whole sort of a large store
+SORT_CHUNK = 32768
+
+
+# Thread-safe collection of the records produced by a batch, stored column
+# by column: 20-byte recipients and 32-byte hashes in bytearrays, numbers in
+# typed arrays, errors only for the rows that have one. A row costs ~80 bytes
+# instead of a few hundred for a record object with its strings, so
+# million-row batches stay small. TransferRecord objects exist only while a
+# transfer is in flight; `get` and iteration rebuild them on demand and
+# explorer URLs are derived from the hash at export time.
+# `version` changes whenever a row is added or updated so readers can skip
+# redundant work.
+class ResultStore:
+    def __init__(self):
+        self.indexes = array('I')
+        self.recipients = bytearray()
+        self.amounts = []
+        self.token_ids = array('H')
+        self.tokens = [None]
+        self.token_slots = {}
+        self.statuses = bytearray()
+        self.hashes = bytearray()
+        self.nonces = array('I')
+        self.gas_used = array('I')
+        self.latencies = array('f')
+        self.errors = {}
+        # Recipients that are not a 20-byte hex address, kept verbatim
+        self.raw_recipients = {}
+        self.successful = 0
+        self.failed = 0
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def _token_id(self, token):
+        if token is None:
+            return 0
+        slot = self.token_slots.get(id(token))
+        if slot is None:
+            slot = self.token_slots[id(token)] = len(self.tokens)
+            self.tokens.append(token)
+        return slot
+
+    def add(self, record):
+        with self.lock:
+            position = len(self.statuses)
+            record.position = position
+            self.indexes.append(record.index)
+            address = record.address if record.address is not None else address_bytes(record.recipient)
+            if address is None:
+                self.raw_recipients[position] = record.recipient
+                address = bytes(20)
+            self.recipients += address
+            self.amounts.append(record.amount)
+            self.token_ids.append(self._token_id(record.token))
+            self.statuses.append(_STATUS_CODES[record.status])
+            self.hashes += _NO_HASH
+            self.nonces.append(_MISSING)
+            self.gas_used.append(_MISSING)
+            self.latencies.append(float('nan'))
+            self._pack(record)
+            self.version += 1
+
+    # Copy the in-flight fields of `record` into the columns
+    def _pack(self, record):
+        position = record.position
+        if record.hash:
+            self.hashes[position * 32:position * 32 + 32] = bytes.fromhex(record.hash[2:])
+        if record.nonce is not None:
+            self.nonces[position] = record.nonce
+        if record.gas_used is not None:
+            self.gas_used[position] = record.gas_used
+        if record.latency is not None:
+            self.latencies[position] = record.latency
+        if record.error is not None:
+            self.errors[position] = record.error
+
+    def update(self, record):
+        with self.lock:
+            self._pack(record)
+            self.version += 1
+
+    # Mined but not final yet (see multisend.finality)
+    def include(self, record):
+        with self.lock:
+            record.status = INCLUDED
+            self.statuses[record.position] = _STATUS_CODES[INCLUDED]
+            self._pack(record)
+            self.version += 1
+
+    def finalize(self, record, status, error=None):
+        with self.lock:
+            record.status = status
+            if error is not None:
+                record.error = error
+            self.statuses[record.position] = _STATUS_CODES[status]
+            self._pack(record)
+            if status == SUCCESS:
+                self.successful += 1
+            else:
+                self.failed += 1
+            self.version += 1
+
+    def _recipient(self, position):
+        raw = self.raw_recipients.get(position)
+        if raw is not None:
+            return raw
+        return checksum(bytes(self.recipients[position * 20:position * 20 + 20]))
+
+    def _nonce(self, position):
+        nonce = self.nonces[position]
+        return None if nonce == _MISSING else nonce
+
+    def _latency(self, position):
+        latency = self.latencies[position]
+        return None if latency != latency else latency
+
+    # Rebuild the record stored at `position`. Taken under the lock: `add`
+    # grows the columns one after another.
+    def get(self, position):
+        with self.lock:
+            record = TransferRecord(self.indexes[position], self._recipient(position), self.amounts[position],
+                                    self.tokens[self.token_ids[position]])
+            record.position = position
+            record.status = _STATUSES[self.statuses[position]]
+            tx_hash = self.hashes[position * 32:position * 32 + 32]
+            if tx_hash != _NO_HASH:
+                record.hash = '0x' + tx_hash.hex()
+            record.error = self.errors.get(position)
+            record.nonce = self._nonce(position)
+            gas_used = self.gas_used[position]
+            record.gas_used = None if gas_used == _MISSING else gas_used
+            record.latency = self._latency(position)
+            return record
+
+    # Positions of the rows matching `status`, ordered by `sort_by`.
+    # Only an array of positions is built; no records are materialized.
+    # The columns involved are copied under the lock, then filtered and
+    # sorted without it, on plain numeric keys (rows without a value last).
+    def view(self, status=None, sort_by=None, reverse=False):
+        sort_by = sort_by if sort_by in ('nonce', 'latency') else None
+        with self.lock:
+            count = len(self.statuses)
+            statuses = bytes(self.statuses) if status is not None else None
+            values = (self.nonces if sort_by == 'nonce' else self.latencies)[:count] if sort_by else None
+        if status is None:
+            positions = range(count)
+        else:
+            code = _STATUS_CODES[status]
+            positions = [i for i in range(count) if statuses[i] == code]
+        if sort_by:
+            missing = float('inf')
+            if sort_by == 'nonce':
+                keys = [missing if value == _MISSING else value for value in values]
+            else:
+                keys = [missing if value != value else value for value in values]
+            if reverse:
+                # Descending values, but rows without a value still go last
+                keys = [missing if key == missing else -key for key in keys]
+            key = keys.__getitem__
+            runs = [sorted(positions[i:i + SORT_CHUNK], key=key) for i in range(0, len(positions), SORT_CHUNK)]
+            positions = heapq.merge(*runs, key=key) if len(runs) > 1 else (runs[0] if runs else ())
+        elif reverse:
+            positions = reversed(positions)
+        return array('L', positions)
+
+    def __len__(self):
+        return len(self.statuses)
+
+    def __iter__(self):
+        for position in self._index_order():
+            yield self.get(position)
+
+    def _index_order(self):
+        with self.lock:
+            indexes = self.indexes[:]
+        return sorted(range(len(indexes)), key=indexes.__getitem__)
+
+    def sorted(self):
+        return list(self)
+
+    def failures(self):
+        code = _STATUS_CODES[FAILED]
+        with self.lock:
+            statuses = bytes(self.statuses)
+        return [self.get(i) for i in self._index_order() if statuses[i] == code]
@@ -0,0 +1,149 @@
+import time
+from collections import deque
+
+from web3 import Web3
+
+from .balances import empty_recipients
+from .engine import expected_transfer_gas
+from .events import LOG, Event
+
+
+def _priority_key(row):
+    return -row.priority, row.index
+
+
+def _largest_key(row):
+    return -(row.value or 0), row.index
+
+
+def _deadline_key(row):
+    return row.deadline is None, row.deadline or 0.0, row.index
+
+
+# Sending orders: sheet order, Priority column (highest first), largest
+# amount first, cheapest gas first and earliest Deadline first
+POLICIES = ('sheet', 'priority', 'largest', 'cheapest_gas', 'deadline')
+
+_ORDER_KEYS = {
+    'priority': _priority_key,
+    'largest': _largest_key,
+    'deadline': _deadline_key,
+}
+
+
+# Orders the rows of a run before the engine hands them out and, with
+# `max_gas_price` set, holds back rows below `min_priority` while the
+# network gas price is above it. Held rows go out as soon as gas is cheap
+# again, or when their Deadline is less than `deadline_margin` seconds away.
+class Scheduler:
+    def __init__(self, policy='sheet', max_gas_price=None, min_priority=1, check_interval=15,
+                 deadline_margin=600):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy {policy!r}; use one of {', '.join(POLICIES)}")
+        self.policy = policy
+        self.max_gas_price = max_gas_price
+        self.min_priority = min_priority
+        self.check_interval = check_interval
+        self.deadline_margin = deadline_margin
+        self.gas_price = None
+        self.checked_at = 0.0
+
+    # Gas each row is expected to burn; token transfers creating a new
+    # holder (recipient balance zero) cost more than ones to existing holders
+    def _gas_key(self, rows, engine):
+        new_holders = empty_recipients(engine.web3, rows)
+
+        def key(row):
+            new_holder = (row.token, row.address) in new_holders
+            return expected_transfer_gas(row.token, new_holder), row.index
+        return key
+
+    def order(self, rows, engine):
+        if self.policy == 'sheet':
+            return rows
+        rows = list(rows)
+        key = self._gas_key(rows, engine) if self.policy == 'cheapest_gas' else _ORDER_KEYS[self.policy]
+        return sorted(rows, key=key)
+
+    def _gas_too_high(self, web3):
+        now = time.monotonic()
+        if self.gas_price is None or now - self.checked_at >= self.check_interval:
+            self.gas_price = web3.eth.gas_price
+            self.checked_at = now
+        return self.gas_price > self.max_gas_price
+
+    def _urgent(self, row):
+        return (row.priority >= self.min_priority or
+                (row.deadline is not None and row.deadline - time.time() <= self.deadline_margin))
+
+    # Rows in sending order; blocks while only held-back rows are left
+    def schedule(self, rows, engine, emit):
+        rows = self.order(rows, engine)
+        if self.max_gas_price is None:
+            yield from rows
+            return
+
+        web3 = engine.web3
+        held = deque()
+        for row in rows:
+            too_high = self._gas_too_high(web3)
+            if too_high and not self._urgent(row):
+                if not held:
+                    emit(Event(LOG, message=f"Gas price {Web3.from_wei(self.gas_price, 'gwei')} gwei is above "
+                                            f"{Web3.from_wei(self.max_gas_price, 'gwei')} gwei: holding rows "
+                                            f"below priority {self.min_priority:g}"))
+                held.append(row)
+                continue
+            if not too_high:
+                yield from self._release(held, emit)
+            yield row
+
+        while held:
+            if self._gas_too_high(web3):
+                urgent = [row for row in held if self._urgent(row)]
+                if urgent:
+                    held = deque(row for row in held if not self._urgent(row))
+                    yield from urgent
+                else:
+                    time.sleep(self.check_interval)
+                continue
+            yield from self._release(held, emit)
+
+    def _release(self, held, emit):
+        if held:
+            emit(Event(LOG, message=f"Gas price back to {Web3.from_wei(self.gas_price, 'gwei')} gwei: "
+                                    f"sending {len(held)} held rows"))
+        while held:
+            yield held.popleft()
+
+
+# Build a scheduler from a job's `schedule` mapping:
+#   schedule: {policy: priority, max_gas_price_gwei: 30, min_priority: 1}
+def scheduler_from_options(options):
+    if not options:
+        return None
+    if isinstance(options, str):
+        options = {'policy': options}
+    max_gas = options.get('max_gas_price_gwei')
+    if options.get('policy', 'sheet') == 'sheet' and max_gas is None:
+        # Plain sheet order needs no scheduler
+        return None
+    return Scheduler(
+        policy=options.get('policy', 'sheet'),
+        max_gas_price=Web3.to_wei(str(max_gas), 'gwei') if max_gas is not None else None,
+        min_priority=float(options.get('min_priority', 1)),
+        check_interval=float(options.get('check_interval', 15)),
+        deadline_margin=float(options.get('deadline_margin', 600)),
+    )
+
+
+# SCHEDULE=<policy>, SCHEDULE_MAX_GAS_GWEI, SCHEDULE_MIN_PRIORITY
+def scheduler_from_env(environ):
+    options = {}
+    if environ.get('SCHEDULE'):
+        options['policy'] = environ['SCHEDULE'].lower()
+    if environ.get('SCHEDULE_MAX_GAS_GWEI'):
+        options['max_gas_price_gwei'] = environ['SCHEDULE_MAX_GAS_GWEI']
+    if environ.get('SCHEDULE_MIN_PRIORITY'):
+        options['min_priority'] = environ['SCHEDULE_MIN_PRIORITY']
+    return scheduler_from_options(options)
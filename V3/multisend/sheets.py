@@ -0,0 +1,83 @@
+import csv
+import os
+from datetime import datetime, timezone
+
+REQUIRED_COLUMNS = ("Amount", "Receiver")
+
+
+# (receiver, amount) rows of a sheet. The optional scheduling columns ride
+# along as parallel lists: `priorities` (Priority, higher goes first) and
+# `deadlines` (Deadline as epoch seconds), None when the sheet lacks them.
+class TransferList(list):
+    def __init__(self, rows=(), priorities=None, deadlines=None):
+        super().__init__(rows)
+        self.priorities = priorities
+        self.deadlines = deadlines
+
+
+def _priority(value):
+    text = str(value).strip() if value is not None else ''
+    if not text or text.lower() == 'nan':
+        return 0
+    return float(text)
+
+
+# Excel dates arrive as timestamps, CSV ones as ISO 8601 text; times without
+# a zone are taken as UTC
+def _deadline(value):
+    if value is None or value != value or value == '':
+        return None
+    if not hasattr(value, 'timestamp'):
+        value = datetime.fromisoformat(str(value).strip())
+    if getattr(value, 'tzinfo', None) is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+# CSV sheets are read with the csv module so plain-text jobs never pay for
+# importing pandas
+def _read_csv(file_path):
+    with open(file_path, newline='', encoding='utf-8-sig') as fh:
+        reader = csv.DictReader(fh)
+        if not reader.fieldnames or any(column not in reader.fieldnames for column in REQUIRED_COLUMNS):
+            raise ValueError("CSV file must have 'Amount' and 'Receiver' columns.")
+        has_priority, has_deadline = 'Priority' in reader.fieldnames, 'Deadline' in reader.fieldnames
+        transfers = TransferList(priorities=[] if has_priority else None,
+                                 deadlines=[] if has_deadline else None)
+        for row in reader:
+            receiver = (row['Receiver'] or '').strip()
+            amount = (row['Amount'] or '').strip()
+            if receiver or amount:
+                transfers.append((receiver, amount))
+                if has_priority:
+                    transfers.priorities.append(_priority(row['Priority']))
+                if has_deadline:
+                    transfers.deadlines.append(_deadline(row['Deadline']))
+        return transfers
+
+
+def _read_excel(file_path):
+    import pandas as pd
+
+    # dtype=str keeps the shortest text of each numeric cell ("0.1", not 0.1000000000000000055)
+    data = pd.read_excel(file_path, dtype={'Amount': str})
+    if "Amount" not in data.columns or "Receiver" not in data.columns:
+        raise ValueError("Excel file must have 'Amount' and 'Receiver' columns.")
+    amounts = data['Amount'].fillna('').str.strip()
+    priorities = deadlines = None
+    if 'Priority' in data.columns:
+        priorities = [_priority(value) for value in data['Priority']]
+    if 'Deadline' in data.columns:
+        deadlines = [_deadline(value) for value in data['Deadline']]
+    return TransferList(zip(data['Receiver'], amounts), priorities, deadlines)
+
+
+# Read the Amount/Receiver rows of a transfer sheet (.csv, .xlsx or .xls) as
+# (receiver, amount) pairs. Amounts stay the text of the cell ("12.5"), never
+# floats; amounts.parse_units turns them into exact base units once the
+# token's decimals are known. Optional Priority / Deadline columns are kept
+# on the returned TransferList for the scheduler.
+def read_transfers(file_path):
+    if os.path.splitext(file_path)[1].lower() == '.csv':
+        return _read_csv(file_path)
+    return _read_excel(file_path)
@@ -0,0 +1,139 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.multisend', 'token_cache.json')
+# Metadata rarely changes, but proxies can be upgraded; re-read weekly
+DEFAULT_TTL = 7 * 24 * 3600
+# Fields an entry needs before load_token can build a Token from it
+CORE_FIELDS = ('decimals', 'symbol')
+
+
+# On-disk token metadata keyed by (chain id, token address): decimals,
+# symbol, name, measured transfer gas and whether the token takes a fee on
+# transfer. Entries older than `ttl` seconds, or without the core fields,
+# are ignored and re-read from chain. Every write re-reads the file under
+# an exclusive lock and changes only its own entries, so parallel runs
+# (several chains, the daemon and the CLI) do not drop each other's, and
+# goes through a temp file + rename so a crash never leaves a truncated
+# cache behind.
+class TokenCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = None
+
+    @staticmethod
+    def _key(chain_id, address):
+        return f"{int(chain_id)}:{address.lower()}"
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as fh:
+                entries = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _load(self):
+        if self.entries is None:
+            self.entries = self._read()
+        return self.entries
+
+    # Exclusive lock on a side file, held while the cache is read and rewritten
+    @contextmanager
+    def _file_lock(self):
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path + '.lock', 'a+b') as fh:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+                else:
+                    fh.seek(0)
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+    # Apply `change(entries)` to the file's current entries and write them back
+    def _update(self, change):
+        with self.lock:
+            try:
+                with self._file_lock():
+                    self.entries = self._read()
+                    result = change(self.entries)
+                    self._save()
+            except OSError:
+                # Cache directory not writable: keep the change in memory only
+                result = change(self._load())
+            return result
+
+    def _save(self):
+        directory = os.path.dirname(self.path) or '.'
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+                json.dump(self.entries, fh, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    # The entry, or None when it is missing, expired or lacks a core field
+    # (e.g. only gas was written after an invalidation)
+    def get(self, chain_id, address):
+        with self.lock:
+            entry = self._load().get(self._key(chain_id, address))
+        if entry is None or time.time() - entry.get('cached_at', 0) > self.ttl:
+            return None
+        if any(entry.get(field) is None for field in CORE_FIELDS):
+            return None
+        return entry
+
+    # Merge `fields` into the entry; a refresh of the core metadata restarts the TTL
+    def put(self, chain_id, address, **fields):
+        def change(entries):
+            entry = entries.setdefault(self._key(chain_id, address), {})
+            entry.update(fields)
+            if 'decimals' in fields or 'cached_at' not in entry:
+                entry['cached_at'] = time.time()
+            return entry
+        return self._update(change)
+
+    def invalidate(self, chain_id=None, address=None):
+        def change(entries):
+            if chain_id is None:
+                entries.clear()
+            elif address is None:
+                prefix = f"{int(chain_id)}:"
+                for key in [key for key in entries if key.startswith(prefix)]:
+                    del entries[key]
+            else:
+                entries.pop(self._key(chain_id, address), None)
+        self._update(change)
+
+
+# TOKEN_CACHE=off disables the cache; otherwise it is the cache file path.
+# TOKEN_CACHE_TTL is in hours.
+def token_cache_from_env(environ):
+    path = environ.get('TOKEN_CACHE') or DEFAULT_CACHE_PATH
+    if path.lower() in ('off', '0', 'none'):
+        return None
+    ttl = environ.get('TOKEN_CACHE_TTL')
+    return TokenCache(path, float(ttl) * 3600 if ttl else DEFAULT_TTL)
@@ -0,0 +1,268 @@
+import csv
+import hashlib
+import hmac
+import json
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from eth_keys import keys
+
+# secp256k1 group order
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+HARDENED = 0x80000000
+# BIP-44 parent of every Ethereum account: m/44'/60'/0'/0/<index>
+ETHEREUM_ACCOUNT_PATH = "m/44'/60'/0'/0"
+
+# Rows per worksheet in an xlsx file, header included
+XLSX_MAX_ROWS = 1048576
+
+Wallet = namedtuple('Wallet', ['index', 'address', 'private_key', 'keystore'])
+
+
+def new_mnemonic(num_words=24):
+    from eth_account.hdaccount import Language, generate_mnemonic
+    return generate_mnemonic(num_words, Language.ENGLISH)
+
+
+# Raises ValueError for a mnemonic that is not valid BIP-39
+def seed_from_mnemonic(mnemonic, passphrase=''):
+    from eth_account.hdaccount import seed_from_mnemonic as _seed_from_mnemonic
+    from eth_utils import ValidationError
+    try:
+        return _seed_from_mnemonic(mnemonic, passphrase)
+    except ValidationError as e:
+        raise ValueError(f"Invalid mnemonic: {e}") from None
+
+
+def parse_path(path):
+    parts = path.split('/')
+    if parts[0] != 'm':
+        raise ValueError(f"Derivation path must start with 'm': {path}")
+    indexes = []
+    for part in parts[1:]:
+        hardened = part.endswith("'")
+        index = int(part.rstrip("'"))
+        indexes.append(index + HARDENED if hardened else index)
+    return indexes
+
+
+def public_key_compressed(private_key):
+    return keys.PrivateKey(private_key).public_key.to_compressed_bytes()
+
+
+# BIP-32 private child key derivation (CKDpriv)
+def derive_child(private_key, chain_code, index, public_key=None):
+    if index >= HARDENED:
+        data = b'\x00' + private_key + index.to_bytes(4, 'big')
+    else:
+        data = (public_key or public_key_compressed(private_key)) + index.to_bytes(4, 'big')
+    digest = hmac.new(chain_code, data, hashlib.sha512).digest()
+    tweak = int.from_bytes(digest[:32], 'big')
+    child = (tweak + int.from_bytes(private_key, 'big')) % SECP256K1_N
+    if tweak >= SECP256K1_N or child == 0:
+        raise ValueError(f"Invalid BIP-32 child at index {index}")
+    return child.to_bytes(32, 'big'), digest[32:]
+
+
+# Extended private key (key, chain code) at `path` below the seed's master key
+def derive_node(seed, path=ETHEREUM_ACCOUNT_PATH):
+    digest = hmac.new(b'Bitcoin seed', seed, hashlib.sha512).digest()
+    private_key, chain_code = digest[:32], digest[32:]
+    for index in parse_path(path):
+        private_key, chain_code = derive_child(private_key, chain_code, index)
+    return private_key, chain_code
+
+
+def address_of(private_key):
+    return keys.PrivateKey(private_key).public_key.to_checksum_address()
+
+
+# eth-account's default KDF and parameters (scrypt), unless PBKDF2 with
+# `iterations` rounds is asked for explicitly
+def _keystore(private_key, password, iterations):
+    from eth_account import Account
+    if iterations is None:
+        return Account.encrypt(private_key, password)
+    return Account.encrypt(private_key, password, kdf='pbkdf2', iterations=iterations)
+
+
+def _wallet(index, private_key, password, iterations):
+    keystore = _keystore(private_key, password, iterations) if password is not None else None
+    return Wallet(index, address_of(private_key), '0x' + private_key.hex(), keystore)
+
+
+# Process-pool workers: each produces one contiguous chunk of wallets
+def _random_chunk(start, count, password, iterations):
+    wallets = []
+    index = start
+    while len(wallets) < count:
+        private_key = os.urandom(32)
+        if not 0 < int.from_bytes(private_key, 'big') < SECP256K1_N:
+            continue
+        wallets.append(_wallet(index, private_key, password, iterations))
+        index += 1
+    return wallets
+
+
+def _hd_chunk(start, count, password, iterations, parent_key, parent_chain):
+    # The parent's public key is shared by every non-hardened child
+    parent_public = public_key_compressed(parent_key)
+    wallets = []
+    for index in range(start, start + count):
+        private_key, _ = derive_child(parent_key, parent_chain, index, parent_public)
+        wallets.append(_wallet(index, private_key, password, iterations))
+    return wallets
+
+
+# Yield `count` wallets in index order, generated across a process pool.
+# With a mnemonic the keys are derived at m/44'/60'/0'/0/<start + i>;
+# otherwise they are random. Only a bounded window of chunks is in flight,
+# so memory does not grow with `count`. Keystores use eth-account's default
+# KDF; `keystore_iterations` opts into faster, weaker PBKDF2 with that many
+# rounds.
+def generate_wallets(count, mnemonic=None, passphrase='', start=0, workers=None, chunk_size=2000,
+                     keystore_password=None, keystore_iterations=None):
+    extra = ()
+    worker = _random_chunk
+    if mnemonic:
+        worker = _hd_chunk
+        extra = derive_node(seed_from_mnemonic(mnemonic, passphrase))
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        next_start = start
+        end = start + count
+        while next_start < end or pending:
+            while next_start < end and len(pending) < workers * 2:
+                size = min(chunk_size, end - next_start)
+                pending.append(pool.submit(worker, next_start, size, keystore_password,
+                                           keystore_iterations, *extra))
+                next_start += size
+            yield from pending.popleft().result()
+
+
+# Wallets derived on demand from one mnemonic. The account-level parent node is
+# derived once; any child index then costs a single CKD step, so wallet
+# #250,000 is as cheap as wallet #0 and no key file has to be read. Recently
+# used accounts are kept in an LRU cache.
+class HDWalletSet:
+    def __init__(self, mnemonic, passphrase='', path=ETHEREUM_ACCOUNT_PATH, cache_size=4096):
+        self.path = path
+        self.parent_key, self.parent_chain = derive_node(seed_from_mnemonic(mnemonic, passphrase), path)
+        self.parent_public = public_key_compressed(self.parent_key)
+        self.account = lru_cache(maxsize=cache_size)(self._derive_account)
+
+    def private_key(self, index):
+        if not 0 <= index < HARDENED:
+            raise ValueError(f"Wallet index out of range: {index}")
+        private_key, _ = derive_child(self.parent_key, self.parent_chain, index, self.parent_public)
+        return private_key
+
+    def _derive_account(self, index):
+        from eth_account import Account
+        return Account.from_key(self.private_key(index))
+
+    def address(self, index):
+        return self.account(index).address
+
+    def __getitem__(self, index):
+        return self.account(index)
+
+    # Accounts for an index range, derived lazily
+    def accounts(self, start, stop):
+        for index in range(start, stop):
+            yield self.account(index)
+
+
+# Sender account from the environment: PRIVATE_KEY, or MNEMONIC (+ optional
+# MNEMONIC_PASSPHRASE) with WALLET_INDEX selecting the HD child
+def account_from_env(environ):
+    mnemonic = environ.get('MNEMONIC')
+    if mnemonic:
+        wallets = HDWalletSet(mnemonic, environ.get('MNEMONIC_PASSPHRASE') or '')
+        return wallets.account(int(environ.get('WALLET_INDEX') or 0))
+    return environ.get('PRIVATE_KEY')
+
+
+# Streaming wallet sinks. Each takes wallets one at a time and keeps nothing.
+class WalletCsvWriter:
+    def __init__(self, filename, include_keys=True):
+        self.filename = filename
+        self.include_keys = include_keys
+        self.file = open(filename, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['Index', 'Wallet Address', 'Private Key'] if include_keys else ['Index', 'Wallet Address'])
+
+    def write(self, wallet):
+        if self.include_keys:
+            self.writer.writerow([wallet.index, wallet.address, wallet.private_key])
+        else:
+            self.writer.writerow([wallet.index, wallet.address])
+
+    def close(self):
+        self.file.close()
+
+
+# Write-only xlsx (constant_memory); rolls over to a new sheet when one fills up
+class WalletXlsxWriter:
+    def __init__(self, filename, include_keys=True):
+        import xlsxwriter
+
+        self.filename = filename
+        self.include_keys = include_keys
+        self.workbook = xlsxwriter.Workbook(filename, {'constant_memory': True})
+        self.sheets = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self.sheets += 1
+        title = "Ethereum Wallets" if self.sheets == 1 else f"Ethereum Wallets {self.sheets}"
+        self.sheet = self.workbook.add_worksheet(title)
+        self.sheet.set_column(0, 0, 45)
+        if self.include_keys:
+            self.sheet.set_column(1, 1, 70)
+            self.sheet.write_row(0, 0, ["Wallet Address", "Private Key"])
+        else:
+            self.sheet.write_row(0, 0, ["Wallet Address", "Index"])
+        self.row = 1
+
+    def write(self, wallet):
+        if self.row >= XLSX_MAX_ROWS:
+            self._new_sheet()
+        second = wallet.private_key if self.include_keys else wallet.index
+        self.sheet.write_row(self.row, 0, [wallet.address, second])
+        self.row += 1
+
+    def close(self):
+        self.workbook.close()
+
+
+# One encrypted V3 keystore JSON file per wallet inside a directory
+class KeystoreWriter:
+    def __init__(self, directory):
+        self.filename = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, wallet):
+        if wallet.keystore is None:
+            raise ValueError("Keystore output needs a keystore password")
+        path = os.path.join(self.filename, f"{wallet.index:08d}--{wallet.address}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(wallet.keystore, f)
+
+    def close(self):
+        pass
+
+
+# .csv and .xlsx write a sheet; any other target is treated as a keystore directory.
+# Without `include_keys` only addresses (and HD indexes) are written.
+def open_wallet_writer(target, include_keys=True):
+    extension = os.path.splitext(target)[1].lower()
+    if extension == '.csv':
+        return WalletCsvWriter(target, include_keys)
+    if extension == '.xlsx':
+        return WalletXlsxWriter(target, include_keys)
+    return KeystoreWriter(target)
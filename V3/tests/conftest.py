@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+from eth_account import Account
+from eth_tester import EthereumTester
+from web3 import EthereumTesterProvider, Web3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from multisend.engine import TransferEngine  # noqa: E402
+
+EXPLORER_URL = 'https://explorer.invalid'
+
+
+# In-process chain (py-evm) with auto-mining; every test gets a fresh one
+@pytest.fixture
+def web3():
+    return Web3(EthereumTesterProvider(EthereumTester()))
+
+
+# A funded account the engine sends from
+@pytest.fixture
+def sender(web3):
+    account = Account.create()
+    web3.eth.wait_for_transaction_receipt(web3.eth.send_transaction(
+        {'from': web3.eth.accounts[0], 'to': account.address, 'value': Web3.to_wei(1000, 'ether')}))
+    return account
+
+
+@pytest.fixture
+def engine(web3, sender):
+    return TransferEngine(web3, sender.key, web3.eth.chain_id, EXPLORER_URL, max_workers=4, poll_latency=0.01)
+
+
+def new_addresses(count):
+    return [Account.create().address for _ in range(count)]
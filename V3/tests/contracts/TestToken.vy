@@ -0,0 +1,46 @@
+# pragma version ^0.4.0
+# ERC-20 for the test suite: can take a fee on every transfer (the recipient
+# is credited `amount - fee`), be paused, or block recipients.
+
+event Transfer:
+    sender: indexed(address)
+    receiver: indexed(address)
+    value: uint256
+
+name: public(String[32])
+symbol: public(String[8])
+decimals: public(uint8)
+totalSupply: public(uint256)
+balanceOf: public(HashMap[address, uint256])
+fee_bps: public(uint256)
+paused: public(bool)
+blacklisted: public(HashMap[address, bool])
+
+@deploy
+def __init__(supply: uint256, fee_bps: uint256):
+    self.name = "Test Token"
+    self.symbol = "TST"
+    self.decimals = 18
+    self.fee_bps = fee_bps
+    self.totalSupply = supply
+    self.balanceOf[msg.sender] = supply
+    log Transfer(sender=empty(address), receiver=msg.sender, value=supply)
+
+@external
+def set_paused(paused: bool):
+    self.paused = paused
+
+@external
+def set_blacklisted(account: address, blacklisted: bool):
+    self.blacklisted[account] = blacklisted
+
+@external
+def transfer(to: address, amount: uint256) -> bool:
+    assert not self.paused, "paused"
+    assert not self.blacklisted[to], "blacklisted"
+    fee: uint256 = amount * self.fee_bps // 10000
+    self.balanceOf[msg.sender] -= amount
+    self.balanceOf[to] += amount - fee
+    self.totalSupply -= fee
+    log Transfer(sender=msg.sender, receiver=to, value=amount - fee)
+    return True
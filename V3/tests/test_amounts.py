@@ -0,0 +1,56 @@
+from decimal import Decimal
+
+import pytest
+
+from multisend.amounts import describe_skipped, format_units, parse_units, total_amount
+
+
+@pytest.mark.parametrize('amount, decimals, expected', [
+    ('12.5', 18, 12500000000000000000),
+    (' 12.5 ', 18, 12500000000000000000),
+    ('+3', 6, 3000000),
+    ('.5', 6, 500000),
+    ('5.', 6, 5000000),
+    ('0', 18, 0),
+    ('0.000000000000000001', 18, 1),
+    ('1.500000000000000000000', 18, 1500000000000000000),
+    ('1e-6', 6, 1),
+    ('1E18', 0, 10 ** 18),
+    ('2.5e3', 2, 250000),
+    (3, 18, 3 * 10 ** 18),
+    (0.1, 18, 10 ** 17),
+    (1e-07, 18, 10 ** 11),
+    (Decimal('1.25'), 2, 125),
+    ('1.0', 0, 1),
+    ('123456789012345678901234567890.123456789012345678', 18,
+     123456789012345678901234567890123456789012345678),
+])
+def test_parse_units(amount, decimals, expected):
+    assert parse_units(amount, decimals) == expected
+
+
+@pytest.mark.parametrize('amount, decimals', [
+    ('', 18), ('.', 18), ('abc', 18), ('1,5', 18), ('1.2.3', 18), ('-1', 18), (-1, 18), ('nan', 18),
+    ('inf', 18), ('0x10', 18), (None, 18), (True, 18),
+    ('0.0000000000000000001', 18), ('1.5', 0), ('1.5e-19', 18), ('1.234', 2),
+])
+def test_parse_units_rejects(amount, decimals):
+    with pytest.raises(ValueError):
+        parse_units(amount, decimals)
+
+
+@pytest.mark.parametrize('value, decimals, text', [
+    (0, 18, '0'), (1, 18, '0.000000000000000001'), (1500000000000000000, 18, '1.5'), (42, 0, '42'),
+    (100, 2, '1'),
+])
+def test_format_units(value, decimals, text):
+    assert format_units(value, decimals) == text
+    assert parse_units(text, decimals) == value
+
+
+def test_total_amount_skips_and_reports_invalid_rows():
+    transfers = [('0xa', '1.5'), ('0xb', 'abc'), ('0xc', None), ('0xd', '2'), ('0xe', '0.1234567')]
+    total, skipped = total_amount(transfers, 6)
+    assert total == '3.5'
+    assert [(row, amount) for row, amount, _ in skipped] == [(2, 'abc'), (3, None), (5, '0.1234567')]
+    assert describe_skipped(skipped, limit=2)[-1] == '... and 1 more'
@@ -0,0 +1,151 @@
+import http.client
+import json
+import os
+import threading
+import time
+
+import pytest
+from web3 import Web3
+
+from conftest import new_addresses
+from multisend.daemon import CANCELLED, DONE_STATES, FINISHED, RUNNING, TransferDaemon, make_server
+
+TOKEN = 'test-token'
+
+
+def _sheet(path, rows):
+    with open(path, 'w', encoding='utf-8') as fh:
+        fh.write('Receiver,Amount\n')
+        fh.writelines(f'{recipient},{amount}\n' for recipient, amount in rows)
+
+
+# The daemon's HTTP API on an ephemeral loopback port, serving jobs from
+# `tmp_path/jobs`; the worker thread is only started by tests that send
+@pytest.fixture
+def server(engine, tmp_path):
+    base_dir = tmp_path / 'jobs'
+    base_dir.mkdir()
+    httpd = make_server(TransferDaemon(engine, preflight='off'), ('127.0.0.1', 0), token=TOKEN,
+                        base_dir=str(base_dir))
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _request(server, method, path, body=None, token=TOKEN, content_type='application/json', host=None):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+    headers = {}
+    if token is not None:
+        headers['Authorization'] = f'Bearer {token}'
+    if body is not None:
+        headers['Content-Type'] = content_type
+        body = json.dumps(body) if not isinstance(body, bytes) else body
+    if host is not None:
+        headers['Host'] = host
+    connection.request(method, path, body, headers)
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    if response.getheader('Content-Type') == 'application/x-ndjson':
+        return response.status, [json.loads(line) for line in data.splitlines()]
+    return response.status, json.loads(data)
+
+
+@pytest.mark.parametrize('token', [None, '', 'wrong', TOKEN + 'x'])
+def test_requests_without_the_token_are_refused(server, token):
+    status, body = _request(server, 'GET', '/health', token=token)
+    assert status == 401 and 'token' in body['error']
+    status, _ = _request(server, 'POST', '/jobs', {'transfers': []}, token=token)
+    assert status == 401 and not server.daemon.list()
+
+
+def test_tcp_server_refuses_to_start_without_a_token(engine):
+    with pytest.raises(ValueError):
+        make_server(TransferDaemon(engine), ('127.0.0.1', 0))
+
+
+# DNS rebinding: a page on another name resolving to 127.0.0.1 sends its own Host
+@pytest.mark.parametrize('host', ['evil.example', 'evil.example:8765', '127.0.0.1.evil.example'])
+def test_foreign_host_header_is_refused(server, host):
+    status, body = _request(server, 'GET', '/health', host=host)
+    assert status == 403
+
+
+@pytest.mark.parametrize('host', ['localhost', '127.0.0.1:8765', '[::1]:8765'])
+def test_loopback_host_header_is_accepted(server, engine, host):
+    status, body = _request(server, 'GET', '/health', host=host)
+    assert status == 200 and body['sender'] == engine.address
+
+
+# A cross-origin form or fetch without a preflight can only send text/plain
+# or form bodies
+@pytest.mark.parametrize('content_type', ['text/plain', 'application/x-www-form-urlencoded', ''])
+def test_job_must_be_posted_as_json(server, content_type):
+    status, body = _request(server, 'POST', '/jobs', {'transfers': [{'sheet': 'a.csv'}]},
+                            content_type=content_type)
+    assert status == 415 and not server.daemon.list()
+
+
+@pytest.mark.parametrize('spec', [b'{"job": ', b'[1, 2]', b'{"job": 5}', b'{"transfers": "a.csv"}'])
+def test_malformed_job_is_a_bad_request(server, spec):
+    status, body = _request(server, 'POST', '/jobs', spec)
+    assert status == 400 and body['error'] and not server.daemon.list()
+
+
+def _escapes(tmp_path):
+    outside = tmp_path / 'outside.csv'
+    _sheet(outside, [(new_addresses(1)[0], '1')])
+    (tmp_path / 'outside.json').write_text(json.dumps({'transfers': [{'sheet': 'jobs/x.csv'}]}))
+    os.symlink(outside, tmp_path / 'jobs' / 'link.csv')
+    return [
+        {'job': '../outside.json'},
+        {'job': str(tmp_path / 'outside.json')},
+        {'transfers': [{'sheet': '../outside.csv'}]},
+        {'transfers': [{'sheet': str(outside)}]},
+        {'transfers': [{'sheet': 'link.csv'}]},
+        {'transfers': [{'sheet': 'sub/../../outside.csv'}]},
+        {'transfers': [{'sheet': 'inside.csv'}], 'export': '../summary.csv'},
+        {'transfers': [{'sheet': 'inside.csv'}], 'export': '/tmp/summary.csv'},
+    ]
+
+
+def test_paths_outside_the_base_dir_are_rejected(server, tmp_path):
+    _sheet(tmp_path / 'jobs' / 'inside.csv', [(new_addresses(1)[0], '1')])
+    for spec in _escapes(tmp_path):
+        status, body = _request(server, 'POST', '/jobs', spec)
+        assert status == 400 and 'outside' in body['error'], spec
+    assert not server.daemon.list()
+
+
+def test_only_queued_jobs_can_be_cancelled(server, tmp_path):
+    _sheet(tmp_path / 'jobs' / 'a.csv', [(new_addresses(1)[0], '1')])
+    _, first = _request(server, 'POST', '/jobs', {'transfers': [{'sheet': 'a.csv'}]})
+    _, second = _request(server, 'POST', '/jobs', {'transfers': [{'sheet': 'a.csv'}]})
+    assert server.daemon.get(first['id']).claim()
+
+    status, body = _request(server, 'DELETE', f"/jobs/{first['id']}")
+    assert status == 409 and server.daemon.get(first['id']).status == RUNNING
+    status, body = _request(server, 'DELETE', f"/jobs/{second['id']}")
+    assert status == 200 and body['status'] == CANCELLED
+    status, _ = _request(server, 'DELETE', '/jobs/99')
+    assert status == 404
+
+
+def test_submitted_job_is_sent(server, web3, tmp_path):
+    recipients = new_addresses(3)
+    _sheet(tmp_path / 'jobs' / 'a.csv', [(recipient, '0.5') for recipient in recipients])
+    server.daemon.start()
+
+    status, job = _request(server, 'POST', '/jobs', {'transfers': [{'sheet': 'a.csv'}], 'name': 'airdrop'})
+    assert status == 202
+    deadline = time.monotonic() + 30
+    while job['status'] not in DONE_STATES and time.monotonic() < deadline:
+        time.sleep(0.05)
+        _, job = _request(server, 'GET', f"/jobs/{job['id']}")
+
+    assert job['status'] == FINISHED and job['successful'] == 3
+    status, rows = _request(server, 'GET', f"/jobs/{job['id']}/results")
+    assert [row['status'] for row in rows] == ['Success'] * 3
+    assert all(web3.eth.get_balance(recipient) == Web3.to_wei('0.5', 'ether') for recipient in recipients)
@@ -0,0 +1,78 @@
+import pytest
+import requests
+from web3 import Web3
+
+from conftest import new_addresses
+from multisend.engine import NonceManager
+from multisend.results import FAILED, SUCCESS
+
+
+def _assert_contiguous(web3, sender, results):
+    nonces = sorted(record.nonce for record in results if record.status == SUCCESS)
+    assert nonces == list(range(len(nonces)))
+    assert web3.eth.get_transaction_count(sender.address) == len(nonces)
+
+
+def test_nonce_is_only_taken_when_the_body_succeeds(web3, sender):
+    nonces = NonceManager(web3, sender.address)
+    with pytest.raises(RuntimeError):
+        with nonces.hold():
+            raise RuntimeError("rejected")
+    with nonces.hold() as nonce:
+        assert nonce == 0
+    assert nonces.peek() == 1
+
+
+def test_failed_rows_leave_no_nonce_gap(web3, sender, engine):
+    recipients = new_addresses(6)
+    transfers = [(recipients[0], '1'), ('not-an-address', '1'), (recipients[2], 'abc'),
+                 (recipients[3], '5000'), (recipients[4], '2'), (recipients[5], '0.5')]
+    results = engine.run_batch(transfers)
+
+    statuses = {record.index: record.status for record in results}
+    assert statuses == {1: SUCCESS, 2: FAILED, 3: FAILED, 4: FAILED, 5: SUCCESS, 6: SUCCESS}
+    assert results.successful == 3 and results.failed == 3
+    _assert_contiguous(web3, sender, results)
+    assert web3.eth.get_balance(recipients[4]) == Web3.to_wei(2, 'ether')
+
+
+def test_node_rejection_fails_only_its_row(web3, sender, engine):
+    send = web3.eth.send_raw_transaction
+    calls = []
+
+    def rejecting(raw_transaction):
+        calls.append(raw_transaction)
+        if len(calls) == 2:
+            raise ValueError({'code': -32000, 'message': 'intrinsic gas too low'})
+        return send(raw_transaction)
+
+    web3.eth.send_raw_transaction = rejecting
+    results = engine.run_batch([(recipient, '0.1') for recipient in new_addresses(5)])
+
+    assert results.successful == 4 and results.failed == 1
+    _assert_contiguous(web3, sender, results)
+
+
+# The node took the transaction but the answer was lost: the row must keep
+# its nonce instead of handing it to the next row
+def test_unanswered_send_that_reached_the_node_counts_as_sent(web3, sender, engine):
+    send = web3.eth.send_raw_transaction
+    calls = []
+
+    def flaky(raw_transaction):
+        calls.append(raw_transaction)
+        if len(calls) == 2:
+            send(raw_transaction)
+            raise requests.exceptions.ReadTimeout("read timed out")
+        if len(calls) == 4:
+            raise requests.exceptions.ConnectionError("connection reset")
+        return send(raw_transaction)
+
+    web3.eth.send_raw_transaction = flaky
+    results = engine.run_batch([(recipient, '0.1') for recipient in new_addresses(6)])
+
+    rows = sorted(results, key=lambda record: record.index)
+    assert rows[1].status == SUCCESS
+    assert rows[3].status == FAILED and rows[3].nonce is None
+    assert results.successful == 5
+    _assert_contiguous(web3, sender, results)
@@ -0,0 +1,39 @@
+from multisend.events import (CONFIRMED, FAILED, FINISHED, LOG, PROGRESS, SENT, STARTED, Event, EventBus,
+                              Progress)
+from multisend.results import TransferRecord
+
+
+def test_bus_keeps_the_latest_progress_and_no_row_events():
+    bus = EventBus()
+    record = TransferRecord(1, '0x' + '11' * 20, '1')
+    bus.publish(Event(STARTED, progress=Progress(3, 0, 0, 0)))
+    for done in range(1, 4):
+        bus.publish(Event(SENT, record=record))
+        bus.publish(Event(CONFIRMED if done < 3 else FAILED, record=record))
+        bus.publish(Event(PROGRESS, progress=Progress(3, done, done - 1, 0)))
+
+    progress, drained = bus.drain()
+    assert progress == Progress(3, 3, 2, 0)
+    assert [event.kind for event in drained] == [STARTED]
+    assert bus.drain() == (None, [])
+
+
+# However many rows a fast run reports, no log line is lost; the consumer
+# takes them a frame's worth at a time
+def test_log_lines_are_never_dropped_and_drained_per_frame():
+    bus = EventBus()
+    record = TransferRecord(1, '0x' + '11' * 20, '1')
+    for number in range(20000):
+        bus.publish(Event(SENT, record=record))
+        if number % 10 == 0:
+            bus.log(f"line {number // 10}")
+    bus.publish(Event(FINISHED, progress=Progress(1, 1, 1, 0)))
+
+    lines = []
+    while True:
+        _, drained = bus.drain(500)
+        if not drained:
+            break
+        assert len(drained) <= 500
+        lines.extend(event.message for event in drained if event.kind == LOG)
+    assert lines == [f"line {number}" for number in range(2000)]
@@ -0,0 +1,91 @@
+import requests
+from web3 import Web3
+
+from conftest import new_addresses
+from multisend.addresses import address_bytes
+from multisend.events import CONFIRMED
+from multisend.finality import FinalityTracker, _Included
+from multisend.results import SUCCESS, TransferRecord
+
+
+# Mine a 1 ETH transfer with `nonce` and track it the way the engine does
+def _track(web3, engine, batch, tracker, recipient, nonce):
+    signed = engine.sign_native(address_bytes(recipient), Web3.to_wei(1, 'ether'), nonce)
+    tx_hash = web3.eth.send_raw_transaction(signed.raw_transaction)
+    receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+    record = TransferRecord(nonce + 1, recipient, '1')
+    record.hash = web3.to_hex(tx_hash)
+    batch.results.add(record)
+    batch.results.include(record)
+    entry = _Included(record, signed.raw_transaction, receipt['blockNumber'], bytes(receipt['blockHash']),
+                      batch, engine._finish)
+    tracker.pending[entry] = None
+    return entry
+
+
+def _confirmed(events):
+    return sum(event.kind == CONFIRMED for event in events)
+
+
+def test_transfer_settles_once_it_is_deep_enough(web3, engine):
+    events = []
+    batch = engine._new_batch([None], events.append, 1)
+    tracker = FinalityTracker(web3, confirmations=3)
+    entry = _track(web3, engine, batch, tracker, new_addresses(1)[0], 0)
+
+    assert tracker.check([entry]) == []
+    web3.provider.ethereum_tester.mine_blocks(2)
+    assert tracker.check([entry]) == [entry]
+    assert not tracker.pending
+    assert batch.results.successful == 1 and _confirmed(events) == 1
+
+
+# The block is reorganized away: the same signed transaction is broadcast
+# again, found in its new block and settled once that one is final
+def test_reorged_transfer_is_rebroadcast_and_settled_once(web3, sender, engine):
+    tester = web3.provider.ethereum_tester
+    events = []
+    batch = engine._new_batch([None], events.append, 1)
+    tracker = FinalityTracker(web3, confirmations=2)
+    snapshot = tester.take_snapshot()
+    entry = _track(web3, engine, batch, tracker, new_addresses(1)[0], 0)
+    mined_in = entry.block_hash
+
+    tester.revert_to_snapshot(snapshot)
+    tester.mine_blocks(2)
+    assert tracker.check([entry]) == []
+    assert tracker.reorgs == 1 and web3.eth.get_transaction_count(sender.address) == 1
+
+    assert tracker.check([entry]) == []
+    assert entry.dropped_at is None and entry.block_hash != mined_in
+    tester.mine_blocks(1)
+    assert tracker.check([entry]) == [entry]
+    assert batch.results.successful == 1 and _confirmed(events) == 1
+
+
+# An RPC error while re-checking one transfer must not undo the others
+# settled in the same round: each is finished exactly once
+def test_rpc_error_mid_check_finishes_each_transfer_once(web3, engine):
+    events = []
+    batch = engine._new_batch([None], events.append, 2)
+    tracker = FinalityTracker(web3, confirmations=1)
+    first, second = new_addresses(2)
+    settled = _track(web3, engine, batch, tracker, first, 0)
+    reorged = _track(web3, engine, batch, tracker, second, 1)
+    reorged.block_hash = bytes(32)
+    lookup = web3.eth.get_transaction_receipt
+
+    def failing(tx_hash):
+        raise requests.exceptions.ConnectionError("connection reset")
+
+    web3.eth.get_transaction_receipt = failing
+    assert tracker.check(list(tracker.pending)) == [settled]
+    assert list(tracker.pending) == [reorged]
+
+    web3.eth.get_transaction_receipt = lookup
+    assert tracker.check(list(tracker.pending)) == []
+    web3.provider.ethereum_tester.mine_blocks(1)
+    assert tracker.check(list(tracker.pending)) == [reorged]
+    assert not tracker.pending
+    assert batch.results.successful == 2 and _confirmed(events) == 2
+    assert all(record.status == SUCCESS for record in batch.results)
@@ -0,0 +1,114 @@
+import threading
+
+from conftest import new_addresses
+from multisend.inflight import InflightWindow, is_pool_full_error
+
+
+def _fill(window, count):
+    for _ in range(count):
+        window.acquire()
+
+
+# Run `action` on a thread; returns the thread once it is blocked or done
+def _background(action):
+    thread = threading.Thread(target=action, daemon=True)
+    thread.start()
+    thread.join(0.1)
+    return thread
+
+
+def test_window_grows_by_one_after_a_full_window_is_mined():
+    window = InflightWindow(initial=4, maximum=5)
+    _fill(window, 4)
+    for _ in range(3):
+        window.release(mined=True)
+    assert window.limit == 4
+    window.release(mined=True)
+    assert window.limit == 5
+
+    # Capped at the maximum however much is mined
+    for _ in range(20):
+        window.acquire()
+        window.release(mined=True)
+    assert window.limit == 5
+
+
+def test_unmined_releases_do_not_grow_the_window():
+    window = InflightWindow(initial=2)
+    for _ in range(10):
+        window.acquire()
+        window.release()
+    assert window.limit == 2 and window.in_flight == 0
+
+
+def test_acquire_waits_for_a_free_slot():
+    window = InflightWindow(initial=2)
+    _fill(window, 2)
+    waiting = _background(window.acquire)
+    assert waiting.is_alive()
+    window.release(mined=True)
+    waiting.join(1)
+    assert not waiting.is_alive() and window.in_flight == 2
+
+
+# "txpool is full" with 6 in flight: the node held the other 5, so the
+# window shrinks to 5 and the rejected send waits for one of them
+def test_pool_full_rejection_shrinks_to_what_the_node_held():
+    window = InflightWindow(initial=8)
+    _fill(window, 6)
+    assert is_pool_full_error(ValueError({'code': -32000, 'message': 'txpool is full'}))
+
+    retrying = _background(window.rejected)
+    assert retrying.is_alive()
+    assert window.limit == 5 and window.in_flight == 5 and window.rejections == 1
+    window.release(mined=True)
+    retrying.join(1)
+    assert not retrying.is_alive() and window.in_flight == 5
+
+
+def test_dropped_transaction_shrinks_the_window_and_resets_growth():
+    window = InflightWindow(initial=8, minimum=2)
+    _fill(window, 6)
+    window.release(mined=True)
+    window.dropped()
+    assert window.limit == 4 and window.mined_streak == 0
+
+    for _ in range(3):
+        window.release()
+    window.dropped()
+    window.dropped()
+    assert window.limit == 2
+
+
+def test_window_recovers_after_shrinking():
+    window = InflightWindow(initial=8)
+    _fill(window, 3)
+    window.dropped()
+    assert window.limit == 2
+    for _ in range(3):
+        window.release(mined=True)
+    assert window.limit == 3
+    for _ in range(5):
+        window.acquire()
+        window.release(mined=True)
+    assert window.limit == 4
+
+
+# The node refuses one send as full: the row is retried once a slot frees
+# up, and no nonce is skipped or used twice
+def test_engine_retries_a_send_the_node_refused_as_full(web3, sender, engine):
+    send = web3.eth.send_raw_transaction
+    calls = []
+
+    def full_once(raw_transaction):
+        calls.append(raw_transaction)
+        if len(calls) == 3:
+            raise ValueError({'code': -32000, 'message': 'txpool is full'})
+        return send(raw_transaction)
+
+    web3.eth.send_raw_transaction = full_once
+    results = engine.run_batch([(recipient, '0.1') for recipient in new_addresses(6)])
+
+    assert results.successful == 6 and engine.window.rejections == 1
+    assert len(calls) == 7
+    assert sorted(record.nonce for record in results) == list(range(6))
@@ -0,0 +1,57 @@
+from conftest import EXPLORER_URL, new_addresses
+from multisend.events import LOG
+from multisend.export import export_failed
+from multisend.results import FAILED, SUCCESS
+from tokens import deploy_token
+
+
+def _send(engine, contract, recipients, amount='1'):
+    token = engine.load_token(contract.address)
+    return token, engine.run_batch([(recipient, amount) for recipient in recipients], token)
+
+
+def test_token_batch_is_confirmed_from_logs(web3, sender, engine):
+    contract = deploy_token(web3, sender)
+    recipients = new_addresses(6)
+    receipts = []
+    get_receipt = web3.eth.get_transaction_receipt
+    web3.eth.get_transaction_receipt = lambda tx_hash: receipts.append(tx_hash) or get_receipt(tx_hash)
+
+    _, results = _send(engine, contract, recipients)
+
+    assert results.successful == 6 and results.failed == 0
+    assert all(record.error is None for record in results)
+    assert engine.log_verifier.queries > 0 and not receipts
+    assert [contract.functions.balanceOf(recipient).call() for recipient in recipients] == [10 ** 18] * 6
+
+
+# A short credit is flagged on a successful row: it was mined, so it must
+# never land in the failed export that operators resend from
+def test_fee_on_transfer_shortfall_is_flagged_not_failed(web3, sender, engine, tmp_path):
+    contract = deploy_token(web3, sender, fee_bps=100)
+    recipients = new_addresses(4)
+    logged = []
+
+    token = engine.load_token(contract.address)
+    results = engine.run_batch([(recipient, '1') for recipient in recipients], token,
+                               lambda event: event.kind == LOG and logged.append(event.message))
+
+    assert results.successful == 4 and results.failed == 0
+    for record in results:
+        assert record.status == SUCCESS
+        assert record.hash is not None
+        assert record.error == "Mined, but the recipient received 0.99 of 1 TST"
+    assert len(logged) == 4 and not results.failures()
+    assert export_failed(results, str(tmp_path / 'failed.csv'), EXPLORER_URL) == 0
+
+
+def test_reverted_transfer_is_told_apart_from_a_shortfall(web3, sender, engine):
+    contract = deploy_token(web3, sender)
+    recipients = new_addresses(4)
+    contract.functions.set_blacklisted(recipients[2], True).transact({'from': web3.eth.accounts[0]})
+
+    _, results = _send(engine, contract, recipients)
+
+    statuses = {record.index: (record.status, record.error) for record in results}
+    assert statuses[3] == (FAILED, "Transaction reverted")
+    assert [statuses[index][0] for index in (1, 2, 4)] == [SUCCESS] * 3
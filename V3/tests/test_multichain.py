@@ -0,0 +1,83 @@
+import pytest
+from eth_account import Account
+from eth_tester import EthereumTester
+from web3 import EthereumTesterProvider, Web3
+
+from conftest import new_addresses
+from multisend import multichain
+from multisend.events import PROGRESS
+from multisend.jobs import job_from_spec
+from multisend.multichain import MultiChainDispatcher
+from multisend.results import SUCCESS
+
+
+def _fund(web3, address):
+    web3.eth.wait_for_transaction_receipt(web3.eth.send_transaction(
+        {'from': web3.eth.accounts[0], 'to': address, 'value': Web3.to_wei(100, 'ether')}))
+
+
+def _sheet(path, recipients):
+    path.write_text('Receiver,Amount\n' + ''.join(f'{recipient},0.5\n' for recipient in recipients))
+
+
+# Two independent in-process chains the dispatcher reaches by RPC URL, with
+# the sender funded on both; chain "b" has already used two of its nonces
+@pytest.fixture
+def chains(monkeypatch):
+    sender = Account.create()
+    chains = {name: Web3(EthereumTesterProvider(EthereumTester())) for name in ('http://a', 'http://b')}
+    for web3 in chains.values():
+        _fund(web3, sender.address)
+    for _ in range(2):
+        signed = sender.sign_transaction({'to': sender.address, 'value': 0, 'gas': 21000, 'nonce':
+                                          chains['http://b'].eth.get_transaction_count(sender.address),
+                                          'gasPrice': chains['http://b'].eth.gas_price,
+                                          'chainId': chains['http://b'].eth.chain_id})
+        chains['http://b'].eth.wait_for_transaction_receipt(
+            chains['http://b'].eth.send_raw_transaction(signed.raw_transaction))
+    monkeypatch.setattr(multichain, 'connect', lambda rpc_url, limiter: chains[rpc_url])
+    return sender, chains
+
+
+def _job(tmp_path, chains, chain_ids=None):
+    entries = []
+    for number, (name, web3) in enumerate(chains.items()):
+        sheet = tmp_path / f'chain{number}.csv'
+        _sheet(sheet, new_addresses(3))
+        chain_id = (chain_ids or {}).get(name, web3.eth.chain_id)
+        entries.append({'name': name[-1], 'rpc_url': name, 'chain_id': chain_id,
+                        'transfers': [{'sheet': sheet.name}]})
+    return job_from_spec({'chains': entries}, str(tmp_path))
+
+
+def test_chains_run_on_their_own_nonce_streams(chains, tmp_path):
+    sender, chains = chains
+    job = _job(tmp_path, chains)
+    dispatcher = MultiChainDispatcher(job, sender.key, {'max_workers': 4, 'poll_latency': 0.01})
+    events = []
+    runs = dispatcher.run(events.append)
+
+    nonces = {}
+    for run in runs:
+        assert run.error is None and run.results.successful == 3
+        assert all(record.status == SUCCESS for record in run.results)
+        nonces[run.name] = sorted(record.nonce for record in run.results)
+        web3 = chains[run.spec.rpc_url]
+        for record in run.results:
+            assert web3.eth.get_balance(record.recipient) == Web3.to_wei('0.5', 'ether')
+            other = chains['http://b' if run.name == 'a' else 'http://a']
+            assert other.eth.get_balance(record.recipient) == 0
+    assert nonces == {'a': [0, 1, 2], 'b': [2, 3, 4]}
+    assert [event.progress for event in events if event.kind == PROGRESS and event.source is None][-1] == \
+        (6, 6, 6, 0)
+
+
+def test_chain_id_mismatch_aborts_before_any_send(chains, tmp_path):
+    sender, chains = chains
+    job = _job(tmp_path, chains, {'http://b': 1})
+    sent = {name: web3.eth.get_transaction_count(sender.address) for name, web3 in chains.items()}
+    dispatcher = MultiChainDispatcher(job, sender.key)
+
+    with pytest.raises(ValueError, match='chain id'):
+        dispatcher.run()
+    assert {name: web3.eth.get_transaction_count(sender.address) for name, web3 in chains.items()} == sent
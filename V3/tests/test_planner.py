@@ -0,0 +1,32 @@
+from conftest import new_addresses
+from multisend.engine import NATIVE_GAS_LIMIT
+from multisend.events import PROGRESS
+from multisend.planner import plan_batch, run_plan
+from multisend.results import SUCCESS
+
+
+# Transfers that count how often the sheet is read
+class _Sheet(list):
+    reads = 0
+
+    def __iter__(self):
+        self.reads += 1
+        return super().__iter__()
+
+
+def test_waves_share_progress_and_read_the_sheet_once(web3, engine):
+    transfers = _Sheet((recipient, '0.01') for recipient in new_addresses(7))
+    lanes = [(None, transfers)]
+    plan = plan_batch(engine, lanes, fee_budget=3 * engine.gas_price * NATIVE_GAS_LIMIT, scan_recipients=False)
+    assert plan.ok and [(wave.start, wave.stop) for wave in plan.waves] == [(0, 3), (3, 6), (6, 7)]
+
+    reads = transfers.reads
+    progress = []
+    results = run_plan(engine, lanes, plan, lambda event: event.kind == PROGRESS and progress.append(event.progress))
+
+    # lane_rows reads the transfers twice (recipients and amounts), once per run
+    assert transfers.reads - reads == 2
+    assert results.successful == 7 and all(record.status == SUCCESS for record in results)
+    assert {update.total for update in progress} == {7}
+    assert all(update.successful + update.failed <= update.initiated <= 7 for update in progress)
+    assert progress[-1] == (7, 7, 7, 0)
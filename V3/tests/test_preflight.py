@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+from eth_tester.backends.pyevm import main as pyevm
+from eth_utils import to_bytes, to_canonical_address, to_int
+
+from conftest import new_addresses
+from multisend.daemon import DONE_STATES, ERROR, FINISHED, TransferDaemon
+from multisend.preflight import Preflight
+from tokens import deploy_token
+
+
+# eth_call state overrides for the in-process chain: web3 passes the
+# override on to EthereumTester.call, whose py-evm backend has no notion of
+# it, so the code and balance are set on the call's scratch state before
+# the transaction runs (and reverted with it)
+@pytest.fixture
+def state_override(web3, monkeypatch):
+    tester = web3.provider.ethereum_tester
+    call, execute = tester.call, pyevm._execute_and_revert_transaction
+    lock = threading.Lock()
+
+    def execute_with(overrides):
+        def run(chain, transaction, block_number='latest'):
+            state = pyevm._get_vm_for_block_number(chain, block_number).state
+            snapshot = state.snapshot()
+            for address, fields in overrides.items():
+                account = to_canonical_address(address)
+                if 'code' in fields:
+                    state.set_code(account, to_bytes(hexstr=fields['code']))
+                if 'balance' in fields:
+                    balance = fields['balance']
+                    state.set_balance(account, balance if isinstance(balance, int) else to_int(hexstr=balance))
+            computation = state.apply_transaction(transaction)
+            state.revert(snapshot)
+            return computation
+        return run
+
+    def call_with_override(transaction, block_number='latest', overrides=None):
+        with lock:
+            if overrides:
+                monkeypatch.setattr(pyevm, '_execute_and_revert_transaction', execute_with(overrides))
+            try:
+                return call(transaction, block_number)
+            finally:
+                monkeypatch.setattr(pyevm, '_execute_and_revert_transaction', execute)
+
+    monkeypatch.setattr(tester, 'call', call_with_override)
+
+
+def _sheet(path, rows):
+    path.write_text('Receiver,Amount\n' + ''.join(f'{recipient},{amount}\n' for recipient, amount in rows))
+
+
+# Run a one-sheet job through the daemon with a full pre-flight; returns
+# the finished DaemonJob
+def _run_job(engine, tmp_path, rows, token=None):
+    _sheet(tmp_path / 'rows.csv', rows)
+    daemon = TransferDaemon(engine, preflight='all')
+    job = daemon.submit({'transfers': [{'sheet': 'rows.csv', 'token': token}]}, str(tmp_path))
+    daemon.start()
+    while job.status not in DONE_STATES:
+        job.wait(job.version, 5)
+    return job
+
+
+def _assert_aborted(web3, sender, job, problem):
+    assert job.status == ERROR and job.error == "Pre-flight failed; nothing was sent"
+    assert any(problem in message for message in job.messages), job.messages
+    assert len(job.results) == 0
+    # The token deployment is the only transaction the sender ever sent
+    assert web3.eth.get_transaction_count(sender.address) == 1
+
+
+def test_probe_runs_through_the_state_override(web3, sender, engine, state_override):
+    token = engine.load_token(deploy_token(web3, sender).address)
+    preflight = Preflight(engine, token)
+    report = preflight.run([(recipient, '1') for recipient in new_addresses(5)])
+
+    assert report.ok and report.checked == 5
+    assert report.simulated_with_probe
+    assert token.fee_on_transfer is False
+
+
+def test_fee_on_transfer_token_aborts_the_job(web3, sender, engine, state_override, tmp_path):
+    contract = deploy_token(web3, sender, fee_bps=250)
+    job = _run_job(engine, tmp_path, [(recipient, '2') for recipient in new_addresses(3)], contract.address)
+
+    _assert_aborted(web3, sender, job, "Fee-on-transfer token: recipient receives 1950000000000000000 of "
+                                       "2000000000000000000 base units")
+    assert engine.load_token(contract.address).fee_on_transfer is True
+
+
+def test_paused_token_aborts_the_job(web3, sender, engine, state_override, tmp_path):
+    contract = deploy_token(web3, sender)
+    contract.functions.set_paused(True).transact({'from': web3.eth.accounts[0]})
+    job = _run_job(engine, tmp_path, [(recipient, '1') for recipient in new_addresses(3)], contract.address)
+
+    _assert_aborted(web3, sender, job, "Token transfers are paused")
+
+
+def test_blacklisted_recipient_is_named(web3, sender, engine, state_override, tmp_path):
+    contract = deploy_token(web3, sender)
+    recipients = new_addresses(4)
+    contract.functions.set_blacklisted(recipients[2], True).transact({'from': web3.eth.accounts[0]})
+    job = _run_job(engine, tmp_path, [(recipient, '1') for recipient in recipients], contract.address)
+
+    _assert_aborted(web3, sender, job, f"Row 3 ({recipients[2]}): Recipient is blacklisted by the token")
+    assert sum('Pre-flight: Row' in message for message in job.messages) == 1
+
+
+# A contract without a payable fallback (the token here) rejects plain ETH
+def test_recipient_rejecting_native_transfers_aborts_the_job(web3, sender, engine, state_override, tmp_path):
+    contract = deploy_token(web3, sender)
+    recipients = new_addresses(2)
+    job = _run_job(engine, tmp_path, [(recipients[0], '1'), (contract.address, '1'), (recipients[1], '1')])
+
+    _assert_aborted(web3, sender, job, f"Row 2 ({contract.address}): Recipient rejects native transfers")
+
+
+def test_clean_job_passes_and_is_sent(web3, sender, engine, state_override, tmp_path):
+    recipients = new_addresses(3)
+    job = _run_job(engine, tmp_path, [(recipient, '1') for recipient in recipients])
+
+    assert job.status == FINISHED and job.results.successful == 3
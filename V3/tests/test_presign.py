@@ -0,0 +1,88 @@
+import os
+
+from conftest import new_addresses
+from multisend.engine import lane_rows
+from multisend.presign import Presigner, _init_worker, _read_shard, _sign_shard
+from multisend.results import FAILED, SUCCESS
+from tokens import deploy_token
+
+
+def _count_engine_signatures(engine):
+    calls = []
+    for name in ('sign_native', 'sign_token'):
+        sign = getattr(engine, name)
+        setattr(engine, name, lambda *args, sign=sign: calls.append(args) or sign(*args))
+    return calls
+
+
+# Shard file format: the parent reads back exactly what a worker wrote, and
+# a row the worker could not sign comes back as None
+def test_shard_file_round_trip(tmp_path, engine):
+    token_address = os.urandom(20)
+    _init_worker(bytes(engine.account.key), engine.chain_id, engine.gas_price,
+                 [None, (token_address, 65000, None)])
+    recipients = [os.urandom(20) for _ in range(3)]
+    rows = [(0, recipients[0], 10, 5), (1, recipients[1], 2 ** 256, 6), (1, recipients[2], 7, 7)]
+
+    payloads = list(_read_shard(_sign_shard(str(tmp_path), rows)))
+
+    assert payloads[1] is None
+    assert payloads[0] == engine.sign_native(recipients[0], 10, 5)
+    assert tuple(payloads[2]) == tuple(engine._encoder(65000).sign(
+        7, token_address, 0, bytes.fromhex('a9059cbb') + bytes(12) + recipients[2] + (7).to_bytes(32, 'big')))
+    assert not os.listdir(tmp_path)
+
+
+# Rows come back in order with consecutive nonces from the sender's next
+# one; unsendable rows get no nonce and valid payloads match the engine's.
+# Like the broadcaster, the test takes each row's nonce before the next.
+def test_presigned_rows_hand_off_in_nonce_order(web3, sender, engine):
+    token = engine.load_token(deploy_token(web3, sender).address)
+    recipients = new_addresses(23)
+    natives = [(recipient, '0.01') for recipient in recipients]
+    transfers = [(recipient, '2') for recipient in recipients]
+    transfers[4] = ('not-an-address', '2')
+    transfers[9] = (recipients[9], 'abc')
+    rows = list(lane_rows([(token, transfers), (None, natives)]))
+    first = engine.nonces.peek()
+
+    handed_out = []
+    for row, presigned in Presigner(2, min_rows=0, shard_rows=4).sign(engine, rows, [token]):
+        handed_out.append((row, presigned))
+        if presigned is not None:
+            with engine.nonces.hold():
+                pass
+
+    assert [row for row, _ in handed_out] == rows
+    nonce = first
+    for row, presigned in handed_out:
+        if row.address is None or row.value is None:
+            assert presigned is None
+            continue
+        presigned_nonce, gas_price, signed = presigned
+        assert (presigned_nonce, gas_price) == (nonce, engine.gas_price)
+        if row.token is None:
+            expected = engine.sign_native(row.address, row.value, nonce)
+        else:
+            expected = engine.sign_token(token, row.address, row.value, nonce)
+        assert (bytes(signed.raw_transaction), bytes(signed.hash)) == tuple(expected)
+        nonce += 1
+    assert nonce == first + 44
+
+
+# A row failing before its nonce is taken re-shards the rest from the
+# engine's next nonce, so later rows are still sent with presigned payloads
+def test_gap_reshards_instead_of_resigning(web3, sender, engine):
+    engine.presigner = Presigner(2, min_rows=0, shard_rows=3)
+    transfers = [(recipient, '1') for recipient in new_addresses(14)]
+    transfers[2] = (transfers[2][0], '100000')
+    transfers[8] = (transfers[8][0], '100000')
+    signatures = _count_engine_signatures(engine)
+
+    results = engine.run_batch(transfers)
+
+    statuses = {record.index: record.status for record in results}
+    assert [index for index, status in statuses.items() if status == FAILED] == [3, 9]
+    assert results.successful == 12 and not signatures
+    nonces = sorted(record.nonce for record in results if record.status == SUCCESS)
+    assert nonces == list(range(12)) and web3.eth.get_transaction_count(sender.address) == 12
@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from web3 import Web3
+
+from multisend.ratelimit import RateLimitedHTTPProvider, RateLimiter, TokenBucket
+
+
+def test_bucket_paces_to_its_rate_after_the_burst():
+    bucket = TokenBucket(50, burst=5)
+    start = time.monotonic()
+    for _ in range(15):
+        bucket.acquire()
+    # 5 from the burst, 10 more at 50/s
+    assert 0.18 <= time.monotonic() - start < 1.0
+
+
+def test_bucket_rate_stays_between_the_floor_and_the_quota():
+    bucket = TokenBucket(10)
+    bucket.set_rate(40)
+    assert bucket.rate == 10
+    bucket.set_rate(0.001)
+    assert bucket.rate == 0.1
+
+
+def test_rate_limit_halves_the_rate_of_that_budget_only():
+    limiter = RateLimiter(read_rps=40, send_rps=8)
+    limiter.on_rate_limited('eth_sendRawTransaction')
+    limiter.on_rate_limited('eth_sendRawTransaction')
+    assert limiter.send_bucket.rate == 2 and limiter.read_bucket.rate == 40
+    assert limiter.throttled_count == 2
+
+
+def test_rate_recovers_additively_after_a_run_of_successes():
+    limiter = RateLimiter(read_rps=40, recovery_after=3, recovery_step=5)
+    limiter.on_rate_limited('eth_call')
+    assert limiter.read_bucket.rate == 20
+    for _ in range(2):
+        limiter.on_success('eth_call')
+    assert limiter.read_bucket.rate == 20
+    limiter.on_success('eth_call')
+    assert limiter.read_bucket.rate == 25
+    for _ in range(30):
+        limiter.on_success('eth_call')
+    assert limiter.read_bucket.rate == 40
+
+
+# A failure in the middle of a success run starts the count again
+def test_throttle_resets_the_success_run():
+    limiter = RateLimiter(read_rps=40, recovery_after=3, recovery_step=5)
+    limiter.on_rate_limited('eth_call')
+    limiter.on_success('eth_call')
+    limiter.on_success('eth_call')
+    limiter.on_rate_limited('eth_call')
+    limiter.on_success('eth_call')
+    assert limiter.read_bucket.rate == 10
+
+
+def test_retry_after_pauses_every_budget():
+    limiter = RateLimiter(read_rps=1000, send_rps=1000)
+    limiter.on_rate_limited('eth_call', retry_after=0.2)
+    start = time.monotonic()
+    limiter.acquire('eth_sendRawTransaction')
+    assert time.monotonic() - start >= 0.19
+
+
+# JSON-RPC endpoint answering eth_chainId, refusing the first `limited`
+# calls with -32005 and, with `http_429`, the first HTTP request with a 429
+class _Node(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _answer(self, call):
+        server = self.server
+        server.calls += 1
+        if server.limited > 0:
+            server.limited -= 1
+            return {'jsonrpc': '2.0', 'id': call['id'], 'error': {'code': -32005, 'message': 'rate limit exceeded'}}
+        return {'jsonrpc': '2.0', 'id': call['id'], 'result': hex(server.calls)}
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if self.server.http_429:
+            self.server.http_429 = False
+            self.send_response(429)
+            self.send_header('Retry-After', '0.05')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        answer = [self._answer(call) for call in body] if isinstance(body, list) else self._answer(body)
+        data = json.dumps(answer).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def node():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Node)
+    server.calls, server.limited, server.http_429 = 0, 0, False
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _provider(node):
+    limiter = RateLimiter(read_rps=1000, send_rps=1000)
+    return RateLimitedHTTPProvider(f'http://127.0.0.1:{node.server_address[1]}', limiter)
+
+
+def test_rate_limited_call_is_retried_with_backoff(node):
+    provider = _provider(node)
+    node.limited = 2
+    response = provider.make_request('eth_chainId', [])
+    assert 'result' in response and node.calls == 3
+    assert provider.limiter.throttled_count == 2 and provider.limiter.read_bucket.rate == 250
+
+
+def test_http_429_honours_retry_after(node):
+    provider = _provider(node)
+    node.http_429 = True
+    start = time.monotonic()
+    assert 'result' in provider.make_request('eth_chainId', [])
+    assert time.monotonic() - start >= 0.05 and provider.limiter.throttled_count == 1
+
+
+# Calls of a batch rejected one by one are retried, and the batch's answers
+# keep their order and ids
+def test_rate_limited_calls_inside_a_batch_are_retried(node):
+    provider = _provider(node)
+    node.limited = 2
+    responses = provider.make_batch_request([('eth_chainId', []) for _ in range(4)])
+
+    assert all('result' in response for response in responses)
+    assert [response['id'] for response in responses] == sorted(response['id'] for response in responses)
+    assert node.calls == 6 and provider.limiter.throttled_count == 1
+    assert provider.limiter.read_bucket.rate == 500
+
+
+def test_batch_through_web3_gets_every_result(node):
+    web3 = Web3(_provider(node))
+    node.limited = 1
+    with web3.batch_requests() as batch:
+        for _ in range(3):
+            batch.add(web3.eth.chain_id)
+        results = batch.execute()
+    assert len(results) == 3 and all(isinstance(result, int) for result in results)
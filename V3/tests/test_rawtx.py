@@ -0,0 +1,77 @@
+import os
+
+import pytest
+from eth_account import Account
+from web3 import Web3
+
+from multisend.abi import transfer_calldata
+from multisend.addresses import checksum
+from multisend.rawtx import LegacyTxEncoder, encode_access_list
+
+PRIVATE_KEY = bytes.fromhex('4c0883a69102937d6231471b5dbb6204fe5129617082792ae468d01a3f362318')
+RECIPIENT = bytes.fromhex('3535353535353535353535353535353535353535')
+TOKEN = bytes.fromhex('a0b86991c6218b36c1d19d4a2e9eb0ce3606eb48')
+
+
+def _expected(transaction):
+    return Account.sign_transaction(transaction, PRIVATE_KEY)
+
+
+def _encoders(chain_id, gas_price, gas):
+    encoder = LegacyTxEncoder(PRIVATE_KEY, chain_id, gas_price, gas)
+    # Same encoder signing through eth_keys, as without coincurve installed
+    fallback = LegacyTxEncoder(PRIVATE_KEY, chain_id, gas_price, gas)
+    fallback.fast_key = None
+    return encoder, fallback
+
+
+@pytest.mark.parametrize('chain_id, gas_price, nonce, value', [
+    (1, Web3.to_wei(20, 'gwei'), 0, 0),
+    (1, 1, 1, 1),
+    (59144, Web3.to_wei('0.1', 'gwei'), 127, 128),
+    (8453, Web3.to_wei(3, 'gwei'), 2 ** 20, 10 ** 18),
+    (131277322940537, 10 ** 12, 2 ** 40, 2 ** 200),
+])
+def test_native_transfer_matches_eth_account(chain_id, gas_price, nonce, value):
+    expected = _expected({'nonce': nonce, 'gasPrice': gas_price, 'gas': 21000, 'to': checksum(RECIPIENT),
+                          'value': value, 'data': b'', 'chainId': chain_id})
+    for encoder in _encoders(chain_id, gas_price, 21000):
+        signed = encoder.sign(nonce, RECIPIENT, value)
+        assert signed.raw_transaction == expected.raw_transaction
+        assert signed.hash == expected.hash
+
+
+@pytest.mark.parametrize('data', [
+    transfer_calldata(RECIPIENT, 1),
+    transfer_calldata(os.urandom(20), 2 ** 256 - 1),
+    b'\x01', b'\x7f', b'\x80', b'\xff' * 55, b'\xff' * 56, os.urandom(300),
+])
+def test_contract_call_matches_eth_account(data):
+    expected = _expected({'nonce': 9, 'gasPrice': 10 ** 9, 'gas': 65000, 'to': checksum(TOKEN), 'value': 0,
+                          'data': data, 'chainId': 59144})
+    for encoder in _encoders(59144, 10 ** 9, 65000):
+        assert encoder.sign(9, TOKEN, 0, data).raw_transaction == expected.raw_transaction
+
+
+def test_access_list_transaction_matches_eth_account():
+    keys = [os.urandom(32) for _ in range(3)]
+    other = os.urandom(20)
+    entries = [(TOKEN, keys[:2]), (other, [keys[2]]), (RECIPIENT, [])]
+    data = transfer_calldata(RECIPIENT, 10 ** 18)
+    expected = _expected({
+        'type': 1, 'nonce': 3, 'gasPrice': 10 ** 9, 'gas': 70000, 'to': checksum(TOKEN), 'value': 0,
+        'data': data, 'chainId': 59144,
+        'accessList': [{'address': checksum(address), 'storageKeys': ['0x' + key.hex() for key in keys]}
+                       for address, keys in entries]})
+    for encoder in _encoders(59144, 10 ** 9, 70000):
+        signed = encoder.sign_with_access_list(3, TOKEN, 0, data, encode_access_list(entries))
+        assert signed.raw_transaction == expected.raw_transaction
+        assert signed.hash == expected.hash
+
+
+def test_engine_signing_is_accepted_by_the_node(web3, sender, engine):
+    recipient = Account.create().address
+    signed = engine.sign_native(bytes.fromhex(recipient[2:]), 12345, 0)
+    receipt = web3.eth.wait_for_transaction_receipt(web3.eth.send_raw_transaction(signed.raw_transaction))
+    assert receipt['status'] == 1 and receipt['transactionHash'] == signed.hash
+    assert web3.eth.get_balance(recipient) == 12345
@@ -0,0 +1,89 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from web3 import Web3
+
+from conftest import new_addresses
+from multisend import scheduler as scheduler_module
+from multisend.addresses import address_bytes
+from multisend.engine import LaneRow
+from multisend.events import LOG
+from multisend.scheduler import Scheduler, scheduler_from_options
+from tokens import deploy_token
+
+GWEI = Web3.to_wei(1, 'gwei')
+
+
+def _row(index, value=1, priority=0, deadline=None, token=None, recipient=None):
+    recipient = recipient or new_addresses(1)[0]
+    return LaneRow(index, token, recipient, str(value), value, priority, deadline, address_bytes(recipient))
+
+
+def _indexes(rows):
+    return [row.index for row in rows]
+
+
+# Gas oracle whose price the test moves
+def _engine(gas_price):
+    return SimpleNamespace(web3=SimpleNamespace(eth=SimpleNamespace(gas_price=gas_price)))
+
+
+ROWS = [_row(1, value=5, priority=0, deadline=300.0), _row(2, value=9, priority=2),
+        _row(3, value=1, priority=1, deadline=100.0), _row(4, value=9, priority=2, deadline=200.0)]
+
+
+@pytest.mark.parametrize('policy, order', [
+    ('sheet', [1, 2, 3, 4]),
+    ('priority', [2, 4, 3, 1]),
+    ('largest', [2, 4, 1, 3]),
+    ('deadline', [3, 4, 1, 2]),
+])
+def test_policies_order_rows_with_ties_in_sheet_order(policy, order):
+    assert _indexes(Scheduler(policy).order(list(ROWS), _engine(GWEI))) == order
+
+
+# Native rows, then token transfers to existing holders (the deployer
+# holds the whole supply), then new holders
+def test_cheapest_gas_sends_to_existing_holders_first(web3, sender, engine):
+    token = engine.load_token(deploy_token(web3, sender).address)
+    rows = [_row(1, token=token), _row(2, token=token, recipient=sender.address), _row(3)]
+
+    assert _indexes(Scheduler('cheapest_gas').order(rows, engine)) == [3, 2, 1]
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        Scheduler('random')
+    assert scheduler_from_options('sheet') is None
+
+
+# While gas is above the cap only rows at min_priority or above go out; the
+# held rows follow, in order, as soon as the price is back under the cap
+def test_gas_spike_holds_low_priority_rows_until_gas_drops():
+    engine = _engine(50 * GWEI)
+    logged = []
+    rows = [_row(1), _row(2), _row(3, priority=1), _row(4)]
+    scheduler = Scheduler('sheet', max_gas_price=30 * GWEI, min_priority=1, check_interval=0)
+    out = scheduler.schedule(rows, engine, lambda event: event.kind == LOG and logged.append(event.message))
+
+    assert next(out).index == 3
+    assert len(logged) == 1 and 'holding rows below priority 1' in logged[0]
+    engine.web3.eth.gas_price = 20 * GWEI
+    assert _indexes(out) == [1, 2, 4]
+    assert 'sending 2 held rows' in logged[1]
+
+
+# A held row goes out despite the spike once its deadline is within the margin
+def test_held_row_is_released_when_its_deadline_is_close(monkeypatch):
+    now = time.time()
+    engine = _engine(50 * GWEI)
+    rows = [_row(1, priority=2), _row(2, deadline=now + 3600), _row(3)]
+    scheduler = Scheduler('sheet', max_gas_price=30 * GWEI, check_interval=0, deadline_margin=600)
+    out = scheduler.schedule(rows, engine, lambda event: None)
+
+    assert next(out).index == 1
+    monkeypatch.setattr(scheduler_module.time, 'time', lambda: now + 3100)
+    assert next(out).index == 2
+    engine.web3.eth.gas_price = 20 * GWEI
+    assert _indexes(out) == [3]
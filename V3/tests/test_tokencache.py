@@ -0,0 +1,61 @@
+import time
+
+from multisend.tokencache import TokenCache
+from tokens import deploy_token
+
+TOKEN = '0x' + '11' * 20
+OTHER = '0x' + '22' * 20
+
+
+def test_entries_expire_after_the_ttl(tmp_path, monkeypatch):
+    cache = TokenCache(str(tmp_path / 'cache.json'), ttl=60)
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now)
+    entry = cache.put(1, TOKEN, decimals=6, symbol='USD')
+    assert cache.get(1, TOKEN) == entry
+
+    now += 61
+    assert cache.get(1, TOKEN) is None
+    # A partial update does not renew an expired entry, a metadata refresh does
+    cache.put(1, TOKEN, transfer_gas=52000)
+    assert cache.get(1, TOKEN) is None
+    cache.put(1, TOKEN, decimals=6, symbol='USD')
+    assert cache.get(1, TOKEN)['transfer_gas'] == 52000
+
+
+def test_partial_entry_after_invalidation_is_not_returned(tmp_path):
+    cache = TokenCache(str(tmp_path / 'cache.json'))
+    cache.put(1, TOKEN, decimals=6, symbol='USD')
+    cache.put(2, TOKEN, decimals=18, symbol='USD')
+    cache.invalidate(1)
+    assert cache.get(1, TOKEN) is None and cache.get(2, TOKEN) is not None
+
+    cache.put(1, TOKEN, transfer_gas=52000, fee_on_transfer=True)
+    assert cache.get(1, TOKEN) is None
+    cache.invalidate(2, TOKEN)
+    assert cache.get(2, TOKEN) is None
+
+
+# Two processes sharing the file (two TokenCache objects here) keep each
+# other's entries instead of writing back what they loaded at start
+def test_writers_merge_with_the_file(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    first, second = TokenCache(path), TokenCache(path)
+    first.get(1, TOKEN)
+    second.get(1, TOKEN)
+    first.put(1, TOKEN, decimals=6, symbol='USD')
+    second.put(1, OTHER, decimals=18, symbol='TKN')
+
+    merged = TokenCache(path)
+    assert merged.get(1, TOKEN)['symbol'] == 'USD' and merged.get(1, OTHER)['symbol'] == 'TKN'
+
+
+# load_token reads the chain again instead of failing on a gas-only entry
+def test_load_token_rereads_a_partial_entry(tmp_path, web3, sender, engine):
+    token_address = deploy_token(web3, sender).address
+    engine.token_cache = TokenCache(str(tmp_path / 'cache.json'))
+    engine.token_cache.put(engine.chain_id, token_address, transfer_gas=52000)
+
+    token = engine.load_token(token_address)
+    assert token.decimals == 18
+    assert engine.token_cache.get(engine.chain_id, token_address)['decimals'] == 18
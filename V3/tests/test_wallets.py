@@ -0,0 +1,68 @@
+import pytest
+from eth_account import Account
+
+from multisend.wallets import HDWalletSet, account_from_env, generate_wallets
+
+# Hardhat / Foundry default accounts (m/44'/60'/0'/0/i)
+TEST_MNEMONIC = 'test test test test test test test test test test test junk'
+TEST_VECTORS = [
+    (0, '0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266',
+     'ac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80'),
+    (1, '0x70997970C51812dc3A010C7d01b50e0d17dc79C8',
+     '59c6995e998f97a5a0044966f0945389dc9e86dae88c7a8412f4603b6b78690d'),
+    (2, '0x3C44CdDdB6a900fa2b585dd299e03d12FA4293BC',
+     '5de4111afa1a4b94908f83103eb1f1706367c2e68ca870fc3fb9a804cdab365a'),
+    (19, '0x8626f6940E2eb28930eFb4CeF49B2d1F2C9C1199',
+     'df57089febbacf7ba0bc227dafbffa9fc08a93fdc68e1e42411a14efcf23656e'),
+]
+# BIP-39 test mnemonic, account 0 without passphrase
+ABANDON_MNEMONIC = 'abandon ' * 11 + 'about'
+ABANDON_VECTOR = ('0x9858EfFD232B4033E47d90003D41EC34EcaEda94',
+                  '1ab42cc412b618bdea3a599e3c9bae199ebf030895b039e9db1e30dafb12b727')
+
+
+@pytest.mark.parametrize('index, address, private_key', TEST_VECTORS)
+def test_hd_wallets_match_bip44_vectors(index, address, private_key):
+    wallets = HDWalletSet(TEST_MNEMONIC)
+    assert wallets.address(index) == address
+    assert wallets.private_key(index).hex() == private_key
+
+
+def test_hd_wallets_match_the_bip39_test_mnemonic():
+    wallets = HDWalletSet(ABANDON_MNEMONIC)
+    assert (wallets.address(0), wallets.private_key(0).hex()) == ABANDON_VECTOR
+
+
+def test_hd_wallets_match_eth_account_derivation():
+    Account.enable_unaudited_hdwallet_features()
+    wallets = HDWalletSet(ABANDON_MNEMONIC, passphrase='secret')
+    for index in (0, 7, 250000):
+        expected = Account.from_mnemonic(ABANDON_MNEMONIC, passphrase='secret',
+                                         account_path=f"m/44'/60'/0'/0/{index}")
+        assert wallets.address(index) == expected.address
+
+
+def test_invalid_mnemonic_raises_value_error():
+    with pytest.raises(ValueError):
+        HDWalletSet('not a real mnemonic')
+    with pytest.raises(ValueError):
+        HDWalletSet(TEST_MNEMONIC).private_key(-1)
+
+
+def test_account_from_env_selects_the_wallet_index():
+    account = account_from_env({'MNEMONIC': TEST_MNEMONIC, 'WALLET_INDEX': '2'})
+    assert account.address == TEST_VECTORS[2][1]
+    assert account_from_env({'PRIVATE_KEY': '0x' + TEST_VECTORS[0][2]}) == '0x' + TEST_VECTORS[0][2]
+
+
+def test_generated_hd_wallets_stream_in_index_order():
+    wallets = list(generate_wallets(3, mnemonic=TEST_MNEMONIC, workers=1, chunk_size=2))
+    assert [(wallet.index, wallet.address) for wallet in wallets] == [vector[:2] for vector in TEST_VECTORS[:3]]
+
+
+def test_keystores_use_the_library_default_kdf():
+    wallet, = generate_wallets(1, workers=1, keystore_password='pw')
+    assert wallet.keystore['crypto']['kdf'] == 'scrypt'
+    assert '0x' + Account.decrypt(wallet.keystore, 'pw').hex() == wallet.private_key
+    wallet, = generate_wallets(1, workers=1, keystore_password='pw', keystore_iterations=1000)
+    assert wallet.keystore['crypto']['kdf'] == 'pbkdf2'
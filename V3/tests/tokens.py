@@ -0,0 +1,238 @@
+# Creation bytecode and ABI of contracts/TestToken.vy (vyper 0.4.3, `vyper -f bytecode` / `-f abi`)
+TEST_TOKEN_BYTECODE = (
+    "0x346100ea57600a6040527f5465737420546f6b656e0000000000000000000000000000000000000000000060605260"
+    "4080515f5560208101516001555060036040527f54535400000000000000000000000000000000000000000000000000"
+    "00000000606052604080516002556020810151600355506012600455602061056e5f395f51600755602061054e5f395f"
+    "51600555602061054e5f395f516006336020525f5260405f2055335f7fddf252ad1be2c89b69c2b068fc378daa952ba7"
+    "f163c4a11628f55a4df523b3ef602061054e60403960206040a361042a6100ee6100003961042a610000f35b5f80fd5f"
+    "3560e01c6002600b820660011b61041401601e395f51565b630ff5ce7281186100435760243610341761041057600435"
+    "8060011c61041057604052604051600855005b63dbac26e9811861040c57602436103417610410576004358060a01c61"
+    "04105760405260096040516020525f5260405f205460605260206060f35b63fe200b49811861040c5760443610341761"
+    "0410576004358060a01c610410576040526024358060011c6104105760605260605160096040516020525f5260405f20"
+    "55005b63a9059cbb811861040c57604436103417610410576004358060a01c610410576040526008541561015f576020"
+    "8060c05260066060527f7061757365640000000000000000000000000000000000000000000000000000608052606081"
+    "60c001602682825e8051806020830101601f825f03163682375050601f19601f82516020010116905090508101905063"
+    "08c379a060a0528060040160bcfd5b60096040516020525f5260405f2054156101e45760208060c052600b6060527f62"
+    "6c61636b6c697374656400000000000000000000000000000000000000000060805260608160c001602b82825e805180"
+    "6020830101601f825f03163682375050601f19601f8251602001011690509050810190506308c379a060a05280600401"
+    "60bcfd5b6024356007548082028115838383041417156104105790509050612710810490506060526006336020525f52"
+    "60405f208054602435808203828111610410579050905081555060066040516020525f5260405f208054602435606051"
+    "808203828111610410579050905080820182811061041057905090508155506005546060518082038281116104105790"
+    "509050600555604051337fddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef6024356060"
+    "51808203828111610410579050905060805260206080a3600160805260206080f35b6306fdde03811861031157346104"
+    "1057602080604052806040015f54815260015460208201528051806020830101601f825f03163682375050601f19601f"
+    "825160200101169050810190506040f35b6318160ddd811861040c57346104105760055460405260206040f35b6395d8"
+    "9b41811861037d57346104105760208060405280604001600254815260035460208201528051806020830101601f825f"
+    "03163682375050601f19601f825160200101169050810190506040f35b6348a3ef5c811861040c573461041057600754"
+    "60405260206040f35b63313ce567811861040c57346104105760045460405260206040f35b6370a08231811861040c57"
+    "602436103417610410576004358060a01c6104105760405260066040516020525f5260405f205460605260206060f35b"
+    "635c975abb811861040c57346104105760085460405260206040f35b5f5ffd5b5f80fd040c040c0399007e040c00c302"
+    "c2032d03b5001803f08558201d7c882b055502d58d7eab7c1987eba6d6bb118b6faf60c5c468e1fb37b60dc219042a81"
+    "1600a1657679706572830004030036"
+)
+TEST_TOKEN_ABI = [
+    {
+        "name": "Transfer",
+        "inputs": [
+            {
+                "name": "sender",
+                "type": "address",
+                "indexed": True
+            },
+            {
+                "name": "receiver",
+                "type": "address",
+                "indexed": True
+            },
+            {
+                "name": "value",
+                "type": "uint256",
+                "indexed": False
+            }
+        ],
+        "anonymous": False,
+        "type": "event"
+    },
+    {
+        "stateMutability": "nonpayable",
+        "type": "function",
+        "name": "set_paused",
+        "inputs": [
+            {
+                "name": "paused",
+                "type": "bool"
+            }
+        ],
+        "outputs": []
+    },
+    {
+        "stateMutability": "nonpayable",
+        "type": "function",
+        "name": "set_blacklisted",
+        "inputs": [
+            {
+                "name": "account",
+                "type": "address"
+            },
+            {
+                "name": "blacklisted",
+                "type": "bool"
+            }
+        ],
+        "outputs": []
+    },
+    {
+        "stateMutability": "nonpayable",
+        "type": "function",
+        "name": "transfer",
+        "inputs": [
+            {
+                "name": "to",
+                "type": "address"
+            },
+            {
+                "name": "amount",
+                "type": "uint256"
+            }
+        ],
+        "outputs": [
+            {
+                "name": "",
+                "type": "bool"
+            }
+        ]
+    },
+    {
+        "stateMutability": "view",
+        "type": "function",
+        "name": "name",
+        "inputs": [],
+        "outputs": [
+            {
+                "name": "",
+                "type": "string"
+            }
+        ]
+    },
+    {
+        "stateMutability": "view",
+        "type": "function",
+        "name": "symbol",
+        "inputs": [],
+        "outputs": [
+            {
+                "name": "",
+                "type": "string"
+            }
+        ]
+    },
+    {
+        "stateMutability": "view",
+        "type": "function",
+        "name": "decimals",
+        "inputs": [],
+        "outputs": [
+            {
+                "name": "",
+                "type": "uint8"
+            }
+        ]
+    },
+    {
+        "stateMutability": "view",
+        "type": "function",
+        "name": "totalSupply",
+        "inputs": [],
+        "outputs": [
+            {
+                "name": "",
+                "type": "uint256"
+            }
+        ]
+    },
+    {
+        "stateMutability": "view",
+        "type": "function",
+        "name": "balanceOf",
+        "inputs": [
+            {
+                "name": "arg0",
+                "type": "address"
+            }
+        ],
+        "outputs": [
+            {
+                "name": "",
+                "type": "uint256"
+            }
+        ]
+    },
+    {
+        "stateMutability": "view",
+        "type": "function",
+        "name": "fee_bps",
+        "inputs": [],
+        "outputs": [
+            {
+                "name": "",
+                "type": "uint256"
+            }
+        ]
+    },
+    {
+        "stateMutability": "view",
+        "type": "function",
+        "name": "paused",
+        "inputs": [],
+        "outputs": [
+            {
+                "name": "",
+                "type": "bool"
+            }
+        ]
+    },
+    {
+        "stateMutability": "view",
+        "type": "function",
+        "name": "blacklisted",
+        "inputs": [
+            {
+                "name": "arg0",
+                "type": "address"
+            }
+        ],
+        "outputs": [
+            {
+                "name": "",
+                "type": "bool"
+            }
+        ]
+    },
+    {
+        "stateMutability": "nonpayable",
+        "type": "constructor",
+        "inputs": [
+            {
+                "name": "supply",
+                "type": "uint256"
+            },
+            {
+                "name": "fee_bps",
+                "type": "uint256"
+            }
+        ],
+        "outputs": []
+    }
+]
+
+
+# Deploy a TestToken from `deployer` (a funded eth-account) holding `supply`;
+# `fee_bps` is the share of every transfer burnt on the way
+def deploy_token(web3, deployer, supply=10 ** 24, fee_bps=0):
+    contract = web3.eth.contract(abi=TEST_TOKEN_ABI, bytecode=TEST_TOKEN_BYTECODE)
+    transaction = contract.constructor(supply, fee_bps).build_transaction({
+        'from': deployer.address, 'nonce': web3.eth.get_transaction_count(deployer.address),
+        'gas': 2000000, 'gasPrice': web3.eth.gas_price, 'chainId': web3.eth.chain_id})
+    tx_hash = web3.eth.send_raw_transaction(deployer.sign_transaction(transaction).raw_transaction)
+    address = web3.eth.wait_for_transaction_receipt(tx_hash).contractAddress
+    return web3.eth.contract(address=address, abi=TEST_TOKEN_ABI)